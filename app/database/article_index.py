@@ -0,0 +1,216 @@
+# ==============================================================================
+# FILE: app/database/article_index.py - Index des articles du CGI (renvoi direct)
+# ==============================================================================
+#
+# Associe chaque numéro d'article normalisé ("23", "45bis") aux plages de chunks
+# qui le contiennent. Construit à l'indexation et enregistré dans le snapshot de
+# l'index (article_index.npz) :
+#
+#   - un article commence à un titre en début de ligne : "Article 23 :",
+#     "## Art. 45 bis -", "Article 1er :"
+#   - il se poursuit sur les chunks suivants du même fichier jusqu'au titre
+#     d'article suivant (plage [start, end) dans l'ordre des chunks) ; les
+#     chunks ne contenant que des titres de parties (Livre, Section...) qui le
+#     suivent n'en font pas partie
+#
+# Une question citant explicitement un article ("Que dit l'article 23 du CGI ?")
+# est servie par ces plages, sans embedding ni parcours des vecteurs.
+
+import logging
+import os
+import re
+from typing import Dict, List, Optional, Pattern, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.french_analyzer import analyze, fold
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "article_index.npz"
+
+# Titre d'article : numéro suivi d'un séparateur ou d'une fin de ligne
+_HEADING_PATTERN = re.compile(
+    r"^[#>*_\s]*(?:article|art\.)\s*(\d+\s?(?:er|bis|ter|quater|quinquies|sexies|[a-z])?)\b[*_\s]*(?:[:.\-–—]|$)",
+    re.IGNORECASE | re.MULTILINE
+)
+
+# Suite d'une énumération après une référence : "articles 12, 13 et 14 bis"
+# (pas un montant ni un pourcentage : "2 000 FCFA", "30 %")
+_LIST_CONTINUATION = re.compile(
+    r"\s*(?:,|et|ou)\s*(\d+(?:\s?(?:bis|ter|quater|quinquies|sexies)\b|er\b|[a-z]\b)?)(?![\d,.]|\s*%|\s\d{3}\b)",
+    re.IGNORECASE
+)
+
+# Mots d'une simple demande de consultation ("Que dit l'article 23 du CGI ?")
+LOOKUP_TERMS = frozenset(term for word in (
+    "dit", "disent", "prevoit", "enonce", "contient", "contenu", "texte", "teneur",
+    "donne", "donner", "affiche", "afficher", "cite", "citer", "lire", "voir", "montre", "montrer",
+    "integral", "integralite", "entier", "complet", "article", "cgi", "code", "general", "impots",
+    "benin", "svp", "stp", "merci"
+) for term in analyze(word))
+
+
+def _is_structural(text: str) -> bool:
+    """Texte vide ou composé uniquement de titres Markdown (Livre, Titre, Section...)"""
+    return all(line.lstrip().startswith("#") for line in text.splitlines() if line.strip())
+
+
+def article_text(text: str, article_id: str) -> str:
+    """
+    Partie d'un chunk appartenant à un article : à partir de son titre (s'il figure
+    dans le chunk) et jusqu'au titre de l'article suivant
+    """
+    headings = [(normalize_article_id(heading.group(1)), heading.start()) for heading in _HEADING_PATTERN.finditer(text)]
+    own = [position for found, position in headings if found == article_id]
+    begin = own[0] if own else 0  # Sans son titre, le chunk est la suite de l'article
+    following = [position for _, position in headings if position > begin]
+    finish = following[0] if following else len(text)
+    return text[begin:finish].strip()
+
+
+def normalize_article_id(raw: str) -> str:
+    """Identifiant normalisé d'un numéro d'article ("45 bis" -> 45bis, "1er" -> 1)"""
+    article_id = "".join(fold(raw).split())
+    if article_id.endswith("er") and article_id[:-2].isdigit():
+        article_id = article_id[:-2]
+    return article_id
+
+
+def _reference_spans(text: str, pattern: Pattern) -> List[Tuple[str, int, int]]:
+    """Références d'articles (identifiant normalisé, début, fin), listes comprises ("articles 12 et 13")"""
+    spans = []
+    for match in pattern.finditer(text):
+        spans.append((normalize_article_id(match.group(1)), match.start(), match.end()))
+        end = match.end()
+        continuation = _LIST_CONTINUATION.match(text, end)
+        while continuation:
+            spans.append((normalize_article_id(continuation.group(1)), end, continuation.end()))
+            end = continuation.end()
+            continuation = _LIST_CONTINUATION.match(text, end)
+    return spans
+
+
+def article_references(text: str, pattern: Pattern) -> List[str]:
+    """
+    Articles cités explicitement dans un texte (identifiants normalisés, sans doublon)
+
+    Args:
+        text: Question de l'utilisateur
+        pattern: Motif des références d'articles (MarkdownParser.patterns['article'])
+    """
+    return list(dict.fromkeys(article_id for article_id, _, _ in _reference_spans(text, pattern) if article_id))
+
+
+def is_pure_lookup(text: str, pattern: Pattern) -> bool:
+    """Question limitée à la consultation d'articles (aucun autre terme significatif)"""
+    spans = _reference_spans(text, pattern)
+    if not spans:
+        return False
+    remainder, position = [], 0
+    for _, start, end in spans:
+        remainder.append(text[position:start])
+        position = end
+    remainder.append(text[position:])
+    return all(term in LOOKUP_TERMS for term in analyze(" ".join(remainder)))
+
+
+class ArticleIndex:
+    """Plages de chunks de chaque article, dans l'ordre d'indexation"""
+
+    def __init__(self):
+        self.doc_ids: List[str] = []
+        self.ranges: Dict[str, List[Tuple[int, int]]] = {}
+
+    @property
+    def article_count(self) -> int:
+        return len(self.ranges)
+
+    def build(self, chunks: Sequence[Tuple[str, str, str]]) -> "ArticleIndex":
+        """
+        Construit l'index
+
+        Args:
+            chunks: Triplets (id du chunk, fichier source, texte) dans l'ordre du découpage
+        """
+        doc_ids: List[str] = []
+        ranges: Dict[str, List[Tuple[int, int]]] = {}
+        current: Optional[str] = None
+        current_source: Optional[str] = None
+        start = end = 0
+
+        def close():
+            if current is not None and end > start:
+                ranges.setdefault(current, []).append((start, end))
+
+        for doc_id, source_file, text in chunks:
+            row = len(doc_ids)
+            doc_ids.append(doc_id)
+            if source_file != current_source:
+                close()
+                current, current_source = None, source_file
+
+            headings = list(_HEADING_PATTERN.finditer(text))
+            # Texte (hors titres de parties) avant le premier titre : suite de l'article en cours
+            body = text[:headings[0].start()] if headings else text
+            if current is not None and not _is_structural(body):
+                end = row + 1
+            if not headings:
+                continue
+            close()
+            # Articles courts entièrement contenus dans ce chunk
+            for heading in headings[:-1]:
+                ranges.setdefault(normalize_article_id(heading.group(1)), []).append((row, row + 1))
+            current, start, end = normalize_article_id(headings[-1].group(1)), row, row + 1
+        close()
+
+        self.doc_ids = doc_ids
+        self.ranges = ranges
+        logger.info(f"✅ Index des articles construit: {len(ranges)} articles, {len(doc_ids)} chunks")
+        return self
+
+    def lookup(self, article_ids: Sequence[str], limit: Optional[int] = None) -> List[Tuple[str, str]]:
+        """
+        Chunks des articles demandés
+
+        Returns:
+            Liste de (identifiant d'article, id du chunk), articles dans l'ordre demandé
+            (un chunk fusionné comme doublon n'apparaît qu'une fois par article)
+        """
+        hits: List[Tuple[str, str]] = []
+        for article_id in article_ids:
+            doc_ids = [doc_id for start, end in self.ranges.get(article_id, []) for doc_id in self.doc_ids[start:end]]
+            hits.extend((article_id, doc_id) for doc_id in dict.fromkeys(doc_ids))
+        return hits[:limit] if limit is not None else hits
+
+    def save(self, directory: str):
+        """Enregistre l'index dans un répertoire (snapshot de l'index)"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, INDEX_FILE)
+        tmp_path = f"{path}.tmp.npz"
+        entries = [(article_id, start, end) for article_id, spans in self.ranges.items() for start, end in spans]
+        np.savez(tmp_path,
+                 doc_ids=np.array(self.doc_ids, dtype=str),
+                 articles=np.array([article_id for article_id, _, _ in entries], dtype=str),
+                 spans=np.array([(start, end) for _, start, end in entries], dtype=np.int32).reshape(-1, 2))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["ArticleIndex"]:
+        """Charge l'index d'un snapshot (None s'il n'y en a pas)"""
+        path = os.path.join(directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        index = cls()
+        with np.load(path) as arrays:
+            index.doc_ids = arrays["doc_ids"].tolist()
+            for article_id, (start, end) in zip(arrays["articles"].tolist(), arrays["spans"].tolist()):
+                index.ranges.setdefault(article_id, []).append((start, end))
+        return index
+
+    def get_info(self) -> Dict[str, object]:
+        return {
+            "articles": self.article_count,
+            "chunks": len(self.doc_ids),
+            "ranges": sum(len(spans) for spans in self.ranges.values())
+        }
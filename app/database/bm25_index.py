@@ -0,0 +1,176 @@
+# ==============================================================================
+# FILE: app/database/bm25_index.py - Index lexical BM25 (listes inversées CSR)
+# ==============================================================================
+#
+# Les sigles (AIB, TPS, IRCM) et numéros d'articles ("45 bis") sont mal servis
+# par les embeddings : cet index lexical complète la recherche dense.
+#
+# Construit à l'indexation sur les chunks du CGI (analyseur français, voir
+# app/utils/french_analyzer.py) et enregistré dans le snapshot de l'index
+# (bm25_index.npz). Les listes inversées sont stockées en CSR :
+#
+#   indptr[t] .. indptr[t + 1]   plage des postings du terme t
+#   postings                     lignes (chunks) contenant le terme
+#   weights                      poids BM25 du terme dans le chunk, précalculé :
+#                                idf · tf·(k1 + 1) / (tf + k1·(1 - b + b·dl/avgdl))
+#
+# Le score d'une requête est la somme des poids de ses termes : une addition
+# vectorisée par terme, sans parcours des documents.
+#
+# Les chunks sont désignés par leur id (dedup_index.chunk_id) ; un chunk
+# supprimé depuis la construction est simplement ignoré à la lecture.
+
+import logging
+import os
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.utils.french_analyzer import analyze
+from app.utils.similarity import top_k_indices
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "bm25_index.npz"
+DEFAULT_K1 = 1.2
+DEFAULT_B = 0.75
+
+
+class BM25Index:
+    """Index inversé BM25 sur les chunks d'un snapshot"""
+
+    def __init__(self, k1: float = DEFAULT_K1, b: float = DEFAULT_B):
+        """
+        Args:
+            k1: Saturation de la fréquence des termes
+            b: Normalisation par la longueur des chunks (0 = aucune)
+        """
+        self.k1 = k1
+        self.b = b
+        self.doc_ids: List[str] = []
+        self.vocabulary: Dict[str, int] = {}
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.postings = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.average_length = 0.0
+
+    @property
+    def document_count(self) -> int:
+        return len(self.doc_ids)
+
+    def build(self, documents: Sequence[Tuple[str, str]]) -> "BM25Index":
+        """
+        Construit l'index
+
+        Args:
+            documents: Couples (id du chunk, texte) ; un id répété n'est indexé qu'une fois
+        """
+        doc_ids: List[str] = []
+        seen = set()
+        vocabulary: Dict[str, int] = {}
+        term_columns: List[np.ndarray] = []
+        term_counts: List[np.ndarray] = []
+        lengths: List[int] = []
+        for doc_id, text in documents:
+            if doc_id in seen:
+                continue
+            seen.add(doc_id)
+            terms = analyze(text)
+            columns = np.fromiter(
+                (vocabulary.setdefault(term, len(vocabulary)) for term in terms),
+                dtype=np.int64, count=len(terms)
+            )
+            unique, counts = np.unique(columns, return_counts=True)
+            term_columns.append(unique)
+            term_counts.append(counts)
+            lengths.append(len(terms))
+            doc_ids.append(doc_id)
+
+        self.doc_ids = doc_ids
+        self.vocabulary = vocabulary
+        if not doc_ids:
+            return self
+
+        # Triplets (terme, ligne, tf) puis tri par terme : listes inversées CSR
+        terms = np.concatenate(term_columns)
+        tf = np.concatenate(term_counts).astype(np.float32)
+        rows = np.repeat(np.arange(len(doc_ids), dtype=np.int32), [len(c) for c in term_columns])
+        order = np.argsort(terms, kind="stable")
+        terms, rows, tf = terms[order], rows[order], tf[order]
+
+        doc_lengths = np.asarray(lengths, dtype=np.float32)
+        self.average_length = float(doc_lengths.mean()) or 1.0
+        document_frequency = np.bincount(terms, minlength=len(vocabulary)).astype(np.float32)
+        idf = np.log1p((len(doc_ids) - document_frequency + 0.5) / (document_frequency + 0.5))
+        norms = self.k1 * (1 - self.b + self.b * doc_lengths / self.average_length)
+
+        self.indptr = np.concatenate([[0], np.cumsum(document_frequency)]).astype(np.int64)
+        self.postings = rows
+        self.weights = (idf[terms] * tf * (self.k1 + 1) / (tf + norms[rows])).astype(np.float32)
+        logger.info(f"✅ Index BM25 construit: {len(doc_ids)} chunks, {len(vocabulary)} termes")
+        return self
+
+    def scores(self, query: str) -> np.ndarray:
+        """Score BM25 de chaque chunk pour une requête (0 sans terme commun)"""
+        scores = np.zeros(self.document_count, dtype=np.float32)
+        for term in set(analyze(query)):
+            column = self.vocabulary.get(term)
+            if column is None:
+                continue
+            start, end = self.indptr[column], self.indptr[column + 1]
+            scores[self.postings[start:end]] += self.weights[start:end]  # Lignes uniques par terme
+        return scores
+
+    def search(self, query: str, top_k: int) -> List[Tuple[str, float]]:
+        """
+        Les top_k chunks de meilleur score BM25
+
+        Returns:
+            Liste de (id du chunk, score) triée par score décroissant
+        """
+        if not self.document_count:
+            return []
+        scores = self.scores(query)
+        selected = top_k_indices(scores, min(top_k, int(np.count_nonzero(scores))))
+        return [(self.doc_ids[row], float(scores[row])) for row in selected]
+
+    def save(self, directory: str):
+        """Enregistre l'index dans un répertoire (snapshot de l'index)"""
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, INDEX_FILE)
+        tmp_path = f"{path}.tmp.npz"
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        np.savez(tmp_path,
+                 doc_ids=np.array(self.doc_ids, dtype=str),
+                 terms=np.array(terms, dtype=str),
+                 indptr=self.indptr, postings=self.postings, weights=self.weights,
+                 parameters=np.array([self.k1, self.b, self.average_length]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, directory: str) -> Optional["BM25Index"]:
+        """Charge l'index d'un snapshot (None s'il n'y en a pas)"""
+        path = os.path.join(directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as arrays:
+            k1, b, average_length = (float(value) for value in arrays["parameters"])
+            index = cls(k1=k1, b=b)
+            index.doc_ids = arrays["doc_ids"].tolist()
+            index.vocabulary = {term: column for column, term in enumerate(arrays["terms"].tolist())}
+            index.indptr = arrays["indptr"]
+            index.postings = arrays["postings"]
+            index.weights = arrays["weights"]
+            index.average_length = average_length
+        return index
+
+    def get_info(self) -> Dict[str, object]:
+        return {
+            "documents": self.document_count,
+            "terms": len(self.vocabulary),
+            "postings": int(self.postings.size),
+            "average_length": round(self.average_length, 1),
+            "k1": self.k1,
+            "b": self.b,
+            "memory_mb": round((self.indptr.nbytes + self.postings.nbytes + self.weights.nbytes) / (1024 * 1024), 3)
+        }
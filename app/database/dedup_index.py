@@ -0,0 +1,171 @@
+# ==============================================================================
+# FILE: app/database/dedup_index.py - Identifiants par hash de contenu et déduplication
+# ==============================================================================
+#
+# Le même texte peut être indexé plusieurs fois (ré-indexation, ou CGI complet
+# et résumé resume_code_general_impot_2025.md). Chaque chunk reçoit :
+#
+#   id            hash(contenu normalisé + fichier source) : déterministe
+#   content_hash  hash(contenu normalisé) : clé de déduplication exacte
+#   simhash       empreinte 64 bits des shingles de mots (quasi-doublons, optionnel)
+#
+# Un doublon ne crée pas de nouvelle ligne : la provenance (fichier, titre,
+# section, article) est ajoutée au chunk existant, qui garde un seul vecteur.
+
+import hashlib
+import logging
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "dedup"
+
+PROVENANCE_FIELDS = ("source_file", "title", "section", "article")
+SHINGLE_SIZE = 3
+SIMHASH_BITS = 64
+
+_WORD_PATTERN = re.compile(r"\w+", re.UNICODE)
+# Nombre de bits à 1 de chaque octet (popcount vectorisé)
+_POPCOUNT_TABLE = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def normalize_content(content: str) -> str:
+    """Normalise un texte pour la comparaison (Unicode NFKC, casse, espaces)"""
+    return " ".join(unicodedata.normalize("NFKC", content or "").lower().split())
+
+
+def content_hash(content: str) -> str:
+    """Hash du contenu normalisé"""
+    return hashlib.blake2b(normalize_content(content).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def chunk_id(content: str, source_file: Optional[str]) -> str:
+    """Identifiant déterministe d'un chunk (contenu normalisé + fichier source)"""
+    key = f"{normalize_content(content)}\x00{source_file or ''}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def simhash(content: str) -> int:
+    """Empreinte SimHash 64 bits des shingles de mots du contenu normalisé"""
+    words = _WORD_PATTERN.findall(normalize_content(content))
+    if not words:
+        return 0
+    shingles = [" ".join(words[i:i + SHINGLE_SIZE]) for i in range(max(1, len(words) - SHINGLE_SIZE + 1))]
+
+    hashes = np.array(
+        [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest(), "little") for s in shingles],
+        dtype=np.uint64
+    )
+    bits = (hashes[:, None] >> np.arange(SIMHASH_BITS, dtype=np.uint64)) & np.uint64(1)
+    votes = 2 * bits.sum(axis=0, dtype=np.int64) - len(shingles)
+    return sum(1 << int(bit) for bit in np.flatnonzero(votes > 0))
+
+
+def hamming_distances(fingerprints: np.ndarray, fingerprint: int) -> np.ndarray:
+    """Distances de Hamming entre un SimHash et un tableau d'empreintes uint64"""
+    differences = (fingerprints ^ np.uint64(fingerprint)).view(np.uint8).reshape(-1, 8)
+    return _POPCOUNT_TABLE[differences].sum(axis=1, dtype=np.int32)
+
+
+def provenance_entry(document: Dict[str, Any]) -> Dict[str, Any]:
+    """Entrée de provenance d'un chunk (champs présents uniquement)"""
+    return {field: document[field] for field in PROVENANCE_FIELDS if document.get(field) is not None}
+
+
+class DedupIndex:
+    """Hashes de contenu et empreintes SimHash alignés sur les lignes du store"""
+
+    def __init__(self):
+        self.capacity = 0
+        self.content_hashes: List[Optional[str]] = []
+        self.simhashes = np.zeros(0, dtype=np.uint64)
+        self.shared = np.zeros(0, dtype=bool)  # Chunk ayant plusieurs provenances
+
+        # content_hash -> ligne (lignes non supprimées uniquement)
+        self._rows_by_hash: Dict[str, int] = {}
+
+    def reserve(self, capacity: int):
+        """Agrandit les colonnes (appelé avec la capacité de la matrice)"""
+        if capacity <= self.capacity:
+            return
+        simhashes = np.zeros(capacity, dtype=np.uint64)
+        simhashes[:self.capacity] = self.simhashes[:self.capacity]
+        shared = np.zeros(capacity, dtype=bool)
+        shared[:self.capacity] = self.shared[:self.capacity]
+        self.simhashes, self.shared = simhashes, shared
+        self.content_hashes.extend([None] * (capacity - len(self.content_hashes)))
+        self.capacity = capacity
+
+    def set_rows(self, start: int, documents: List[Dict[str, Any]], with_simhash: bool = False):
+        """Enregistre les hashes des documents pour les lignes start..start+len(documents)"""
+        self.reserve(start + len(documents))
+        for row, document in enumerate(documents, start=start):
+            digest = document.get("content_hash") or content_hash(document.get("content", ""))
+            self.content_hashes[row] = digest
+            self._rows_by_hash.setdefault(digest, row)
+            self.shared[row] = len(document.get("provenance", [])) > 1
+            if with_simhash:
+                self.simhashes[row] = simhash(document.get("content", ""))
+
+    def remove(self, row: int):
+        """Oublie une ligne supprimée"""
+        digest = self.content_hashes[row]
+        if digest is not None and self._rows_by_hash.get(digest) == row:
+            del self._rows_by_hash[digest]
+        self.shared[row] = False
+
+    def find_exact(self, digest: str) -> Optional[int]:
+        """Ligne d'un chunk de même contenu normalisé"""
+        return self._rows_by_hash.get(digest)
+
+    def find_near(self, fingerprint: int, live: np.ndarray, max_distance: int) -> Optional[int]:
+        """
+        Ligne la plus proche au sens de Hamming (SimHash), si à max_distance bits au plus
+
+        Args:
+            fingerprint: SimHash du nouveau chunk
+            live: Masque des lignes non supprimées
+            max_distance: Distance de Hamming maximale
+        """
+        count = live.size
+        if count == 0:
+            return None
+        distances = hamming_distances(self.simhashes[:count], fingerprint)
+        distances[~live] = SIMHASH_BITS + 1
+        row = int(np.argmin(distances))
+        return row if distances[row] <= max_distance else None
+
+    def compute_simhashes(self, documents: List[Dict[str, Any]]):
+        """Calcule les empreintes des lignes 0..len(documents) (activation des quasi-doublons)"""
+        for row, document in enumerate(documents):
+            self.simhashes[row] = simhash(document.get("content", ""))
+
+    def shared_rows(self, count: int) -> np.ndarray:
+        return np.flatnonzero(self.shared[:count])
+
+    def to_arrays(self, live: np.ndarray) -> Dict[str, np.ndarray]:
+        """Tableaux à persister pour une base dense ne contenant que les lignes live"""
+        count = live.size
+        hashes = [digest or "" for digest, keep in zip(self.content_hashes[:count], live) if keep]
+        return {
+            "content_hashes": np.array(hashes, dtype="U32"),
+            "simhashes": self.simhashes[:count][live],
+            "shared": self.shared[:count][live],
+        }
+
+    def load_arrays(self, arrays: Dict[str, np.ndarray]):
+        self.__init__()
+        hashes = arrays["content_hashes"].tolist()
+        self.reserve(len(hashes))
+        self.simhashes[:len(hashes)] = arrays["simhashes"]
+        self.shared[:len(hashes)] = arrays["shared"]
+        for row, digest in enumerate(hashes):
+            self.content_hashes[row] = digest
+            self._rows_by_hash.setdefault(digest, row)
+
+    def clear(self):
+        self.__init__()
@@ -0,0 +1,221 @@
+# ==============================================================================
+# FILE: app/database/document_store.py - Stockage des documents indexé par offsets
+# ==============================================================================
+
+import logging
+import mmap
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.database.index_storage import (
+    BLOCKS_FILE, BLOCK_OFFSETS_FILE, DOCUMENTS_FILE, DOCUMENTS_PER_BLOCK, OFFSETS_FILE,
+    decode_document, decompress_block, encode_document
+)
+from app.utils.lru_cache import LRUCache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_BYTES = 32 * 1024 * 1024
+
+
+class DocumentStore:
+    """
+    Dictionnaire id -> document adossé à un fichier mappé en mémoire
+
+    Les documents de la base sur disque sont stockés par blocs compressés (zlib)
+    et lus à la demande : seul le bloc contenant un document demandé est
+    décompressé, puis gardé dans un cache LRU borné en octets. Les documents
+    ajoutés depuis le dernier enregistrement restent en mémoire.
+
+    Une suppression ne rend pas le document illisible pour les vues de
+    recherche publiées avant elle (lookup) : seul le dictionnaire l'oublie.
+
+    Les documents en mémoire (ajoutés, ou ajoutés puis supprimés) ne sont
+    libérés qu'à la réécriture de la base : le vector store lance une
+    compaction quand pending_count atteint sa limite.
+    """
+
+    def __init__(self, cache_bytes: int = DEFAULT_CACHE_BYTES):
+        self._base_rows: Dict[str, int] = {}
+        self._offsets: Optional[np.ndarray] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._file = None
+        self._compressed = True
+        self._documents_per_block = DOCUMENTS_PER_BLOCK
+
+        # Blocs décompressés récemment lus : numéro de bloc -> documents sérialisés
+        self._cache = LRUCache(cache_bytes)
+
+        self._added: Dict[str, Dict[str, Any]] = {}
+        self._removed = set()
+        # Documents ajoutés puis supprimés, gardés jusqu'à la réécriture de la base
+        self._retired: Dict[str, Dict[str, Any]] = {}
+
+    def open(self, directory: str, document_ids: List[str], manifest: Optional[Dict[str, Any]] = None):
+        """Attache la base sur disque (remplace tout contenu en mémoire)"""
+        self.close()
+
+        # Les bases au format 1 (non compressées) restent lisibles jusqu'à réécriture
+        manifest = manifest or {}
+        self._compressed = manifest.get("format_version", 2) >= 2
+        self._documents_per_block = manifest.get("documents_per_block", DOCUMENTS_PER_BLOCK)
+        data_file, offsets_file = (
+            (BLOCKS_FILE, BLOCK_OFFSETS_FILE) if self._compressed else (DOCUMENTS_FILE, OFFSETS_FILE)
+        )
+
+        self._offsets = np.load(os.path.join(directory, offsets_file), mmap_mode="r")
+        self._base_rows = {doc_id: row for row, doc_id in enumerate(document_ids)}
+
+        path = os.path.join(directory, data_file)
+        if os.path.getsize(path) > 0:
+            self._file = open(path, "rb")
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self):
+        """Libère le mapping et vide le contenu"""
+        if self._mmap is not None:
+            self._mmap.close()
+        if self._file is not None:
+            self._file.close()
+        self._mmap = None
+        self._file = None
+        self._offsets = None
+        self._base_rows = {}
+        self._cache.clear()
+        self._added = {}
+        self._removed = set()
+        self._retired = {}
+
+    def raw(self, doc_id: str) -> bytes:
+        """Retourne le document sérialisé (sans désérialisation pour la base)"""
+        if doc_id in self._added:
+            return encode_document(self._added[doc_id])
+        if doc_id in self._removed or doc_id not in self._base_rows:
+            raise KeyError(doc_id)
+        return self._raw_base(self._base_rows[doc_id])
+
+    def _raw_base(self, row: int) -> bytes:
+        """Document sérialisé d'une ligne de la base sur disque"""
+        if not self._compressed:
+            start, end = int(self._offsets[row]), int(self._offsets[row + 1])
+            # Le dernier octet est le séparateur de ligne
+            return self._mmap[start:end - 1]
+
+        block_number, position = divmod(row, self._documents_per_block)
+        block = self._cache.get(block_number)
+        if block is None:
+            block = self._read_block(block_number)
+            self._cache.put(block_number, block, sum(len(raw) for raw in block))
+        return block[position]
+
+    def raw_many(self, doc_ids: List[str]) -> List[bytes]:
+        """
+        Documents sérialisés pour une liste d'IDs (réécriture de la base)
+
+        Les blocs sont lus sans passer par le cache LRU pour ne pas en évincer
+        les documents fréquemment demandés.
+        """
+        raw_documents = []
+        current_number, current_block = -1, None
+        for doc_id in doc_ids:
+            row = self._base_rows.get(doc_id)
+            if not self._compressed or doc_id in self._added or row is None or doc_id in self._removed:
+                raw_documents.append(self.raw(doc_id))
+                continue
+
+            block_number, position = divmod(row, self._documents_per_block)
+            if block_number != current_number:
+                current_number, current_block = block_number, self._read_block(block_number)
+            raw_documents.append(current_block[position])
+        return raw_documents
+
+    def _read_block(self, block_number: int) -> List[bytes]:
+        start, end = int(self._offsets[block_number]), int(self._offsets[block_number + 1])
+        return decompress_block(self._mmap[start:end])
+
+    def __getitem__(self, doc_id: str) -> Dict[str, Any]:
+        if doc_id in self._added:
+            return self._added[doc_id]
+        return decode_document(self.raw(doc_id))
+
+    def lookup(self, doc_id: str) -> Dict[str, Any]:
+        """Document, y compris s'il a été supprimé depuis (lecture par une vue de recherche)"""
+        document = self._added.get(doc_id) or self._retired.get(doc_id)
+        if document is not None:
+            return document
+        if doc_id not in self._base_rows:
+            raise KeyError(doc_id)
+        return decode_document(self._raw_base(self._base_rows[doc_id]))
+
+    def get(self, doc_id: str, default: Any = None) -> Any:
+        try:
+            return self[doc_id]
+        except KeyError:
+            return default
+
+    def __setitem__(self, doc_id: str, document: Dict[str, Any]):
+        self._removed.discard(doc_id)
+        self._added[doc_id] = document
+        self._retired.pop(doc_id, None)
+
+    def __delitem__(self, doc_id: str):
+        if doc_id not in self:
+            raise KeyError(doc_id)
+        if doc_id in self._added:
+            # Gardé lisible avant d'être retiré (aucune fenêtre où il serait introuvable)
+            self._retired[doc_id] = self._added[doc_id]
+            del self._added[doc_id]
+        if doc_id in self._base_rows:
+            self._removed.add(doc_id)
+
+    def __contains__(self, doc_id: object) -> bool:
+        if doc_id in self._added:
+            return True
+        return doc_id in self._base_rows and doc_id not in self._removed
+
+    def __len__(self) -> int:
+        base = len(self._base_rows) - len(self._removed)
+        return base + sum(1 for doc_id in self._added if doc_id not in self._base_rows)
+
+    def __iter__(self) -> Iterator[str]:
+        for doc_id in self._base_rows:
+            if doc_id not in self._removed and doc_id not in self._added:
+                yield doc_id
+        yield from self._added
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        for doc_id in self:
+            yield self[doc_id]
+
+    def clear(self):
+        self.close()
+
+    @property
+    def pending_count(self) -> int:
+        """Documents gardés en mémoire jusqu'à la réécriture de la base"""
+        return len(self._added) + len(self._retired)
+
+    @property
+    def mapped_bytes(self) -> int:
+        """Taille de la base mappée (partagée entre workers)"""
+        return len(self._mmap) if self._mmap is not None else 0
+
+    @property
+    def resident_bytes(self) -> int:
+        """Estimation de la taille des documents gardés en mémoire privée (cache + ajouts)"""
+        pending = list(self._added.values()) + list(self._retired.values())
+        return self._cache.resident_bytes + sum(len(str(doc)) for doc in pending)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Statistiques du stockage des documents et de son cache"""
+        return {
+            "compressed": self._compressed,
+            "documents_per_block": self._documents_per_block if self._compressed else None,
+            "mapped_bytes": self.mapped_bytes,
+            "pending_documents": len(self._added),
+            "retired_documents": len(self._retired),
+            "resident_bytes": self.resident_bytes,
+            "cache": self._cache.get_stats(),
+        }
@@ -0,0 +1,228 @@
+# ==============================================================================
+# FILE: app/database/embedding_cache.py - Cache persistant des embeddings (sqlite)
+# ==============================================================================
+#
+# Un embedding ne dépend que du modèle, de la dimension demandée et du texte :
+# la clé est hash(modèle + dimension + contenu normalisé) et la valeur le
+# vecteur float32 brut. Le fichier sqlite (mode WAL) est partagé par tous les
+# workers uvicorn et survit aux réindexations : un chunk inchangé n'est jamais
+# renvoyé à l'API.
+#
+# La taille du fichier est bornée : au-delà de max_bytes, les entrées les moins
+# récemment lues sont supprimées (leurs pages sont réutilisées par sqlite).
+# Les dates de lecture sont accumulées en mémoire et écrites par lots (une
+# transaction toutes les ACCESS_FLUSH_KEYS clés ou ACCESS_FLUSH_SECONDS
+# secondes, et avant chaque éviction) : une lecture n'écrit rien dans le fichier.
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.database.dedup_index import normalize_content
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Une éviction ramène le cache à cette fraction de max_bytes
+EVICTION_TARGET = 0.9
+# Nombre maximal de paramètres d'une requête sqlite (SQLITE_MAX_VARIABLE_NUMBER)
+_SQL_BATCH = 500
+# Écriture groupée des dates de lecture
+ACCESS_FLUSH_KEYS = 1024
+ACCESS_FLUSH_SECONDS = 60.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    model TEXT NOT NULL,
+    vector BLOB NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS embeddings_accessed_at ON embeddings (accessed_at);
+"""
+
+
+def cache_key(model: str, text: str) -> str:
+    """Clé d'un embedding (modèle et dimension inclus dans model)"""
+    key = f"{model}\x00{normalize_content(text)}"
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=20).hexdigest()
+
+
+class EmbeddingCache:
+    """Cache clé -> vecteur float32 dans un fichier sqlite partagé entre processus"""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Args:
+            path: Fichier sqlite (créé au besoin)
+            max_bytes: Taille maximale des données du cache
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()  # Une connexion par thread
+        self._connections: List[sqlite3.Connection] = []  # Toutes les connexions ouvertes (fermeture)
+        self._lock = threading.Lock()
+
+        # Dates de lecture pas encore écrites (clé -> date)
+        self._pending_access: Dict[str, float] = {}
+        self._last_access_flush = time.monotonic()
+
+        # Compteurs de ce worker
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connection().executescript(_SCHEMA)
+        logger.info(f"🗄️ Cache d'embeddings: {path}")
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # check_same_thread=False : close() ferme aussi les connexions des autres threads
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+            with self._lock:
+                self._connections.append(connection)
+        return connection
+
+    def get_many(self, keys: Sequence[str]) -> Dict[str, List[float]]:
+        """Embeddings présents dans le cache (les entrées lues sont marquées récentes)"""
+        connection = self._connection()
+        found: Dict[str, List[float]] = {}
+        for i in range(0, len(keys), _SQL_BATCH):
+            batch = list(keys[i:i + _SQL_BATCH])
+            placeholders = ",".join("?" * len(batch))
+            rows = connection.execute(
+                f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+            ).fetchall()
+            for key, blob in rows:
+                found[key] = np.frombuffer(blob, dtype=np.float32).tolist()
+
+        now = time.time()
+        with self._lock:
+            self.hits += len(found)
+            self.misses += len(set(keys)) - len(found)
+            self._pending_access.update(dict.fromkeys(found, now))
+            due = (len(self._pending_access) >= ACCESS_FLUSH_KEYS
+                   or time.monotonic() - self._last_access_flush >= ACCESS_FLUSH_SECONDS)
+        if due:
+            self.flush_access_times(connection)
+        return found
+
+    def flush_access_times(self, connection: Optional[sqlite3.Connection] = None):
+        """Écrit les dates de lecture accumulées (une transaction)"""
+        with self._lock:
+            pending, self._pending_access = self._pending_access, {}
+            self._last_access_flush = time.monotonic()
+        if not pending:
+            return
+        connection = connection or self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "UPDATE embeddings SET accessed_at = MAX(accessed_at, ?) WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in pending.items()]
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+
+    def put_many(self, model: str, items: Dict[str, List[float]]):
+        """Enregistre des embeddings puis évince les plus anciens au-delà de max_bytes"""
+        if not items:
+            return
+        now = time.time()
+        connection = self._connection()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            connection.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, model, vector, accessed_at) VALUES (?, ?, ?, ?)",
+                [(key, model, np.asarray(vector, dtype=np.float32).tobytes(), now) for key, vector in items.items()]
+            )
+            connection.execute("COMMIT")
+        except Exception:
+            connection.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self.writes += len(items)
+        self._evict(connection)
+
+    def _used_bytes(self, connection: sqlite3.Connection) -> int:
+        """Taille des pages utilisées (hors pages libres réutilisables)"""
+        page_size = connection.execute("PRAGMA page_size").fetchone()[0]
+        page_count = connection.execute("PRAGMA page_count").fetchone()[0]
+        free_pages = connection.execute("PRAGMA freelist_count").fetchone()[0]
+        return (page_count - free_pages) * page_size
+
+    def _evict(self, connection: sqlite3.Connection):
+        used = self._used_bytes(connection)
+        if used <= self.max_bytes:
+            return
+        # Les entrées lues récemment ne doivent pas paraître anciennes
+        self.flush_access_times(connection)
+        # Nombre d'entrées à supprimer estimé d'après la taille moyenne d'une entrée
+        count = connection.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        if not count:
+            return
+        limit = max(1, int((used - self.max_bytes * EVICTION_TARGET) * count / used) + 1)
+        deleted = connection.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY accessed_at LIMIT ?)", (limit,)
+        ).rowcount
+        with self._lock:
+            self.evictions += deleted
+        logger.info(f"🗑️ Cache d'embeddings: {deleted} entrées évincées")
+
+    def __len__(self) -> int:
+        return self._connection().execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    def clear(self, model: Optional[str] = None):
+        """Vide le cache (ou les entrées d'un modèle)"""
+        if model is None:
+            self._connection().execute("DELETE FROM embeddings")
+        else:
+            self._connection().execute("DELETE FROM embeddings WHERE model = ?", (model,))
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return round(self.hits / total, 4) if total else 0.0
+
+    def get_stats(self) -> Dict[str, Any]:
+        connection = self._connection()
+        return {
+            "path": self.path,
+            "entries": len(self),
+            "used_bytes": self._used_bytes(connection),
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_ratio": self.hit_ratio,
+        }
+
+    def close(self):
+        """Écrit les dates de lecture en attente puis ferme les connexions de tous les threads"""
+        try:
+            self.flush_access_times()
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Dates de lecture du cache non écrites: {e}")
+        with self._lock:
+            connections, self._connections = self._connections, []
+        for connection in connections:
+            connection.close()
+        self._local = threading.local()
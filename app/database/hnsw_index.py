@@ -0,0 +1,272 @@
+# ==============================================================================
+# FILE: app/database/hnsw_index.py - Index HNSW (graphe navigable) en Python/NumPy
+# ==============================================================================
+#
+# Graphe "Hierarchical Navigable Small World" sur les lignes du vector store
+# (vecteurs normalisés : similarité = produit scalaire). Les vecteurs ne sont
+# pas copiés : chaque appel reçoit la matrice courante du store.
+#
+#   niveau 0      matrice (capacité, 2·M) de voisins, -1 = emplacement libre
+#   niveaux >= 1  dictionnaires ligne -> voisins (peu de nœuds par niveau)
+#
+# Les lignes supprimées restent dans le graphe pour la navigation ; le store
+# les exclut des résultats et les retire lors de la compaction (remap).
+#
+# Une recherche peut parcourir le graphe pendant des insertions : elle reçoit
+# les seules lignes visibles (vectors[:count]) et ignore les nœuds au-delà.
+
+import heapq
+import logging
+import math
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "hnsw"
+
+
+class HNSWIndex:
+    """Index HNSW incrémental"""
+
+    def __init__(self, m: int = 16, ef_construction: int = 100, ef_search: int = 64, seed: int = 0):
+        self.m = m
+        self.m0 = 2 * m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+        self._level_factor = 1.0 / math.log(max(m, 2))
+        self._rng = np.random.default_rng(seed)
+
+        self.count = 0  # Lignes 0..count-1 insérées
+        self.levels = np.zeros(0, dtype=np.int8)
+        self.layer0 = np.full((0, self.m0), -1, dtype=np.int32)
+        self.upper: List[Dict[int, np.ndarray]] = []
+        self.entry_point = -1
+        self.max_level = -1
+
+    @property
+    def is_built(self) -> bool:
+        return self.entry_point >= 0
+
+    def clear(self):
+        self.__init__(self.m, self.ef_construction, self.ef_search)
+
+    # ------------------------------------------------------------------
+    # Construction
+    # ------------------------------------------------------------------
+
+    def add(self, vectors: np.ndarray, end_row: int):
+        """Insère les lignes count..end_row-1 de la matrice vectors"""
+        if end_row <= self.count:
+            return
+        self._reserve(end_row)
+        for row in range(self.count, end_row):
+            self._insert(row, vectors)
+        self.count = end_row
+
+    def _reserve(self, capacity: int):
+        if capacity <= self.layer0.shape[0]:
+            return
+        new_capacity = max(capacity, 2 * self.layer0.shape[0], 1024)
+        layer0 = np.full((new_capacity, self.m0), -1, dtype=np.int32)
+        layer0[:self.layer0.shape[0]] = self.layer0
+        levels = np.zeros(new_capacity, dtype=np.int8)
+        levels[:self.levels.shape[0]] = self.levels
+        self.layer0, self.levels = layer0, levels
+
+    def _random_level(self) -> int:
+        return min(int(-math.log(1.0 - self._rng.random()) * self._level_factor), 16)
+
+    def _insert(self, row: int, vectors: np.ndarray):
+        query = vectors[row]
+        level = self._random_level()
+        self.levels[row] = level
+        while len(self.upper) < level:
+            self.upper.append({})
+        for l in range(1, level + 1):
+            self.upper[l - 1][row] = np.zeros(0, dtype=np.int32)
+
+        if self.entry_point < 0:
+            self.entry_point, self.max_level = row, level
+            return
+
+        entry = [self.entry_point]
+        for l in range(self.max_level, level, -1):
+            entry = [self._search_layer(query, entry, 1, l, vectors)[0][1]]
+
+        for l in range(min(level, self.max_level), -1, -1):
+            found = self._search_layer(query, entry, self.ef_construction, l, vectors)
+            limit = self.m0 if l == 0 else self.m
+            neighbors = self._select_neighbors(found, self.m, vectors)
+            self._set_neighbors(row, l, neighbors)
+
+            for neighbor in neighbors:
+                links = np.append(self._neighbors(neighbor, l), row)
+                if links.size > limit:
+                    sims = vectors[links] @ vectors[neighbor]
+                    links = self._select_neighbors(list(zip(sims, links)), limit, vectors)
+                self._set_neighbors(neighbor, l, links)
+
+            entry = [node for _, node in found]
+
+        if level > self.max_level:
+            self.entry_point, self.max_level = row, level
+
+    def _select_neighbors(self, candidates: List[Tuple[float, int]], limit: int,
+                          vectors: np.ndarray) -> np.ndarray:
+        """Heuristique HNSW : garder les candidats plus proches de la cible que des voisins retenus"""
+        ordered = sorted(candidates, key=lambda item: -item[0])
+        nodes = np.array([node for _, node in ordered], dtype=np.int32)
+        if nodes.size <= limit:
+            return nodes
+
+        sims = np.array([sim for sim, _ in ordered], dtype=np.float32)
+        candidate_vectors = vectors[nodes]
+        pairwise = candidate_vectors @ candidate_vectors.T
+
+        selected: List[int] = []
+        for i in range(nodes.size):
+            if len(selected) >= limit:
+                break
+            if selected and pairwise[i, selected].max() > sims[i]:
+                continue
+            selected.append(i)
+
+        # Compléter avec les plus proches si l'heuristique est trop sélective
+        if len(selected) < limit:
+            chosen = set(selected)
+            selected.extend([i for i in range(nodes.size) if i not in chosen][:limit - len(selected)])
+        return nodes[selected]
+
+    def _neighbors(self, row: int, level: int) -> np.ndarray:
+        if level == 0:
+            links = self.layer0[row]
+            return links[links >= 0]
+        return self.upper[level - 1].get(row, np.zeros(0, dtype=np.int32))
+
+    def _set_neighbors(self, row: int, level: int, neighbors: np.ndarray):
+        if level == 0:
+            # Ligne remplacée d'un bloc (jamais vide pour une recherche concurrente)
+            links = np.full(self.m0, -1, dtype=np.int32)
+            links[:neighbors.size] = neighbors
+            self.layer0[row] = links
+        else:
+            self.upper[level - 1][row] = np.asarray(neighbors, dtype=np.int32)
+
+    # ------------------------------------------------------------------
+    # Recherche
+    # ------------------------------------------------------------------
+
+    def _search_layer(self, query: np.ndarray, entry: List[int], ef: int, level: int,
+                      vectors: np.ndarray) -> List[Tuple[float, int]]:
+        """Recherche gloutonne dans un niveau ; retourne [(similarité, ligne)] décroissant"""
+        limit = vectors.shape[0]
+        visited = set(entry)
+        entry_sims = vectors[entry] @ query
+        candidates = [(-float(sim), node) for sim, node in zip(entry_sims, entry)]
+        results = [(float(sim), node) for sim, node in zip(entry_sims, entry)]
+        heapq.heapify(candidates)
+        heapq.heapify(results)
+        while len(results) > ef:
+            heapq.heappop(results)
+
+        while candidates:
+            neg_sim, node = heapq.heappop(candidates)
+            if -neg_sim < results[0][0] and len(results) >= ef:
+                break
+
+            neighbors = [n for n in self._neighbors(node, level).tolist() if n < limit and n not in visited]
+            if not neighbors:
+                continue
+            visited.update(neighbors)
+
+            for sim, neighbor in zip((vectors[neighbors] @ query).tolist(), neighbors):
+                if len(results) < ef or sim > results[0][0]:
+                    heapq.heappush(candidates, (-sim, neighbor))
+                    heapq.heappush(results, (sim, neighbor))
+                    if len(results) > ef:
+                        heapq.heappop(results)
+
+        return sorted(results, key=lambda item: -item[0])
+
+    def search(self, query: np.ndarray, vectors: np.ndarray, k: int,
+               ef: Optional[int] = None) -> np.ndarray:
+        """
+        Lignes des ~ef plus proches voisins de la requête (au moins k demandés)
+
+        Seules les lignes de vectors sont visitées (vue de recherche antérieure
+        à des insertions).
+        """
+        if not self.is_built or vectors.shape[0] == 0:
+            return np.zeros(0, dtype=np.int64)
+
+        ef = max(ef or self.ef_search, k)
+        entry_point, max_level = self.entry_point, self.max_level
+        if entry_point >= vectors.shape[0]:
+            # Point d'entrée inséré après la vue : nœud de plus haut niveau parmi les lignes visibles
+            entry_point = int(np.argmax(self.levels[:vectors.shape[0]]))
+            max_level = int(self.levels[entry_point])
+        entry = [entry_point]
+        for l in range(max_level, 0, -1):
+            entry = [self._search_layer(query, entry, 1, l, vectors)[0][1]]
+        found = self._search_layer(query, entry, ef, 0, vectors)
+        return np.array([node for _, node in found], dtype=np.int64)
+
+    # ------------------------------------------------------------------
+    # Persistance
+    # ------------------------------------------------------------------
+
+    def to_arrays(self, live: np.ndarray) -> Dict[str, np.ndarray]:
+        """
+        Tableaux à persister pour une base dense ne contenant que les lignes live
+
+        Les lignes supprimées sont retirées et les voisins renumérotés.
+        """
+        count = live.size
+        new_ids = np.where(live, np.cumsum(live) - 1, -1).astype(np.int32)
+
+        def remap(links: np.ndarray) -> np.ndarray:
+            mapped = np.where(links >= 0, new_ids[np.maximum(links, 0)], -1)
+            # Regrouper les voisins valides en début de ligne
+            order = np.argsort(mapped < 0, axis=1, kind="stable")
+            return np.take_along_axis(mapped, order, axis=1).astype(np.int32)
+
+        levels = self.levels[:count][live]
+        entry_point = int(new_ids[self.entry_point]) if 0 <= self.entry_point < count else -1
+        if entry_point < 0 and levels.size:
+            entry_point = int(np.argmax(levels))
+
+        arrays = {
+            "params": np.array([self.m, self.ef_construction, self.ef_search, entry_point,
+                                int(levels.max()) if levels.size else -1], dtype=np.int64),
+            "levels": levels,
+            "layer0": remap(self.layer0[:count][live]) if count else self.layer0[:0],
+        }
+        for l, layer in enumerate(self.upper, start=1):
+            nodes = [row for row in layer if row < count and live[row]]
+            links = np.full((len(nodes), self.m), -1, dtype=np.int32)
+            for i, row in enumerate(nodes):
+                links[i, :layer[row].size] = layer[row][:self.m]
+            arrays[f"upper{l}_nodes"] = new_ids[np.array(nodes, dtype=np.int64)] if nodes else np.zeros(0, dtype=np.int32)
+            arrays[f"upper{l}_links"] = remap(links) if nodes else links
+        return arrays
+
+    def load_arrays(self, arrays: Dict[str, np.ndarray]):
+        m, ef_construction, ef_search, entry_point, max_level = arrays["params"].tolist()
+        self.__init__(int(m), self.ef_construction, self.ef_search)
+        self.levels = arrays["levels"].astype(np.int8)
+        self.layer0 = arrays["layer0"].astype(np.int32)
+        self.count = self.levels.shape[0]
+        self.entry_point = int(entry_point)
+        self.max_level = int(max_level)
+
+        l = 1
+        while f"upper{l}_nodes" in arrays:
+            nodes = arrays[f"upper{l}_nodes"].tolist()
+            links = arrays[f"upper{l}_links"]
+            self.upper.append({
+                node: row_links[row_links >= 0].astype(np.int32)
+                for node, row_links in zip(nodes, links)
+            })
+            l += 1
@@ -0,0 +1,434 @@
+# ==============================================================================
+# FILE: app/database/index_storage.py - Format disque versionné du vector store
+# ==============================================================================
+#
+# Une collection est une suite de snapshots ({persist_directory}/{collection_name}/) :
+#
+#   CURRENT               nom du snapshot actif (remplacé atomiquement par os.replace)
+#   v000001/, v000002/... snapshots ; une réindexation construit le suivant à côté
+#
+# Organisation d'un snapshot :
+#
+#   BASE                  nom de la génération de base active (remplacé atomiquement)
+#   g000001/, g000002/... générations : une base complète par compaction
+#   mutations.log         journal des mutations postérieures (voir mutation_log.py)
+#
+# Organisation d'une génération (base dense) :
+#
+#   manifest.json         version du format, nombre de lignes, dimension, seq du journal
+#   vectors.npy           matrice float32 normalisée (ouverte avec np.memmap)
+#   ids.npy               identifiants des documents, dans l'ordre des lignes
+#   documents.blocks      documents JSON par blocs de DOCUMENTS_PER_BLOCK, compressés zlib
+#   documents.blocks.offsets.npy  offsets int64 (blocs + 1) des blocs compressés
+#   columns.npz           métadonnées en colonnes (voir metadata_index.py)
+#   <index>.npz           index annexes optionnels (ivf.npz, hnsw.npz, sq8.npz)
+#
+# Une compaction écrit une génération complète dans un répertoire neuf, puis
+# bascule BASE (un seul os.replace) avant de tronquer le journal : après un
+# arrêt brutal, la base ouverte et le seq du journal qu'elle inclut sont
+# toujours cohérents (ancienne base + journal complet, ou nouvelle base +
+# enregistrements postérieurs). La génération précédente est conservée : un
+# worker qui l'a déjà mappée continue de la lire.
+#
+# Les workers d'un même conteneur partagent le snapshot : le fichier LOCK
+# (fcntl.flock, voir CollectionLock) sérialise les ajouts au journal, sa
+# troncature, la réservation et la bascule des générations, ainsi que
+# l'ouverture des fichiers d'une base (aucune génération n'est supprimée
+# pendant qu'un worker l'ouvre). Une génération en cours d'écriture contient
+# le PID de son auteur (WRITER) : le nettoyage la laisse en place.
+#
+# Sans fichier BASE (bases écrites avant les générations), la base est lue
+# directement dans le répertoire du snapshot.
+#
+# Version 1 : documents non compressés (documents.jsonl + documents.offsets.npy,
+# un offset par document), toujours lisible et réécrite en version 2.
+
+import fcntl
+import json
+import logging
+import os
+import shutil
+import threading
+import zlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+SUPPORTED_FORMAT_VERSIONS = (1, 2)
+
+MANIFEST_FILE = "manifest.json"
+VECTORS_FILE = "vectors.npy"
+IDS_FILE = "ids.npy"
+BLOCKS_FILE = "documents.blocks"
+BLOCK_OFFSETS_FILE = "documents.blocks.offsets.npy"
+COLUMNS_FILE = "columns.npz"
+
+CURRENT_FILE = "CURRENT"
+SNAPSHOT_PREFIX = "v"
+BASE_FILE = "BASE"
+GENERATION_PREFIX = "g"
+LOCK_FILE = "LOCK"
+WRITER_FILE = "WRITER"  # PID du processus qui écrit une génération réservée
+
+# Fichiers d'une base écrite directement dans le snapshot (avant les générations)
+LEGACY_BASE_FILES = (
+    MANIFEST_FILE, VECTORS_FILE, IDS_FILE, BLOCKS_FILE, BLOCK_OFFSETS_FILE, COLUMNS_FILE,
+    "ivf.npz", "hnsw.npz", "sq8.npz", "dedup.npz"
+)
+
+# Format version 1 (documents non compressés)
+DOCUMENTS_FILE = "documents.jsonl"
+OFFSETS_FILE = "documents.offsets.npy"
+
+# Documents par bloc compressé : un accès décompresse un bloc entier
+DOCUMENTS_PER_BLOCK = 32
+COMPRESSION_LEVEL = 6
+
+
+def encode_document(document: Dict[str, Any]) -> bytes:
+    """Sérialise un document pour le stockage indexé par offsets"""
+    return json.dumps(document, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def decode_document(raw: bytes) -> Dict[str, Any]:
+    """Désérialise un document lu depuis le stockage"""
+    return json.loads(raw.decode("utf-8"))
+
+
+def compress_block(raw_documents: List[bytes]) -> bytes:
+    """Compresse un bloc de documents sérialisés (un par ligne)"""
+    return zlib.compress(b"\n".join(raw_documents), COMPRESSION_LEVEL)
+
+
+def decompress_block(data: bytes) -> List[bytes]:
+    """Décompresse un bloc en liste de documents sérialisés"""
+    return zlib.decompress(data).split(b"\n")
+
+
+def _replace_atomically(path: str, write_func):
+    """Écrit dans un fichier temporaire puis le renomme atomiquement"""
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        write_func(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def write_index(directory: str,
+                document_ids: List[str],
+                vectors: np.ndarray,
+                raw_documents: Iterable[bytes],
+                metadata: Dict[str, Any],
+                log_sequence: int = 0,
+                columns: Optional[Dict[str, np.ndarray]] = None,
+                indexes: Optional[Dict[str, Dict[str, np.ndarray]]] = None):
+    """
+    Écrit une collection complète au format versionné
+
+    Args:
+        directory: Répertoire de la collection
+        document_ids: IDs dans l'ordre des lignes de la matrice
+        vectors: Matrice float32 normalisée (une ligne par document)
+        raw_documents: Documents sérialisés, dans le même ordre
+        metadata: Métadonnées de la collection
+        log_sequence: Dernier enregistrement du journal inclus dans cette base
+        columns: Colonnes de métadonnées alignées sur les lignes (optionnel)
+        indexes: Index annexes {nom: tableaux} construits sur ces lignes (optionnel)
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    block_count = -(-len(document_ids) // DOCUMENTS_PER_BLOCK)
+    block_offsets = np.zeros(block_count + 1, dtype=np.int64)
+
+    def write_blocks(f):
+        position = 0
+        block: List[bytes] = []
+        written = 0
+        for raw in raw_documents:
+            block.append(raw)
+            if len(block) == DOCUMENTS_PER_BLOCK:
+                position += f.write(compress_block(block))
+                written += 1
+                block_offsets[written] = position
+                block = []
+        if block:
+            position += f.write(compress_block(block))
+            block_offsets[written + 1] = position
+
+    _replace_atomically(os.path.join(directory, BLOCKS_FILE), write_blocks)
+    _replace_atomically(os.path.join(directory, BLOCK_OFFSETS_FILE), lambda f: np.save(f, block_offsets))
+    _replace_atomically(os.path.join(directory, VECTORS_FILE), lambda f: np.save(f, vectors))
+    _replace_atomically(
+        os.path.join(directory, IDS_FILE),
+        lambda f: np.save(f, np.array(document_ids, dtype=str))
+    )
+    if columns is not None:
+        _replace_atomically(os.path.join(directory, COLUMNS_FILE), lambda f: np.savez(f, **columns))
+    for name, arrays in (indexes or {}).items():
+        _replace_atomically(os.path.join(directory, f"{name}.npz"), lambda f: np.savez(f, **arrays))
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "count": len(document_ids),
+        "dimension": int(vectors.shape[1]) if vectors.ndim == 2 else 0,
+        "log_sequence": log_sequence,
+        "indexes": sorted(indexes or {}),
+        "documents_per_block": DOCUMENTS_PER_BLOCK,
+        "written_at": datetime.now().isoformat(),
+        "metadata": metadata
+    }
+    _replace_atomically(
+        os.path.join(directory, MANIFEST_FILE),
+        lambda f: f.write(json.dumps(manifest, indent=2, ensure_ascii=False).encode("utf-8"))
+    )
+
+    # Fichiers de la version 1 remplacés par les blocs compressés
+    for legacy_file in (DOCUMENTS_FILE, OFFSETS_FILE):
+        legacy_path = os.path.join(directory, legacy_file)
+        if os.path.exists(legacy_path):
+            os.remove(legacy_path)
+
+
+def read_base(snapshot_dir: str) -> Optional[str]:
+    """Nom de la génération de base active (None sans fichier BASE)"""
+    path = os.path.join(snapshot_dir, BASE_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def base_directory(snapshot_dir: str) -> str:
+    """Répertoire de la base active d'un snapshot (le snapshot lui-même sans fichier BASE)"""
+    generation = read_base(snapshot_dir)
+    return os.path.join(snapshot_dir, generation) if generation else snapshot_dir
+
+
+def list_generations(snapshot_dir: str) -> List[str]:
+    """Générations présentes dans un snapshot, de la plus ancienne à la plus récente"""
+    if not os.path.isdir(snapshot_dir):
+        return []
+    return sorted(
+        name for name in os.listdir(snapshot_dir)
+        if name.startswith(GENERATION_PREFIX) and name[len(GENERATION_PREFIX):].isdigit()
+        and os.path.isdir(os.path.join(snapshot_dir, name))
+    )
+
+
+def write_generation(snapshot_dir: str, *args: Any,
+                     lock: Optional["CollectionLock"] = None, **kwargs: Any) -> Optional[str]:
+    """
+    Écrit une base complète dans une nouvelle génération puis la rend active
+
+    Mêmes arguments que write_index. Le numéro de la génération est réservé
+    sous le verrou de la collection, l'écriture se fait hors verrou, puis BASE
+    n'est basculé que si la génération est complète et que la base active
+    n'inclut pas déjà un journal plus récent. Les générations antérieures,
+    hormis la précédente et celles en cours d'écriture par un autre processus
+    vivant, sont supprimées (dont une génération interrompue).
+
+    Returns:
+        Nom de la génération écrite (None si elle n'a pas été activée)
+    """
+    lock = lock or CollectionLock(snapshot_dir)
+    with lock:
+        generations = list_generations(snapshot_dir)
+        number = int(generations[-1][len(GENERATION_PREFIX):]) + 1 if generations else 1
+        generation = f"{GENERATION_PREFIX}{number:06d}"
+        os.makedirs(os.path.join(snapshot_dir, generation))
+        with open(os.path.join(snapshot_dir, generation, WRITER_FILE), "w") as f:
+            f.write(str(os.getpid()))
+
+    try:
+        write_index(os.path.join(snapshot_dir, generation), *args, **kwargs)
+    except BaseException:
+        shutil.rmtree(os.path.join(snapshot_dir, generation), ignore_errors=True)
+        raise
+
+    with lock:
+        writer_path = os.path.join(snapshot_dir, generation, WRITER_FILE)
+        if os.path.exists(writer_path):
+            os.remove(writer_path)
+        previous = read_base(snapshot_dir)
+        active = read_manifest(base_directory(snapshot_dir))
+        newer_active = active is not None and active.get("log_sequence", 0) > kwargs.get("log_sequence", 0)
+        if newer_active or not _is_complete(os.path.join(snapshot_dir, generation)):
+            shutil.rmtree(os.path.join(snapshot_dir, generation), ignore_errors=True)
+            return None
+        _replace_atomically(os.path.join(snapshot_dir, BASE_FILE), lambda f: f.write(generation.encode("utf-8")))
+
+        for name in list_generations(snapshot_dir):
+            if name != previous and name < generation and not _being_written(os.path.join(snapshot_dir, name)):
+                shutil.rmtree(os.path.join(snapshot_dir, name), ignore_errors=True)
+        if previous is not None:
+            # La base d'avant les générations n'est plus la précédente
+            for legacy_file in LEGACY_BASE_FILES + (DOCUMENTS_FILE, OFFSETS_FILE):
+                legacy_path = os.path.join(snapshot_dir, legacy_file)
+                if os.path.exists(legacy_path):
+                    os.remove(legacy_path)
+    return generation
+
+
+def _is_complete(directory: str) -> bool:
+    """Génération entièrement présente (fichiers annoncés par son manifeste)"""
+    manifest = read_manifest(directory)
+    if manifest is None:
+        return False
+    names = [VECTORS_FILE, IDS_FILE, BLOCKS_FILE, BLOCK_OFFSETS_FILE]
+    names += [f"{name}.npz" for name in manifest.get("indexes", [])]
+    return all(os.path.exists(os.path.join(directory, name)) for name in names)
+
+
+def _being_written(directory: str) -> bool:
+    """Génération réservée par un processus toujours en vie (écriture en cours)"""
+    try:
+        with open(os.path.join(directory, WRITER_FILE), "r") as f:
+            pid = int(f.read().strip())
+    except (OSError, ValueError):
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class CollectionLock:
+    """
+    Verrou exclusif inter-processus (fcntl.flock) d'un snapshot de collection
+
+    Ré-entrant dans un processus ; il n'est jamais tenu pendant un await (la
+    boucle d'événements des autres workers attendrait sinon une coroutine).
+    """
+
+    def __init__(self, snapshot_dir: str):
+        self.path = os.path.join(snapshot_dir, LOCK_FILE)
+        self._thread_lock = threading.RLock()
+        self._depth = 0
+        self._file = None
+
+    def __enter__(self) -> "CollectionLock":
+        self._thread_lock.acquire()
+        if self._depth == 0:
+            try:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                self._file = open(self.path, "ab")
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            except BaseException:
+                if self._file is not None:
+                    self._file.close()
+                    self._file = None
+                self._thread_lock.release()
+                raise
+        self._depth += 1
+        return self
+
+    def __exit__(self, *exc_info: Any):
+        self._depth -= 1
+        if self._depth == 0:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+        self._thread_lock.release()
+
+
+def read_manifest(directory: str) -> Optional[Dict[str, Any]]:
+    """Lit le manifeste d'une collection (None si absent ou version incompatible)"""
+    path = os.path.join(directory, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return None
+
+    with open(path, "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+
+    version = manifest.get("format_version")
+    if version not in SUPPORTED_FORMAT_VERSIONS:
+        logger.warning(f"⚠️ Format d'index {version} non supporté (attendu: {SUPPORTED_FORMAT_VERSIONS})")
+        return None
+
+    return manifest
+
+
+def open_vectors(directory: str) -> np.ndarray:
+    """Ouvre la matrice de vecteurs en mémoire partagée (lecture seule)"""
+    return np.load(os.path.join(directory, VECTORS_FILE), mmap_mode="r")
+
+
+def open_ids(directory: str) -> List[str]:
+    """Charge les IDs des documents dans l'ordre des lignes"""
+    return np.load(os.path.join(directory, IDS_FILE)).tolist()
+
+
+def open_columns(directory: str) -> Optional[Dict[str, np.ndarray]]:
+    """Charge les colonnes de métadonnées (None si absentes)"""
+    path = os.path.join(directory, COLUMNS_FILE)
+    if not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {name: data[name] for name in data.files}
+
+
+def open_index_arrays(directory: str, name: str, manifest: Dict[str, Any]) -> Optional[Dict[str, np.ndarray]]:
+    """Charge un index annexe s'il a été écrit avec cette base"""
+    path = os.path.join(directory, f"{name}.npz")
+    if name not in manifest.get("indexes", []) or not os.path.exists(path):
+        return None
+    with np.load(path) as data:
+        return {key: data[key] for key in data.files}
+
+
+def read_current(collection_root: str) -> Optional[str]:
+    """Nom du snapshot actif (None si la collection n'en a pas encore)"""
+    path = os.path.join(collection_root, CURRENT_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read().strip() or None
+
+
+def write_current(collection_root: str, version: str):
+    """Bascule atomiquement le snapshot actif"""
+    os.makedirs(collection_root, exist_ok=True)
+    _replace_atomically(os.path.join(collection_root, CURRENT_FILE), lambda f: f.write(version.encode("utf-8")))
+
+
+def list_snapshots(collection_root: str) -> List[str]:
+    """Snapshots présents, du plus ancien au plus récent"""
+    if not os.path.isdir(collection_root):
+        return []
+    return sorted(
+        name for name in os.listdir(collection_root)
+        if name.startswith(SNAPSHOT_PREFIX) and name[len(SNAPSHOT_PREFIX):].isdigit()
+        and os.path.isdir(os.path.join(collection_root, name))
+    )
+
+
+def next_snapshot_version(collection_root: str) -> str:
+    """Nom du prochain snapshot (numérotation croissante)"""
+    snapshots = list_snapshots(collection_root)
+    number = int(snapshots[-1][len(SNAPSHOT_PREFIX):]) + 1 if snapshots else 1
+    return f"{SNAPSHOT_PREFIX}{number:06d}"
+
+
+def migrate_to_snapshot(collection_root: str, version: str):
+    """Déplace une base écrite directement dans la collection vers un snapshot"""
+    snapshot_dir = os.path.join(collection_root, version)
+    os.makedirs(snapshot_dir, exist_ok=True)
+    for name in os.listdir(collection_root):
+        path = os.path.join(collection_root, name)
+        if os.path.isfile(path) and name != CURRENT_FILE:
+            os.replace(path, os.path.join(snapshot_dir, name))
+    write_current(collection_root, version)
+
+
+def remove_snapshot(collection_root: str, version: str):
+    """Supprime un snapshot (les workers qui l'ont mappé gardent leur mapping)"""
+    shutil.rmtree(os.path.join(collection_root, version), ignore_errors=True)
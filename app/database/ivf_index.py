@@ -0,0 +1,155 @@
+# ==============================================================================
+# FILE: app/database/ivf_index.py - Index IVF (k-means) pour la recherche approchée
+# ==============================================================================
+#
+# Les vecteurs (normalisés) sont partitionnés par un k-means sphérique NumPy.
+# À la requête, seules les listes des nprobe centroïdes les plus proches sont
+# scorées. Les listes sont stockées au format CSR (offsets + lignes).
+
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.utils.similarity import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "ivf"
+
+# Nombre de points d'entraînement par liste (sous-échantillonnage du k-means)
+TRAINING_POINTS_PER_LIST = 256
+ASSIGN_BATCH_SIZE = 65536
+
+
+def default_list_count(count: int) -> int:
+    """Nombre de listes par défaut (~4·sqrt(n))"""
+    return max(1, int(4 * np.sqrt(count)))
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Centroïde le plus proche de chaque vecteur (par lots pour borner la mémoire)"""
+    assignments = np.empty(vectors.shape[0], dtype=np.int32)
+    for start in range(0, vectors.shape[0], ASSIGN_BATCH_SIZE):
+        batch = vectors[start:start + ASSIGN_BATCH_SIZE]
+        assignments[start:start + batch.shape[0]] = np.argmax(batch @ centroids.T, axis=1)
+    return assignments
+
+
+def spherical_kmeans(vectors: np.ndarray, n_lists: int, iterations: int = 20,
+                     seed: int = 0) -> np.ndarray:
+    """
+    k-means sphérique (similarité cosinus) sur des vecteurs normalisés
+
+    Returns:
+        Centroïdes normalisés (n_lists, dimension)
+    """
+    rng = np.random.default_rng(seed)
+    n_lists = min(n_lists, vectors.shape[0])
+
+    max_points = n_lists * TRAINING_POINTS_PER_LIST
+    if vectors.shape[0] > max_points:
+        vectors = vectors[rng.choice(vectors.shape[0], max_points, replace=False)]
+
+    centroids = vectors[rng.choice(vectors.shape[0], n_lists, replace=False)].astype(np.float32)
+    for _ in range(iterations):
+        assignments = _assign(vectors, centroids)
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=n_lists)
+        starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+        sums = np.zeros_like(centroids)
+        non_empty = counts > 0
+        sums[non_empty] = np.add.reduceat(vectors[order], starts[non_empty], axis=0)
+
+        # Ré-ensemencer les listes vides avec des points aléatoires
+        empty = np.flatnonzero(~non_empty)
+        if empty.size:
+            sums[empty] = vectors[rng.choice(vectors.shape[0], empty.size, replace=False)]
+
+        centroids = normalize_rows(sums).astype(np.float32)
+
+    return centroids
+
+
+class IVFIndex:
+    """Inverted file index : centroïdes + listes de lignes par centroïde"""
+
+    def __init__(self):
+        self.centroids: Optional[np.ndarray] = None
+        self.list_offsets = np.zeros(1, dtype=np.int64)
+        self.list_rows = np.zeros(0, dtype=np.int64)
+
+        # Lignes ajoutées depuis la construction (assignées sans ré-entraînement) :
+        # (lignes, listes) remplacés ensemble pour les recherches concurrentes
+        self._extra = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32))
+
+    @property
+    def is_built(self) -> bool:
+        return self.centroids is not None
+
+    @property
+    def n_lists(self) -> int:
+        return 0 if self.centroids is None else self.centroids.shape[0]
+
+    def build(self, vectors: np.ndarray, n_lists: Optional[int] = None,
+              iterations: int = 20, seed: int = 0):
+        """Entraîne les centroïdes et remplit les listes (lignes 0..n-1 de vectors)"""
+        if vectors.shape[0] == 0:
+            self.__init__()
+            return
+
+        n_lists = n_lists or default_list_count(vectors.shape[0])
+        self.centroids = spherical_kmeans(vectors, n_lists, iterations, seed)
+        assignments = _assign(vectors, self.centroids)
+        self._set_lists(np.arange(vectors.shape[0], dtype=np.int64), assignments)
+        self._extra = (np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int32))
+
+    def add(self, start_row: int, vectors: np.ndarray):
+        """Assigne de nouvelles lignes aux centroïdes existants"""
+        if not self.is_built or vectors.shape[0] == 0:
+            return
+        rows = np.arange(start_row, start_row + vectors.shape[0], dtype=np.int64)
+        extra_rows, extra_lists = self._extra
+        self._extra = (
+            np.concatenate((extra_rows, rows)),
+            np.concatenate((extra_lists, _assign(vectors, self.centroids)))
+        )
+
+    def candidates(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """Lignes des nprobe listes les plus proches de la requête"""
+        nprobe = max(1, min(nprobe, self.n_lists))
+        scores = self.centroids @ query
+        if nprobe < self.n_lists:
+            probed = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        else:
+            probed = np.arange(self.n_lists)
+
+        parts = [self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probed]
+        extra_rows, extra_lists = self._extra
+        if extra_rows.size:
+            parts.append(extra_rows[np.isin(extra_lists, probed)])
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int64)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Tableaux à persister (uniquement les listes construites)"""
+        return {
+            "centroids": self.centroids,
+            "list_offsets": self.list_offsets,
+            "list_rows": self.list_rows,
+        }
+
+    def load_arrays(self, arrays: Dict[str, np.ndarray]):
+        self.__init__()
+        self.centroids = arrays["centroids"].astype(np.float32)
+        self.list_offsets = arrays["list_offsets"]
+        self.list_rows = arrays["list_rows"]
+
+    def clear(self):
+        self.__init__()
+
+    def _set_lists(self, rows: np.ndarray, assignments: np.ndarray):
+        order = np.argsort(assignments, kind="stable")
+        counts = np.bincount(assignments, minlength=self.n_lists)
+        self.list_offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        self.list_rows = rows[order]
@@ -0,0 +1,383 @@
+# ==============================================================================
+# FILE: app/database/metadata_index.py - Métadonnées en colonnes et filtres compilés
+# ==============================================================================
+#
+# Les métadonnées des chunks sont stockées en colonnes NumPy alignées sur les
+# lignes de la matrice d'embeddings :
+#
+#   impot_types      bitmap uint64 (un bit par type d'impôt, dictionnaire encodé)
+#   regime           code int16 (dictionnaire, -1 si absent)
+#   fiscal_category  code int16 (dictionnaire, -1 si absent)
+#   source_file      code int32 (dictionnaire, -1 si absent)
+#   embedding_provider  code int16 (fournisseur du vecteur : google, local)
+#   update_year      année int16 extraite de update_date (0 si absente)
+#   has_*            booléens
+#
+# Les critères de filtrage sont compilés en masque booléen avant le produit
+# scalaire. Syntaxe acceptée (compatible avec les anciens critères simples) :
+#
+#   {"impot_type": "TVA", "regime": "REEL"}              ET implicite
+#   {"update_year": {"$gte": 2020, "$lte": 2025}}        intervalle
+#   {"impot_type": {"$in": ["TVA", "IS"]}}               appartenance (aussi: liste)
+#   {"$or": [{...}, {...}]}, {"$and": [...]}, {"$not": {...}}
+
+import logging
+import re
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAX_IMPOT_TYPES = 64
+
+CATEGORICAL_FIELDS = {
+    "regime": np.int16,
+    "fiscal_category": np.int16,
+    "source_file": np.int32,
+    "embedding_provider": np.int16,
+}
+BOOLEAN_FIELDS = ("has_calculations", "has_rates", "has_thresholds")
+
+COMPARISON_OPERATORS = ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte", "$in", "$nin")
+
+_YEAR_PATTERN = re.compile(r"(\d{4})")
+_SHORT_DATE_PATTERN = re.compile(r"\d{1,2}[-/\.]\d{1,2}[-/\.](\d{2})$")
+
+
+def parse_year(update_date: Any) -> int:
+    """Extrait l'année d'une date de mise à jour (0 si introuvable)"""
+    if not update_date:
+        return 0
+    text = str(update_date)
+    match = _YEAR_PATTERN.search(text)
+    if match:
+        return int(match.group(1))
+    match = _SHORT_DATE_PATTERN.search(text.strip())
+    if match:
+        return 2000 + int(match.group(1))
+    return 0
+
+
+class MetadataIndex:
+    """Colonnes de métadonnées alignées sur les lignes du vector store"""
+
+    def __init__(self):
+        self.capacity = 0
+        self.impot_types = np.zeros(0, dtype=np.uint64)
+        self.update_year = np.zeros(0, dtype=np.int16)
+        self.categorical = {field: np.zeros(0, dtype=dtype) for field, dtype in CATEGORICAL_FIELDS.items()}
+        self.booleans = {field: np.zeros(0, dtype=bool) for field in BOOLEAN_FIELDS}
+
+        # Dictionnaires valeur (majuscules) -> code
+        self.impot_type_codes: Dict[str, int] = {}
+        self.dictionaries: Dict[str, Dict[str, int]] = {field: {} for field in CATEGORICAL_FIELDS}
+
+    def reserve(self, capacity: int):
+        """Agrandit les colonnes (appelé avec la capacité de la matrice)"""
+        if capacity <= self.capacity:
+            return
+
+        def grow(column: np.ndarray, fill: Any) -> np.ndarray:
+            new_column = np.full(capacity, fill, dtype=column.dtype)
+            new_column[:self.capacity] = column[:self.capacity]
+            return new_column
+
+        self.impot_types = grow(self.impot_types, 0)
+        self.update_year = grow(self.update_year, 0)
+        self.categorical = {field: grow(column, -1) for field, column in self.categorical.items()}
+        self.booleans = {field: grow(column, False) for field, column in self.booleans.items()}
+        self.capacity = capacity
+
+    def set_rows(self, start: int, documents: List[Dict[str, Any]]):
+        """Encode les métadonnées des documents pour les lignes start..start+len(documents)"""
+        self.reserve(start + len(documents))
+
+        for row, document in enumerate(documents, start=start):
+            metadata = document.get("metadata", {}) or {}
+
+            bits = 0
+            for impot_type in metadata.get("impot_types", []) or []:
+                code = self._impot_type_code(impot_type)
+                if code is not None:
+                    bits |= 1 << code
+            self.impot_types[row] = bits
+
+            self.update_year[row] = parse_year(metadata.get("update_date"))
+
+            for field in CATEGORICAL_FIELDS:
+                value = document.get(field) if field == "source_file" else metadata.get(field)
+                self.categorical[field][row] = self._code(field, value, create=True)
+
+            for field in BOOLEAN_FIELDS:
+                self.booleans[field][row] = bool(metadata.get(field, False))
+
+    def to_columns(self, rows: np.ndarray) -> Dict[str, np.ndarray]:
+        """Colonnes (lignes retenues par le masque rows) et dictionnaires, pour la persistance"""
+        count = rows.size
+        columns = {
+            "impot_types": self.impot_types[:count][rows],
+            "update_year": self.update_year[:count][rows],
+            "dict_impot_types": np.array(sorted(self.impot_type_codes, key=self.impot_type_codes.get), dtype=str),
+        }
+        for field, column in self.categorical.items():
+            columns[field] = column[:count][rows]
+            dictionary = self.dictionaries[field]
+            columns[f"dict_{field}"] = np.array(sorted(dictionary, key=dictionary.get), dtype=str)
+        for field, column in self.booleans.items():
+            columns[field] = column[:count][rows]
+        return columns
+
+    def load_columns(self, columns: Dict[str, np.ndarray]):
+        """Recharge les colonnes persistées (remplace le contenu)"""
+        self.__init__()
+        count = len(columns["impot_types"])
+        self.reserve(count)
+
+        self.impot_types[:count] = columns["impot_types"]
+        self.update_year[:count] = columns["update_year"]
+        self.impot_type_codes = {value: code for code, value in enumerate(columns["dict_impot_types"].tolist())}
+        for field in CATEGORICAL_FIELDS:
+            if field not in columns:
+                continue  # Colonne ajoutée après l'écriture de la base : valeurs absentes
+            self.categorical[field][:count] = columns[field]
+            self.dictionaries[field] = {
+                value: code for code, value in enumerate(columns[f"dict_{field}"].tolist())
+            }
+        for field in BOOLEAN_FIELDS:
+            self.booleans[field][:count] = columns[field]
+
+    def clear(self):
+        self.__init__()
+
+    def copy(self) -> "MetadataIndex":
+        """Copie indépendante (modifiée par l'écrivain pendant que l'original reste lu)"""
+        other = MetadataIndex()
+        other.capacity = self.capacity
+        other.impot_types = self.impot_types.copy()
+        other.update_year = self.update_year.copy()
+        other.categorical = {field: column.copy() for field, column in self.categorical.items()}
+        other.booleans = {field: column.copy() for field, column in self.booleans.items()}
+        other.impot_type_codes = dict(self.impot_type_codes)
+        other.dictionaries = {field: dict(dictionary) for field, dictionary in self.dictionaries.items()}
+        return other
+
+    def value_counts(self, field: str, rows: np.ndarray) -> Dict[str, int]:
+        """Nombre de lignes par valeur d'un champ catégoriel (lignes retenues par le masque rows)"""
+        codes = self.categorical[field][:rows.size][rows]
+        counts = np.bincount(codes[codes >= 0], minlength=len(self.dictionaries[field]))
+        names = sorted(self.dictionaries[field], key=self.dictionaries[field].get)
+        return {
+            name if field == "source_file" else name.lower(): int(count)
+            for name, count in zip(names, counts) if count
+        }
+
+    def codes_for(self, field: str, values: List[Any]) -> np.ndarray:
+        """Codes du dictionnaire pour des valeurs (valeurs inconnues ignorées)"""
+        codes = [self._code(field, value, create=False) for value in values]
+        return np.array([code for code in codes if code >= 0], dtype=CATEGORICAL_FIELDS[field])
+
+    # ------------------------------------------------------------------
+    # Évaluation des filtres
+    # ------------------------------------------------------------------
+
+    def evaluate(self,
+                 criteria: Dict[str, Any],
+                 count: int,
+                 fallback: Optional[Callable[[str, Callable[[Any], bool]], np.ndarray]] = None) -> np.ndarray:
+        """
+        Compile les critères en masque booléen sur les count premières lignes
+
+        Args:
+            criteria: Critères de filtrage (voir en-tête du module)
+            count: Nombre de lignes à évaluer
+            fallback: Évaluation ligne par ligne pour les clés sans colonne
+                      fallback(clé, prédicat) -> masque
+
+        Raises:
+            ValueError: si l'expression est invalide
+        """
+        if not isinstance(criteria, dict):
+            raise ValueError(f"Expression de filtre invalide: {criteria!r}")
+
+        mask = np.ones(count, dtype=bool)
+        for key, value in criteria.items():
+            if key == "$and":
+                for sub in value:
+                    mask &= self.evaluate(sub, count, fallback)
+            elif key == "$or":
+                any_mask = np.zeros(count, dtype=bool)
+                for sub in value:
+                    any_mask |= self.evaluate(sub, count, fallback)
+                mask &= any_mask
+            elif key == "$not":
+                mask &= ~self.evaluate(value, count, fallback)
+            elif key.startswith("$"):
+                raise ValueError(f"Opérateur logique inconnu: {key}")
+            else:
+                mask &= self._evaluate_field(key, value, count, fallback)
+        return mask
+
+    def _evaluate_field(self, key: str, condition: Any, count: int, fallback) -> np.ndarray:
+        """Masque pour une condition sur un champ"""
+        operators = _normalize_condition(condition)
+
+        mask = np.ones(count, dtype=bool)
+        for operator, operand in operators.items():
+            if key == "impot_type":
+                mask &= self._impot_type_mask(operator, operand, count)
+            elif key == "update_year":
+                mask &= self._year_mask(operator, operand, count)
+            elif key in CATEGORICAL_FIELDS:
+                mask &= self._categorical_mask(key, operator, operand, count)
+            elif key in BOOLEAN_FIELDS:
+                mask &= _compare(self.booleans[key][:count], operator, operand, cast=bool)
+            elif fallback is not None:
+                predicate = _python_predicate(operator, operand)
+                mask &= fallback(key, predicate)
+            else:
+                raise ValueError(f"Champ de filtre non indexé: {key}")
+        return mask
+
+    def _impot_type_mask(self, operator: str, operand: Any, count: int) -> np.ndarray:
+        values = operand if operator in ("$in", "$nin") else [operand]
+        bits = 0
+        for value in values:
+            code = self.impot_type_codes.get(str(value).upper())
+            if code is not None:
+                bits |= 1 << code
+        has_any = (self.impot_types[:count] & np.uint64(bits)) != 0
+
+        if operator in ("$eq", "$in"):
+            return has_any
+        if operator in ("$ne", "$nin"):
+            return ~has_any
+        raise ValueError(f"Opérateur {operator} non supporté pour impot_type")
+
+    def _year_mask(self, operator: str, operand: Any, count: int) -> np.ndarray:
+        years = self.update_year[:count]
+        known = years > 0
+        if operator in ("$in", "$nin"):
+            operand = [int(value) for value in operand]
+        else:
+            operand = int(operand)
+        return known & _compare(years, operator, operand)
+
+    def _categorical_mask(self, field: str, operator: str, operand: Any, count: int) -> np.ndarray:
+        column = self.categorical[field][:count]
+        if operator in ("$eq", "$ne"):
+            codes = self.codes_for(field, [operand])
+            matches = np.isin(column, codes) if codes.size else np.zeros(count, dtype=bool)
+            return matches if operator == "$eq" else ~matches
+        if operator in ("$in", "$nin"):
+            codes = self.codes_for(field, list(operand))
+            matches = np.isin(column, codes) if codes.size else np.zeros(count, dtype=bool)
+            return matches if operator == "$in" else ~matches
+        raise ValueError(f"Opérateur {operator} non supporté pour {field}")
+
+    def _impot_type_code(self, value: Any) -> Optional[int]:
+        key = str(value).upper()
+        if key not in self.impot_type_codes:
+            if len(self.impot_type_codes) >= MAX_IMPOT_TYPES:
+                logger.warning(f"⚠️ Trop de types d'impôt distincts, {key} non indexé")
+                return None
+            self.impot_type_codes[key] = len(self.impot_type_codes)
+        return self.impot_type_codes[key]
+
+    def _code(self, field: str, value: Any, create: bool) -> int:
+        if value is None or value == "":
+            return -1
+        # regime et fiscal_category sont comparés sans tenir compte de la casse
+        key = str(value) if field == "source_file" else str(value).upper()
+        dictionary = self.dictionaries[field]
+        if key not in dictionary:
+            if not create:
+                return -1
+            dictionary[key] = len(dictionary)
+        return dictionary[key]
+
+
+def years_matching(criteria: Optional[Dict[str, Any]], years: np.ndarray) -> np.ndarray:
+    """
+    Masque des années (parmi years) compatibles avec les conditions sur update_year
+
+    Évaluation conservatrice servant à écarter des shards entiers avant tout
+    scoring : les autres champs et $not ne retirent aucune année.
+    """
+    mask = np.ones(years.size, dtype=bool)
+    if not isinstance(criteria, dict):
+        return mask
+    for key, value in criteria.items():
+        if key == "$and":
+            for sub in value:
+                mask &= years_matching(sub, years)
+        elif key == "$or":
+            any_mask = np.zeros(years.size, dtype=bool)
+            for sub in value:
+                any_mask |= years_matching(sub, years)
+            mask &= any_mask
+        elif key == "update_year":
+            for operator, operand in _normalize_condition(value).items():
+                operand = [int(v) for v in operand] if operator in ("$in", "$nin") else int(operand)
+                mask &= (years > 0) & _compare(years, operator, operand)
+    return mask
+
+
+def _normalize_condition(condition: Any) -> Dict[str, Any]:
+    """Normalise une condition de champ en {opérateur: opérande}"""
+    if isinstance(condition, dict):
+        unknown = [op for op in condition if op not in COMPARISON_OPERATORS]
+        if unknown:
+            raise ValueError(f"Opérateurs de comparaison inconnus: {unknown}")
+        return condition
+    if isinstance(condition, (list, tuple, set)):
+        return {"$in": list(condition)}
+    return {"$eq": condition}
+
+
+def _compare(column: np.ndarray, operator: str, operand: Any, cast: Callable = None) -> np.ndarray:
+    """Comparaison vectorisée d'une colonne numérique"""
+    if cast is not None:
+        operand = [cast(v) for v in operand] if operator in ("$in", "$nin") else cast(operand)
+    if operator == "$eq":
+        return column == operand
+    if operator == "$ne":
+        return column != operand
+    if operator == "$gt":
+        return column > operand
+    if operator == "$gte":
+        return column >= operand
+    if operator == "$lt":
+        return column < operand
+    if operator == "$lte":
+        return column <= operand
+    if operator == "$in":
+        return np.isin(column, operand)
+    if operator == "$nin":
+        return ~np.isin(column, operand)
+    raise ValueError(f"Opérateur inconnu: {operator}")
+
+
+def _python_predicate(operator: str, operand: Any) -> Callable[[Any], bool]:
+    """Prédicat Python équivalent, pour les clés de métadonnées sans colonne"""
+    def predicate(value: Any) -> bool:
+        if operator == "$eq":
+            return value == operand
+        if operator == "$ne":
+            return value != operand
+        if operator == "$in":
+            return value in operand
+        if operator == "$nin":
+            return value not in operand
+        if value is None:
+            return False
+        if operator == "$gt":
+            return value > operand
+        if operator == "$gte":
+            return value >= operand
+        if operator == "$lt":
+            return value < operand
+        if operator == "$lte":
+            return value <= operand
+        raise ValueError(f"Opérateur inconnu: {operator}")
+    return predicate
@@ -0,0 +1,226 @@
+# ==============================================================================
+# FILE: app/database/mutation_log.py - Journal append-only des mutations du vector store
+# ==============================================================================
+#
+# Chaque mutation (ajout, suppression, mise à jour, métadonnées) est ajoutée en fin de
+# fichier sous forme d'une ligne JSON numérotée (seq). Le manifeste de la base
+# retient le dernier seq compacté : au chargement, seuls les enregistrements
+# plus récents sont rejoués.
+#
+# Plusieurs processus (workers uvicorn) peuvent écrire dans le même journal :
+# chaque écriture se fait sous le verrou de la collection, après lecture des
+# enregistrements ajoutés par les autres depuis la dernière lecture (la
+# numérotation reste globale) et ré-ouverture du fichier si une compaction
+# d'un autre processus l'a remplacé.
+
+import base64
+import json
+import logging
+import os
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from app.database import index_storage
+
+logger = logging.getLogger(__name__)
+
+LOG_FILE = "mutations.log"
+
+OP_ADD = "add"
+OP_DELETE = "delete"
+OP_UPDATE = "update"
+OP_METADATA = "metadata"
+
+
+def encode_vector(vector: np.ndarray) -> str:
+    """Encode un vecteur float32 en base64"""
+    return base64.b64encode(np.ascontiguousarray(vector, dtype=np.float32).tobytes()).decode("ascii")
+
+
+def decode_vector(encoded: str) -> np.ndarray:
+    """Décode un vecteur float32 encodé en base64"""
+    return np.frombuffer(base64.b64decode(encoded), dtype=np.float32)
+
+
+class MutationLog:
+    """Journal append-only (write-ahead) des mutations d'une collection"""
+
+    def __init__(self, directory: str):
+        self.path = os.path.join(directory, LOG_FILE)
+        self.lock = index_storage.CollectionLock(directory)
+        self.sequence = 0  # Dernier numéro attribué ou lu
+        self.record_count = 0  # Enregistrements présents dans le fichier
+        self._file = None
+        self._position = 0  # Octets du fichier déjà lus par ce processus
+        # Enregistrements d'autres processus lus avant un ajout, pas encore rendus par read_new
+        self._foreign: List[Dict[str, Any]] = []
+        self._replaced = False  # Fichier remplacé par la compaction d'un autre processus
+
+    def open(self, base_sequence: int = 0):
+        """Ouvre le journal en ajout et reprend la numérotation"""
+        with self.lock:
+            self.close()
+            self._repair()
+            self.sequence = base_sequence
+            self.record_count = 0
+            for record in self._read_records():
+                self.sequence = max(self.sequence, record["seq"])
+                self.record_count += 1
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._file = open(self.path, "ab")
+            self._position = os.fstat(self._file.fileno()).st_size
+            self._foreign = []
+            self._replaced = False
+
+    def close(self):
+        """Ferme le fichier du journal"""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def append(self, records: List[Dict[str, Any]]) -> int:
+        """
+        Ajoute des enregistrements de façon durable (une seule écriture + fsync)
+
+        Returns:
+            Numéro de séquence du dernier enregistrement
+        """
+        if not records:
+            return self.sequence
+
+        with self.lock:
+            self._read_tail()
+            lines = []
+            for record in records:
+                self.sequence += 1
+                record["seq"] = self.sequence
+                lines.append(json.dumps(record, ensure_ascii=False, separators=(",", ":")))
+
+            data = ("\n".join(lines) + "\n").encode("utf-8")
+            self._file.write(data)
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._position += len(data)
+            self.record_count += len(records)
+        return self.sequence
+
+    def read_new(self) -> Optional[List[Dict[str, Any]]]:
+        """
+        Enregistrements ajoutés par d'autres processus depuis la dernière lecture
+
+        Returns:
+            Enregistrements à rejouer, ou None si une compaction d'un autre
+            processus a remplacé le journal (la base doit être rechargée)
+        """
+        with self.lock:
+            self._read_tail()
+            if self._replaced:
+                return None
+            records, self._foreign = self._foreign, []
+            return records
+
+    def _read_tail(self):
+        """
+        Lit (sous verrou) la fin du fichier écrite par d'autres processus
+
+        Un fichier remplacé est ré-ouvert ; la numérotation reprend alors après
+        le seq de la base qui a compacté l'ancien journal.
+        """
+        try:
+            replaced = os.stat(self.path).st_ino != os.fstat(self._file.fileno()).st_ino
+        except FileNotFoundError:
+            replaced = True
+        if replaced:
+            self.close()
+            self._file = open(self.path, "ab")
+            self._position = 0
+            self._foreign = []
+            self._replaced = True
+            self.record_count = 0
+            manifest = index_storage.read_manifest(index_storage.base_directory(os.path.dirname(self.path)))
+            if manifest is not None:
+                self.sequence = max(self.sequence, manifest.get("log_sequence", 0))
+
+        with open(self.path, "rb+") as f:
+            f.seek(self._position)
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                # Écriture interrompue d'un autre processus
+                end = data.rfind(b"\n") + 1
+                f.truncate(self._position + end)
+                data = data[:end]
+                logger.warning("⚠️ Dernier enregistrement incomplet retiré du journal")
+
+        for line in data.splitlines():
+            if line.strip():
+                record = json.loads(line)
+                self.sequence = max(self.sequence, record["seq"])
+                self.record_count += 1
+                if not self._replaced:
+                    self._foreign.append(record)
+        self._position += len(data)
+
+    def replay(self, after_sequence: int = 0) -> Iterator[Dict[str, Any]]:
+        """Rejoue les enregistrements postérieurs à after_sequence"""
+        for record in self._read_records():
+            if record["seq"] > after_sequence:
+                yield record
+
+    def truncate_through(self, sequence: int):
+        """Retire les enregistrements déjà compactés dans la base (seq <= sequence)"""
+        with self.lock:
+            # Les enregistrements des autres processus non encore lus restent à rendre
+            self._read_tail()
+            remaining = [
+                json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+                for record in self._read_records() if record["seq"] > sequence
+            ]
+
+            self.close()
+            tmp_path = f"{self.path}.tmp-{os.getpid()}"
+            with open(tmp_path, "wb") as f:
+                if remaining:
+                    f.write(("\n".join(remaining) + "\n").encode("utf-8"))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+
+            self._file = open(self.path, "ab")
+            self._position = os.fstat(self._file.fileno()).st_size
+            self.record_count = len(remaining)
+
+    def _repair(self):
+        """Supprime une éventuelle dernière ligne incomplète (écriture interrompue)"""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "rb+") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+                logger.warning("⚠️ Dernier enregistrement incomplet retiré du journal")
+
+    @property
+    def is_open(self) -> bool:
+        return self._file is not None
+
+    @property
+    def size_bytes(self) -> int:
+        return os.path.getsize(self.path) if os.path.exists(self.path) else 0
+
+    def _read_records(self) -> Iterator[Dict[str, Any]]:
+        """Lit le journal ; une dernière ligne tronquée (arrêt brutal) est ignorée"""
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "rb") as f:
+            for line_number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning(f"⚠️ Journal tronqué ligne {line_number}, enregistrements suivants ignorés")
+                    return
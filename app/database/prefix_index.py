@@ -0,0 +1,77 @@
+# ==============================================================================
+# FILE: app/database/prefix_index.py - Préfixes tronqués (Matryoshka) des embeddings
+# ==============================================================================
+#
+# text-embedding-004 est entraîné de façon à ce que les premières dimensions
+# portent l'essentiel de l'information : le préfixe renormalisé (ex: 128 ou 256
+# dimensions sur 768) suffit pour un premier passage. Seule une courte liste
+# de candidats est ensuite re-scorée sur les vecteurs complets.
+#
+# Les préfixes sont recalculés depuis la matrice complète à l'ouverture : ils
+# ne sont pas persistés.
+
+import logging
+from typing import Optional
+
+import numpy as np
+
+from app.utils.similarity import normalize_rows
+
+logger = logging.getLogger(__name__)
+
+
+def truncate_and_normalize(vectors: np.ndarray, dimension: int) -> np.ndarray:
+    """Préfixe des dimension premières composantes, renormalisé (L2)"""
+    return normalize_rows(np.asarray(vectors[..., :dimension], dtype=np.float32))
+
+
+class PrefixIndex:
+    """Matrice des préfixes renormalisés alignée sur les lignes du store"""
+
+    def __init__(self, dimension: int):
+        self.dimension = dimension
+        self.vectors = np.zeros((0, dimension), dtype=np.float32)
+        self.count = 0  # Lignes 0..count-1 calculées
+
+    @property
+    def memory_bytes(self) -> int:
+        return int(self.vectors[:self.count].nbytes)
+
+    def clear(self):
+        self.__init__(self.dimension)
+
+    def build(self, vectors: np.ndarray):
+        """Recalcule les préfixes de toutes les lignes"""
+        self.clear()
+        self.add(0, vectors)
+
+    def add(self, start_row: int, vectors: np.ndarray):
+        """Calcule les préfixes de nouvelles lignes"""
+        if vectors.shape[0] == 0:
+            return
+        if vectors.shape[1] < self.dimension:
+            raise ValueError(
+                f"Préfixe de {self.dimension} dimensions impossible sur des vecteurs de {vectors.shape[1]}"
+            )
+
+        end_row = start_row + vectors.shape[0]
+        if end_row > self.vectors.shape[0]:
+            capacity = max(end_row, 2 * self.vectors.shape[0])
+            grown = np.zeros((capacity, self.dimension), dtype=np.float32)
+            grown[:self.count] = self.vectors[:self.count]
+            self.vectors = grown
+        self.vectors[start_row:end_row] = truncate_and_normalize(vectors, self.dimension)
+        self.count = end_row
+
+    def score(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Similarités sur les préfixes (premier passage)
+
+        Args:
+            query: Requête complète normalisée (tronquée ici)
+            rows: Lignes à scorer (None = toutes les lignes calculées)
+        """
+        prefix_query = truncate_and_normalize(query, self.dimension)
+        if rows is None:
+            return self.vectors[:self.count] @ prefix_query
+        return self.vectors[rows] @ prefix_query
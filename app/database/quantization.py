@@ -0,0 +1,152 @@
+# ==============================================================================
+# FILE: app/database/quantization.py - Quantification scalaire int8 des embeddings
+# ==============================================================================
+#
+# Chaque dimension est ramenée sur 256 niveaux avec une échelle et un offset
+# propres (min/max de la dimension) :
+#
+#   x ≈ offset + scale · (code + 128)      code int8
+#
+# La recherche fait un premier passage sur les codes int8 (4x moins de
+# mémoire que float32), puis les meilleurs candidats sont re-scorés sur les
+# vecteurs float32 d'origine, qui restent sur disque (vectors.npy, np.memmap).
+
+import logging
+from typing import Dict, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = "sq8"
+
+# Lignes décodées par bloc pendant le passage grossier (le bloc float32 reste en cache)
+SCAN_BLOCK_ROWS = 256
+# Lignes utilisées pour mesurer l'erreur de quantification
+ERROR_SAMPLE_ROWS = 10000
+
+
+class ScalarQuantizer:
+    """Codes int8 par dimension (échelle + offset) alignés sur les lignes du store"""
+
+    def __init__(self):
+        self.scale: Optional[np.ndarray] = None
+        self.offset: Optional[np.ndarray] = None
+        self.codes = np.zeros((0, 0), dtype=np.int8)
+        self.count = 0  # Lignes 0..count-1 encodées
+        self.error: Dict[str, float] = {}
+
+    @property
+    def is_trained(self) -> bool:
+        return self.scale is not None
+
+    @property
+    def memory_bytes(self) -> int:
+        return int(self.codes[:self.count].nbytes)
+
+    def clear(self):
+        self.__init__()
+
+    def train(self, vectors: np.ndarray, seed: int = 0):
+        """Calcule échelle/offset, encode toutes les lignes et mesure l'erreur"""
+        if vectors.shape[0] == 0:
+            self.__init__()
+            return
+
+        minimum = vectors.min(axis=0).astype(np.float32)
+        maximum = vectors.max(axis=0).astype(np.float32)
+        scale = (maximum - minimum) / 255.0
+        scale[scale == 0] = 1.0
+        self.scale, self.offset = scale, minimum
+
+        self.codes = self.encode(vectors)
+        self.count = vectors.shape[0]
+        self.error = self._measure_error(vectors, seed)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """Encode des vecteurs float32 (les valeurs hors intervalle sont saturées)"""
+        levels = np.rint((vectors - self.offset) / self.scale)
+        return (np.clip(levels, 0, 255) - 128).astype(np.int8)
+
+    def decode(self, codes: np.ndarray) -> np.ndarray:
+        """Reconstruit des vecteurs float32 approchés"""
+        return self.offset + self.scale * (codes.astype(np.float32) + 128.0)
+
+    def add(self, start_row: int, vectors: np.ndarray):
+        """Encode de nouvelles lignes avec les paramètres existants"""
+        if not self.is_trained or vectors.shape[0] == 0:
+            return
+        end_row = start_row + vectors.shape[0]
+        if end_row > self.codes.shape[0]:
+            capacity = max(end_row, 2 * self.codes.shape[0])
+            codes = np.zeros((capacity, self.codes.shape[1]), dtype=np.int8)
+            codes[:self.count] = self.codes[:self.count]
+            self.codes = codes
+        self.codes[start_row:end_row] = self.encode(vectors)
+        self.count = end_row
+
+    def score(self, query: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Similarités approchées (produit scalaire) entre la requête et les codes
+
+        Args:
+            query: Requête normalisée (float32)
+            rows: Lignes à scorer (None = toutes les lignes encodées)
+        """
+        # q · x ≈ q · offset + (q · scale) · (code + 128)
+        weights = (query * self.scale).astype(np.float32)
+        bias = float(query @ self.offset) + 128.0 * float(weights.sum())
+
+        total = self.count if rows is None else rows.size
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, SCAN_BLOCK_ROWS):
+            stop = min(start + SCAN_BLOCK_ROWS, total)
+            block = self.codes[start:stop] if rows is None else self.codes[rows[start:stop]]
+            scores[start:stop] = block.astype(np.float32) @ weights
+        return scores + bias
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Tableaux à persister (paramètres, codes et erreur mesurée)"""
+        return {
+            "scale": self.scale,
+            "offset": self.offset,
+            "codes": self.codes[:self.count],
+            "error": np.array([self.error.get("mean_abs_error", 0.0),
+                               self.error.get("max_abs_error", 0.0),
+                               self.error.get("mean_similarity_error", 0.0)], dtype=np.float64),
+        }
+
+    def load_arrays(self, arrays: Dict[str, np.ndarray]):
+        self.__init__()
+        self.scale = arrays["scale"].astype(np.float32)
+        self.offset = arrays["offset"].astype(np.float32)
+        self.codes = arrays["codes"].astype(np.int8)
+        self.count = self.codes.shape[0]
+        mean_abs, max_abs, similarity = arrays["error"].tolist()
+        self.error = {
+            "mean_abs_error": mean_abs,
+            "max_abs_error": max_abs,
+            "mean_similarity_error": similarity,
+        }
+
+    def _measure_error(self, vectors: np.ndarray, seed: int) -> Dict[str, float]:
+        """Erreur de reconstruction et erreur de similarité sur un échantillon"""
+        rng = np.random.default_rng(seed)
+        rows = np.arange(vectors.shape[0])
+        if rows.size > ERROR_SAMPLE_ROWS:
+            rows = np.sort(rng.choice(rows, ERROR_SAMPLE_ROWS, replace=False))
+
+        sample = np.asarray(vectors[rows], dtype=np.float32)
+        reconstructed = self.decode(self.codes[rows])
+        difference = np.abs(reconstructed - sample)
+
+        # Erreur sur la similarité cosinus entre paires de lignes de l'échantillon
+        queries = sample[rng.permutation(sample.shape[0])]
+        exact = np.einsum("ij,ij->i", sample, queries)
+        approx = np.einsum("ij,ij->i", reconstructed, queries)
+
+        return {
+            "mean_abs_error": round(float(difference.mean()), 6),
+            "max_abs_error": round(float(difference.max()), 6),
+            "mean_similarity_error": round(float(np.abs(exact - approx).mean()), 6),
+        }
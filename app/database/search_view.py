@@ -0,0 +1,65 @@
+# ==============================================================================
+# FILE: app/database/search_view.py - Vue immuable de l'état lu par les recherches
+# ==============================================================================
+#
+# Les recherches ne lisent jamais les attributs mutables du vector store : elles
+# prennent la dernière vue publiée (une seule lecture d'attribut) et n'utilisent
+# qu'elle, sans verrou. Les écrivains ne modifient jamais ce qu'une vue publiée
+# référence (copy-on-write) :
+#
+#   ajouts          lignes écrites au-delà de view.count (invisibles pour la vue),
+#                   nouvelle matrice en cas de croissance
+#   suppressions    bitmap copiée avant la première suppression suivant une publication
+#   mises à jour    colonnes de métadonnées copiées avant modification
+#   compaction      nouveaux objets (matrice, documents, index) puis publication
+#
+# Les lignes candidates renvoyées par les index approchés (qui continuent de
+# recevoir les insertions) sont bornées à view.count. Les documents supprimés
+# après la publication restent lisibles par la vue (DocumentStore.lookup).
+
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.database.document_store import DocumentStore
+from app.database.hnsw_index import HNSWIndex
+from app.database.ivf_index import IVFIndex
+from app.database.metadata_index import MetadataIndex
+from app.database.prefix_index import PrefixIndex
+from app.database.quantization import ScalarQuantizer
+
+
+@dataclass(frozen=True)
+class SearchView:
+    """État cohérent du vector store à un instant donné (lecture seule)"""
+    count: int
+    matrix: np.ndarray
+    deleted: np.ndarray
+    deleted_count: int
+    document_ids: List[str]
+    documents: DocumentStore
+    metadata_index: MetadataIndex
+    ivf: IVFIndex
+    hnsw: HNSWIndex
+    quantizer: ScalarQuantizer
+    prefix: Optional[PrefixIndex]
+
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Lignes visibles de la matrice (sans copie)"""
+        return self.matrix[:self.count]
+
+    @property
+    def live_count(self) -> int:
+        return self.count - self.deleted_count
+
+    def live_mask(self) -> Optional[np.ndarray]:
+        """Masque des lignes non supprimées (None si aucune ne l'est)"""
+        if not self.deleted_count:
+            return None
+        return ~self.deleted[:self.count]
+
+    def document(self, row: int) -> Dict[str, Any]:
+        """Document d'une ligne visible"""
+        return self.documents.lookup(self.document_ids[row])
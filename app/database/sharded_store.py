@@ -0,0 +1,370 @@
+# ==============================================================================
+# FILE: app/database/sharded_store.py - Vector store partitionné (scatter-gather)
+# ==============================================================================
+#
+# La collection est répartie en shards, chacun étant un VectorStore complet
+# (matrice, journal, index approchés, déduplication) :
+#
+#   shard_by="source_file"   shard = hash(fichier source) modulo shard_count
+#   shard_by="update_year"   un shard par année de mise à jour ("0000" = inconnue)
+#
+# Une recherche est diffusée à tous les shards en parallèle (le scoring de
+# chaque shard s'exécute dans le pool de recherche, NumPy relâchant le GIL),
+# puis les top-k de chaque shard sont fusionnés. Un shard dont aucune année
+# ne satisfait les conditions sur update_year est écarté avant tout scoring.
+#
+# Organisation sur disque ({persist_directory}/{collection_name}_shards/) :
+#
+#   CURRENT, v000001/ ...    snapshots (comme un VectorStore)
+#   v000001/shard_<clé>/     un VectorStore par shard
+#
+# La déduplication par hash de contenu s'applique à l'intérieur d'un shard ; un
+# même contenu stocké dans deux shards n'apparaît qu'une fois dans les résultats
+# fusionnés (le meilleur score l'emporte).
+
+import asyncio
+import hashlib
+import itertools
+import logging
+import os
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+from app.database.metadata_index import parse_year, years_matching
+from app.database.snapshots import SnapshotMixin
+from app.database.vector_store import VectorStore
+from app.utils.executors import InstrumentedExecutor
+
+logger = logging.getLogger(__name__)
+
+SHARD_KEYS = ("source_file", "update_year")
+SHARD_PREFIX = "shard_"
+
+
+class ShardedVectorStore(SnapshotMixin):
+    """Collection répartie en plusieurs VectorStore interrogés en parallèle"""
+
+    def __init__(self,
+                 persist_directory: str = "./vector_db",
+                 collection_name: str = "cgi_documents",
+                 shard_by: str = "source_file",
+                 shard_count: int = 4,
+                 snapshot_version: Optional[str] = None,
+                 keep_snapshots: int = 3,
+                 search_executor: Optional[InstrumentedExecutor] = None,
+                 **store_options: Any):
+        """
+        Args:
+            persist_directory: Répertoire de persistance
+            collection_name: Nom de la collection
+            shard_by: Clé de partitionnement (source_file ou update_year)
+            shard_count: Nombre de shards (source_file uniquement)
+            snapshot_version: Snapshot à ouvrir (None = snapshot actif désigné par CURRENT)
+            keep_snapshots: Snapshots précédents conservés pour un retour arrière immédiat
+            search_executor: Pool de threads partagé par les recherches des shards
+            **store_options: Options de chaque VectorStore (backend d'index, quantification...)
+        """
+        if shard_by not in SHARD_KEYS:
+            raise ValueError(f"Clé de partitionnement inconnue: {shard_by} (disponibles: {SHARD_KEYS})")
+
+        # Options conservées pour ouvrir d'autres snapshots avec la même configuration
+        self._options = {
+            "persist_directory": persist_directory,
+            "collection_name": collection_name,
+            "shard_by": shard_by,
+            "shard_count": shard_count,
+            "snapshot_version": snapshot_version,
+            "keep_snapshots": keep_snapshots,
+            "search_executor": search_executor,
+            **store_options
+        }
+
+        self.persist_directory = persist_directory
+        self.collection_name = collection_name
+        self.shard_by = shard_by
+        self.shard_count = max(1, shard_count)
+        self.search_executor = search_executor
+        self.store_options = store_options
+        self.is_initialized = False
+        self._init_snapshot_state(snapshot_version, keep_snapshots)
+
+        self.shards: Dict[str, VectorStore] = {}
+        self._shard_lock = asyncio.Lock()
+
+        # Recherches diffusées et shards écartés par les filtres sur update_year
+        self._searches = 0
+        self._shards_searched = 0
+        self._shards_pruned = 0
+
+    @property
+    def _collection_root(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.collection_name}_shards")
+
+    async def initialize(self):
+        """Ouvre les shards du snapshot actif (ou demandé)"""
+        if self.is_initialized:
+            return
+
+        self._resolve_snapshot_version()
+        keys = sorted(
+            name[len(SHARD_PREFIX):] for name in os.listdir(self.snapshot_directory)
+            if name.startswith(SHARD_PREFIX)
+        )
+        for key in keys:
+            await self._open_shard(key)
+
+        self.is_initialized = True
+        logger.info(
+            f"✅ Vector store partitionné initialisé: {len(self.shards)} shards "
+            f"({self.shard_by}, snapshot {self.snapshot_version})"
+        )
+
+    async def _open_shard(self, key: str) -> VectorStore:
+        shard = VectorStore(
+            persist_directory=self.snapshot_directory,
+            collection_name=f"{SHARD_PREFIX}{key}",
+            search_executor=self.search_executor,
+            **self.store_options
+        )
+        await shard.initialize()
+        self.shards = {**self.shards, key: shard}  # Dictionnaire remplacé : les recherches en cours gardent l'ancien
+        return shard
+
+    async def _get_shard(self, key: str) -> VectorStore:
+        """Shard d'une clé, créé à la demande"""
+        shard = self.shards.get(key)
+        if shard is not None:
+            return shard
+        async with self._shard_lock:
+            if key not in self.shards:
+                logger.info(f"🧩 Nouveau shard: {key}")
+                await self._open_shard(key)
+            return self.shards[key]
+
+    def shard_key(self, document: Dict[str, Any]) -> str:
+        """Clé du shard d'un document"""
+        metadata = document.get("metadata") or {}
+        if self.shard_by == "update_year":
+            return f"{parse_year(metadata.get('update_date')):04d}"
+
+        source_file = document.get("source_file") or metadata.get("source_file") or ""
+        digest = hashlib.blake2b(str(source_file).encode("utf-8"), digest_size=8).digest()
+        return f"{int.from_bytes(digest, 'little') % self.shard_count:02d}"
+
+    # ------------------------------------------------------------------
+    # Écriture
+    # ------------------------------------------------------------------
+
+    async def add_documents(self, documents: List[Dict[str, Any]], embeddings: List[List[float]]) -> List[str]:
+        """
+        Répartit les documents entre les shards (ajouts des shards en parallèle)
+
+        Returns:
+            Id du chunk stocké pour chaque document, dans l'ordre d'entrée
+        """
+        if not self.is_initialized:
+            await self.initialize()
+
+        groups: Dict[str, List[int]] = {}
+        for i, document in enumerate(documents[:len(embeddings)]):
+            groups.setdefault(self.shard_key(document), []).append(i)
+
+        shards = [await self._get_shard(key) for key in groups]
+        shard_ids = await asyncio.gather(*(
+            shard.add_documents([documents[i] for i in indices], [embeddings[i] for i in indices])
+            for shard, indices in zip(shards, groups.values())
+        ))
+        stored_ids: List[Optional[str]] = [None] * sum(len(indices) for indices in groups.values())
+        for indices, ids in zip(groups.values(), shard_ids):
+            for i, doc_id in zip(indices, ids):
+                stored_ids[i] = doc_id
+        return stored_ids
+
+    async def delete_document(self, doc_id: str) -> bool:
+        return await self.delete_documents([doc_id]) == 1
+
+    async def delete_documents(self, doc_ids: List[str]) -> int:
+        """Supprime des documents (chaque shard ignore les IDs qu'il ne contient pas)"""
+        counts = await asyncio.gather(*(shard.delete_documents(doc_ids) for shard in self.shards.values()))
+        return sum(counts)
+
+    async def delete_by_source_file(self, source_file: str) -> int:
+        """Retire un fichier source (un seul shard concerné quand la clé est le fichier)"""
+        if self.shard_by == "source_file":
+            shard = self.shards.get(self.shard_key({"source_file": source_file}))
+            return await shard.delete_by_source_file(source_file) if shard is not None else 0
+        counts = await asyncio.gather(*(
+            shard.delete_by_source_file(source_file) for shard in self.shards.values()
+        ))
+        return sum(counts)
+
+    async def save_indexing_stats(self, stats: Dict[str, Any]):
+        for shard in self.shards.values():
+            await shard.save_indexing_stats(stats)
+
+    async def build_index(self):
+        """Écrit une base dense et construit l'index de chaque shard"""
+        await asyncio.gather(*(shard.build_index() for shard in self.shards.values()))
+
+    async def clear(self):
+        await asyncio.gather(*(shard.clear() for shard in self.shards.values()))
+
+    async def _wait_for_compaction(self):
+        await asyncio.gather(*(shard._wait_for_compaction() for shard in self.shards.values()))
+
+    # ------------------------------------------------------------------
+    # Recherche (scatter-gather)
+    # ------------------------------------------------------------------
+
+    def _candidate_shards(self, filter_criteria: Optional[Dict[str, Any]]) -> List[VectorStore]:
+        """Shards pouvant contenir des résultats (élagage par update_year)"""
+        shards = [shard for shard in self.shards.values() if shard.live_count]
+        if filter_criteria:
+            try:
+                shards = [
+                    shard for shard in shards
+                    if years_matching(filter_criteria, shard.update_years()).any()
+                ]
+            except (TypeError, ValueError):
+                pass  # Critères invalides : chaque shard signalera l'erreur
+        return shards
+
+    def _count_search(self, searches: int, shards: List[VectorStore]):
+        """Statistiques d'élagage (recherches par similarité uniquement)"""
+        self._searches += searches
+        self._shards_pruned += len(self.shards) - len(shards)
+        self._shards_searched += len(shards)
+
+    @staticmethod
+    def _merge_top_k(results: Iterable[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """Meilleurs résultats de tous les shards, un seul par chunk (id ou hash de contenu)"""
+        merged = []
+        seen = set()
+        for result in sorted(results, key=lambda result: result["similarity_score"], reverse=True):
+            keys = {("id", result["id"]), ("content", result.get("content_hash") or result["id"])}
+            if keys & seen:
+                continue
+            seen |= keys
+            merged.append(result)
+            if len(merged) == top_k:
+                break
+        return merged
+
+    async def similarity_search(self, query_embedding: List[float],
+                                top_k: int = 5,
+                                filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Recherche sur tous les shards en parallèle puis fusion des top-k
+
+        Returns:
+            Liste des documents les plus similaires, tous shards confondus
+        """
+        shards = self._candidate_shards(filter_criteria)
+        self._count_search(1, shards)
+        if not shards:
+            return []
+
+        per_shard = await asyncio.gather(*(
+            shard.similarity_search(query_embedding, top_k, filter_criteria) for shard in shards
+        ))
+        return self._merge_top_k(itertools.chain.from_iterable(per_shard), top_k)
+
+    async def similarity_search_batch(self, query_matrix: Union[np.ndarray, List[List[float]]],
+                                      top_k: int = 5,
+                                      filter_criteria: Union[Dict[str, Any], List[Optional[Dict[str, Any]]], None] = None
+                                      ) -> List[List[Dict[str, Any]]]:
+        """Recherche groupée sur tous les shards en parallèle, fusion par requête"""
+        queries = np.asarray(query_matrix, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+
+        # Critères par requête : un shard est interrogé s'il peut servir l'une d'elles
+        criteria_list = filter_criteria if isinstance(filter_criteria, list) else [filter_criteria]
+        candidates = {id(shard): shard for criteria in criteria_list for shard in self._candidate_shards(criteria)}
+        self._count_search(queries.shape[0], list(candidates.values()))
+        if not candidates:
+            return [[] for _ in range(queries.shape[0])]
+
+        per_shard = await asyncio.gather(*(
+            shard.similarity_search_batch(queries, top_k, filter_criteria) for shard in candidates.values()
+        ))
+        return [self._merge_top_k(itertools.chain.from_iterable(hits), top_k) for hits in zip(*per_shard)]
+
+    # ------------------------------------------------------------------
+    # Lecture et statistiques
+    # ------------------------------------------------------------------
+
+    async def get_documents(self, doc_ids: List[str],
+                            query_embedding: Optional[List[float]] = None,
+                            filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Chunks désignés par leur id, lus sur tous les shards en parallèle (ordre des ids conservé)"""
+        shards = self._candidate_shards(filter_criteria)
+        if not shards or not doc_ids:
+            return []
+
+        per_shard = await asyncio.gather(*(
+            shard.get_documents(doc_ids, query_embedding, filter_criteria) for shard in shards
+        ))
+        positions: Dict[str, int] = {}
+        for position, doc_id in enumerate(doc_ids):
+            positions.setdefault(doc_id, position)
+        found = {}
+        for result in itertools.chain.from_iterable(per_shard):
+            found.setdefault(result["id"], result)
+        return sorted(found.values(), key=lambda result: positions[result["id"]])
+
+    async def get_document_by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
+        for shard in self.shards.values():
+            document = await shard.get_document_by_id(doc_id)
+            if document is not None:
+                return document
+        return None
+
+    @property
+    def live_count(self) -> int:
+        return sum(shard.live_count for shard in self.shards.values())
+
+    async def get_document_count(self) -> int:
+        counts = [await shard.get_document_count() for shard in self.shards.values()]
+        return sum(counts)
+
+    async def has_documents(self) -> bool:
+        return await self.get_document_count() > 0
+
+    def embedding_providers(self) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for shard in self.shards.values():
+            for provider, count in shard.embedding_providers().items():
+                counts[provider] = counts.get(provider, 0) + count
+        return counts
+
+    def _snapshot_summary(self, version: str) -> Dict[str, Any]:
+        directory = os.path.join(self._collection_root, version)
+        return {"shards": sorted(name for name in os.listdir(directory) if name.startswith(SHARD_PREFIX))}
+
+    async def get_stats(self) -> Dict[str, Any]:
+        """Statistiques agrégées et par shard"""
+        if not self.is_initialized:
+            return {}
+
+        shard_stats = {key: await shard.get_stats() for key, shard in self.shards.items()}
+        return {
+            "collection_name": self.collection_name,
+            "document_count": sum(stats["document_count"] for stats in shard_stats.values()),
+            "embedding_count": sum(stats["embedding_count"] for stats in shard_stats.values()),
+            "embedding_providers": self.embedding_providers(),
+            "sharding": {
+                "shard_by": self.shard_by,
+                "shard_count": len(self.shards),
+                "searches": self._searches,
+                "shards_searched": self._shards_searched,
+                "shards_pruned": self._shards_pruned,
+                "rows_per_shard": {key: stats["embedding_count"] for key, stats in shard_stats.items()}
+            },
+            "snapshot": self._snapshot_stats(),
+            "shards": shard_stats
+        }
+
+    async def cleanup(self):
+        await asyncio.gather(*(shard.cleanup() for shard in self.shards.values()))
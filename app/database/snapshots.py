@@ -0,0 +1,149 @@
+# ==============================================================================
+# FILE: app/database/snapshots.py - Cycle de vie des snapshots d'une collection
+# ==============================================================================
+#
+# Une collection est une suite de snapshots ({collection_root}/v000001, ...) et
+# le pointeur CURRENT désigne l'actif (voir index_storage.py). Une réindexation
+# remplit un nouveau snapshot à côté de l'actif puis bascule CURRENT ; les
+# autres workers suivent la bascule par un simple stat du pointeur.
+
+import logging
+import os
+from typing import Any, Dict, List
+
+from app.database import index_storage
+
+logger = logging.getLogger(__name__)
+
+
+class SnapshotMixin:
+    """
+    Snapshots versionnés d'une collection
+
+    La classe hôte définit _options (arguments du constructeur), _collection_root,
+    initialize(), cleanup() et _wait_for_compaction(), et appelle
+    _init_snapshot_state() dans son constructeur.
+    """
+
+    def _init_snapshot_state(self, snapshot_version, keep_snapshots: int):
+        # Snapshot ouvert (résolu à l'initialisation) et suivi du pointeur CURRENT
+        self.snapshot_version = snapshot_version
+        self.keep_snapshots = keep_snapshots
+        self._follows_current = snapshot_version is None
+        self._current_mtime_ns = 0
+        self._current_version = None
+
+    @property
+    def snapshot_directory(self) -> str:
+        """Répertoire du snapshot ouvert (fichiers associés à l'index, comme l'embedder local)"""
+        return os.path.join(self._collection_root, self.snapshot_version)
+
+    def _has_root_layout(self) -> bool:
+        """Base écrite directement dans la collection (avant les snapshots)"""
+        return False
+
+    def _resolve_snapshot_version(self):
+        """Choisit le snapshot à ouvrir (CURRENT), en migrant une base écrite à la racine"""
+        root = self._collection_root
+        if self.snapshot_version is None:
+            version = index_storage.read_current(root)
+            if version is None:
+                version = index_storage.next_snapshot_version(root)
+                if self._has_root_layout():
+                    index_storage.migrate_to_snapshot(root, version)
+                    logger.info(f"📦 Base existante déplacée dans le snapshot {version}")
+                else:
+                    os.makedirs(os.path.join(root, version), exist_ok=True)
+                    index_storage.write_current(root, version)
+            self.snapshot_version = version
+
+        os.makedirs(os.path.join(root, self.snapshot_version), exist_ok=True)
+        self.is_current()
+
+    def is_current(self) -> bool:
+        """Vérifie (un stat du pointeur CURRENT) que le snapshot ouvert est toujours l'actif"""
+        path = os.path.join(self._collection_root, index_storage.CURRENT_FILE)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            return True
+        if mtime_ns != self._current_mtime_ns:
+            self._current_mtime_ns = mtime_ns
+            self._current_version = index_storage.read_current(self._collection_root)
+        return self._current_version == self.snapshot_version
+
+    async def create_snapshot(self):
+        """
+        Ouvre un nouveau snapshot vide (non actif) avec la même configuration
+
+        Il est rempli à côté du snapshot actif, qui continue de servir les
+        requêtes, puis rendu actif avec activate().
+        """
+        while True:
+            version = index_storage.next_snapshot_version(self._collection_root)
+            try:
+                os.makedirs(os.path.join(self._collection_root, version))
+                break
+            except FileExistsError:
+                continue  # Snapshot créé en parallèle par un autre worker
+
+        return await self.open_snapshot(version)
+
+    async def open_snapshot(self, version: str):
+        """Ouvre un snapshot existant de la collection (sans le rendre actif)"""
+        if version not in index_storage.list_snapshots(self._collection_root):
+            raise ValueError(f"Snapshot inconnu: {version}")
+
+        store = type(self)(**{**self._options, "snapshot_version": version})
+        await store.initialize()
+        return store
+
+    async def open_active_snapshot(self):
+        """Ouvre le snapshot actuellement désigné par CURRENT"""
+        store = type(self)(**{**self._options, "snapshot_version": None})
+        await store.initialize()
+        return store
+
+    async def discard(self):
+        """Abandonne un snapshot non actif (réindexation échouée)"""
+        await self.cleanup()
+        if not self.is_current():
+            index_storage.remove_snapshot(self._collection_root, self.snapshot_version)
+
+    async def activate(self):
+        """Rend ce snapshot actif (remplacement atomique de CURRENT) et purge les plus anciens"""
+        await self._wait_for_compaction()
+        index_storage.write_current(self._collection_root, self.snapshot_version)
+        self.is_current()
+
+        older = [
+            version for version in index_storage.list_snapshots(self._collection_root)
+            if version < self.snapshot_version
+        ]
+        for version in older[:max(len(older) - self.keep_snapshots, 0)]:
+            index_storage.remove_snapshot(self._collection_root, version)
+            logger.info(f"🗑️ Snapshot {version} supprimé")
+
+        logger.info(f"🔀 Snapshot actif: {self.snapshot_version}")
+
+    def list_snapshots(self) -> List[Dict[str, Any]]:
+        """Snapshots disponibles (du plus ancien au plus récent)"""
+        active = index_storage.read_current(self._collection_root)
+        return [
+            {"version": version, "active": version == active, **self._snapshot_summary(version)}
+            for version in index_storage.list_snapshots(self._collection_root)
+        ]
+
+    def _snapshot_summary(self, version: str) -> Dict[str, Any]:
+        """Informations affichées pour un snapshot"""
+        manifest = index_storage.read_manifest(
+            index_storage.base_directory(os.path.join(self._collection_root, version))
+        ) or {}
+        return {"count": manifest.get("count"), "written_at": manifest.get("written_at")}
+
+    def _snapshot_stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.snapshot_version,
+            "active": self.is_current(),
+            "available": index_storage.list_snapshots(self._collection_root)
+        }
@@ -1,5 +1,5 @@
 # ==============================================================================
-# FILE: app/database/vector_store.py - Base de données vectorielle ultra-légère avec scikit-learn
+# FILE: app/database/vector_store.py - Base de données vectorielle ultra-légère avec NumPy
 # ==============================================================================
 
 import asyncio
@@ -7,36 +7,150 @@ import logging
 import json
 import os
 import pickle
+import time
 from datetime import datetime
-from typing import List, Dict, Any, Optional
-import uuid
+from typing import List, Dict, Any, Iterable, Optional, Tuple, Union
 
 import numpy as np
-from sklearn.metrics.pairwise import cosine_similarity
+
+from app.database import index_storage
+from app.database.dedup_index import (
+    PROVENANCE_FIELDS, DedupIndex, chunk_id, content_hash, hamming_distances, provenance_entry, simhash
+)
+from app.database.document_store import DocumentStore
+from app.database.hnsw_index import HNSWIndex
+from app.database.ivf_index import IVFIndex
+from app.database.metadata_index import MetadataIndex
+from app.database.prefix_index import PrefixIndex
+from app.database.quantization import ScalarQuantizer
+from app.database.search_view import SearchView
+from app.database.snapshots import SnapshotMixin
+from app.utils.executors import InstrumentedExecutor
+from app.utils.similarity import normalize_rows, top_k_indices, top_k_indices_batch
+from app.database.mutation_log import (
+    MutationLog, OP_ADD, OP_DELETE, OP_METADATA, OP_UPDATE, decode_vector, encode_vector
+)
 
 logger = logging.getLogger(__name__)
 
-class VectorStore:
+# Capacité initiale de la matrice d'embeddings (croissance géométrique ensuite)
+INITIAL_CAPACITY = 1024
+GROWTH_FACTOR = 2
+
+# Backends de recherche disponibles
+INDEX_BACKENDS = ("exact", "ivf", "hnsw")
+
+# Modes de stockage des vecteurs pour le passage de recherche
+QUANTIZATION_MODES = ("none", "int8")
+
+# Taille maximale (éléments float32) d'un bloc de scores requêtes x lignes en recherche groupée
+BATCH_SCORE_ELEMENTS = 16 * 1024 * 1024
+
+
+class VectorStore(SnapshotMixin):
     """Base de données vectorielle ultra-légère pour stocker les documents CGI"""
     
     def __init__(self, 
                  persist_directory: str = "./vector_db",
-                 collection_name: str = "cgi_documents"):
+                 collection_name: str = "cgi_documents",
+                 log_compaction_ratio: float = 0.25,
+                 log_compaction_min_records: int = 1000,
+                 tombstone_compaction_ratio: float = 0.2,
+                 index_backend: str = "exact",
+                 ivf_lists: Optional[int] = None,
+                 ivf_nprobe: int = 8,
+                 hnsw_m: int = 16,
+                 hnsw_ef_construction: int = 100,
+                 hnsw_ef_search: int = 64,
+                 quantization: str = "none",
+                 prefix_dimension: Optional[int] = None,
+                 rescore_factor: int = 8,
+                 document_cache_bytes: int = 32 * 1024 * 1024,
+                 max_pending_documents: int = 20000,
+                 near_duplicate_distance: Optional[int] = None,
+                 snapshot_version: Optional[str] = None,
+                 keep_snapshots: int = 3,
+                 search_executor: Optional[InstrumentedExecutor] = None):
         """
         Initialize le vector store ultra-léger
         
         Args:
             persist_directory: Répertoire de persistance
             collection_name: Nom de la collection
+            log_compaction_ratio: Taille du journal (en proportion de la collection) déclenchant une compaction
+            log_compaction_min_records: Nombre minimal d'enregistrements du journal avant compaction
+            tombstone_compaction_ratio: Proportion de lignes supprimées déclenchant la reconstruction de la matrice
+            index_backend: "exact" (parcours complet), "ivf" (listes k-means) ou "hnsw" (graphe navigable)
+            ivf_lists: Nombre de listes IVF (défaut ~4·sqrt(n))
+            ivf_nprobe: Nombre de listes IVF parcourues par requête
+            hnsw_m: Nombre de voisins par nœud du graphe HNSW (2·M au niveau 0)
+            hnsw_ef_construction: Taille de la liste de candidats à l'insertion HNSW
+            hnsw_ef_search: Taille de la liste de candidats à la recherche HNSW
+            quantization: "none" ou "int8" (passage grossier sur codes int8 puis re-score float32)
+            prefix_dimension: Dimensions du préfixe (Matryoshka) pour le premier passage (None = désactivé)
+            rescore_factor: Candidats re-scorés sur les vecteurs complets par résultat demandé
+            document_cache_bytes: Taille du cache LRU des blocs de documents décompressés
+            max_pending_documents: Documents gardés en mémoire depuis la dernière base (ajoutés,
+                                   ou ajoutés puis supprimés) au-delà desquels une compaction est lancée
+            near_duplicate_distance: Distance de Hamming SimHash (bits sur 64) en deçà de laquelle
+                                     un chunk est fusionné comme quasi-doublon (None = désactivé)
+            snapshot_version: Snapshot à ouvrir (None = snapshot actif désigné par CURRENT)
+            keep_snapshots: Snapshots précédents conservés pour un retour arrière immédiat
+            search_executor: Pool de threads des recherches (None = calcul sur la boucle d'événements)
         """
+        # Options conservées pour ouvrir d'autres snapshots avec la même configuration
+        self._options = {name: value for name, value in locals().items() if name != "self"}
+        
+        if index_backend not in INDEX_BACKENDS:
+            raise ValueError(f"Backend d'index inconnu: {index_backend} (disponibles: {INDEX_BACKENDS})")
+        if quantization not in QUANTIZATION_MODES:
+            raise ValueError(f"Quantification inconnue: {quantization} (disponibles: {QUANTIZATION_MODES})")
+        
         self.persist_directory = persist_directory
         self.collection_name = collection_name
         self.is_initialized = False
         
+        self._init_snapshot_state(snapshot_version, keep_snapshots)
+        
         # Stockage en mémoire (plus rapide)
-        self.documents = {}  # id -> document
-        self.embeddings = []  # Liste des embeddings
-        self.document_ids = []  # Liste des IDs dans l'ordre
+        self.document_cache_bytes = document_cache_bytes
+        self.max_pending_documents = max_pending_documents
+        self.documents = DocumentStore(document_cache_bytes)  # id -> document (blocs compressés lus à la demande)
+        self.document_ids = []  # Liste des IDs dans l'ordre (ligne i <-> document_ids[i])
+        
+        # Matrice float32 contiguë, pré-normalisée, préallouée par blocs
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._count = 0
+        
+        # Suppressions en O(1) : index id -> ligne et bitmap des lignes supprimées
+        self._row_index: Dict[str, int] = {}
+        self._deleted = np.zeros(0, dtype=bool)
+        self._deleted_count = 0
+        self.tombstone_compaction_ratio = tombstone_compaction_ratio
+        
+        # Métadonnées des chunks en colonnes (filtres compilés en masque NumPy)
+        self._metadata_index = MetadataIndex()
+        
+        # Hashes de contenu : un seul vecteur par texte, provenances fusionnées
+        self.near_duplicate_distance = near_duplicate_distance
+        self._dedup = DedupIndex()
+        self._merged_duplicates = {"exact": 0, "near": 0}
+        
+        # Index de recherche approchée (construit lors des compactions)
+        self.index_backend = index_backend
+        self.ivf_lists = ivf_lists
+        self.ivf_nprobe = ivf_nprobe
+        self._ivf = IVFIndex()
+        self._hnsw = HNSWIndex(m=hnsw_m, ef_construction=hnsw_ef_construction, ef_search=hnsw_ef_search)
+        
+        # Codes int8 en mémoire, vecteurs float32 laissés sur disque pour le re-score
+        self.quantization = quantization
+        self.rescore_factor = rescore_factor
+        self._quantizer = ScalarQuantizer()
+        
+        # Préfixes tronqués renormalisés : premier passage à dimension réduite
+        self.prefix_dimension = prefix_dimension
+        self._prefix = PrefixIndex(prefix_dimension) if prefix_dimension else None
         
         # Métadonnées de la collection
         self.collection_metadata = {
@@ -45,6 +159,136 @@ class VectorStore:
             "document_count": 0,
             "total_tokens": 0
         }
+        
+        # Journal des mutations + compaction périodique dans la base
+        self.log_compaction_ratio = log_compaction_ratio
+        self.log_compaction_min_records = log_compaction_min_records
+        self._log = MutationLog(self._collection_dir)
+        self._base_generation: Optional[str] = None  # Génération ouverte en mémoire
+        self._compaction_lock = asyncio.Lock()
+        self._compaction_task: Optional[asyncio.Task] = None
+        self._hnsw_lock = asyncio.Lock()  # Une insertion dans le graphe HNSW à la fois
+        
+        # Scoring NumPy hors de la boucle d'événements (les vues rendent la lecture sûre)
+        self.search_executor = search_executor
+        
+        # Vue immuable lue par les recherches, republiée après chaque mutation ;
+        # les structures qu'elle référence sont copiées avant modification
+        self._view: SearchView = None
+        self._update_years = None  # (vue, années distinctes) pour l'élagage des shards
+        self._deleted_shared = False
+        self._metadata_shared = False
+        self._publish_view()
+    
+    def _publish_view(self):
+        """Publie l'état courant pour les recherches (une affectation, sans verrou)"""
+        self._view = SearchView(
+            count=self._count,
+            matrix=self._matrix,
+            deleted=self._deleted,
+            deleted_count=self._deleted_count,
+            document_ids=self.document_ids,
+            documents=self.documents,
+            metadata_index=self._metadata_index,
+            ivf=self._ivf,
+            hnsw=self._hnsw,
+            quantizer=self._quantizer,
+            prefix=self._prefix
+        )
+        self._deleted_shared = True
+        self._metadata_shared = True
+    
+    def update_years(self) -> np.ndarray:
+        """Années de mise à jour distinctes des lignes non supprimées (calculées une fois par vue)"""
+        view = self._view
+        cached = self._update_years
+        if cached is not None and cached[0] is view:
+            return cached[1]
+        
+        years = view.metadata_index.update_year[:view.count]
+        live = view.live_mask()
+        years = np.unique(years if live is None else years[live])
+        self._update_years = (view, years)
+        return years
+    
+    @property
+    def embeddings(self) -> np.ndarray:
+        """Vue (sans copie) sur les embeddings normalisés effectivement stockés"""
+        return self._matrix[:self._count]
+    
+    def _reserve(self, extra_rows: int, dimension: int):
+        """Garantit la place pour extra_rows lignes supplémentaires (croissance géométrique)"""
+        if self._matrix.shape[1] != dimension:
+            if self._count:
+                raise ValueError(
+                    f"Dimension d'embedding incohérente: {dimension} au lieu de {self._matrix.shape[1]}"
+                )
+            self._matrix = np.empty((0, dimension), dtype=np.float32)
+        
+        required = self._count + extra_rows
+        capacity = self._matrix.shape[0]
+        if required <= capacity:
+            return
+        
+        new_capacity = max(capacity, INITIAL_CAPACITY)
+        while new_capacity < required:
+            new_capacity *= GROWTH_FACTOR
+        
+        new_matrix = np.empty((new_capacity, dimension), dtype=np.float32)
+        new_matrix[:self._count] = self._matrix[:self._count]
+        self._matrix = new_matrix
+        
+        new_deleted = np.zeros(new_capacity, dtype=bool)
+        new_deleted[:self._count] = self._deleted[:self._count]
+        self._deleted = new_deleted
+        self._metadata_index.reserve(new_capacity)
+        self._dedup.reserve(new_capacity)
+    
+    def _append_embeddings(self, embeddings: np.ndarray):
+        """Ajoute des embeddings (normalisés) à la fin de la matrice"""
+        if embeddings.size == 0:
+            return
+        self._reserve(embeddings.shape[0], embeddings.shape[1])
+        self._matrix[self._count:self._count + embeddings.shape[0]] = normalize_rows(embeddings)
+        self._count += embeddings.shape[0]
+    
+    def live_embeddings(self) -> np.ndarray:
+        """Copie des embeddings normalisés des lignes non supprimées"""
+        return np.asarray(self.embeddings[~self._deleted[:self._count]])
+    
+    @property
+    def live_count(self) -> int:
+        """Nombre de lignes non supprimées"""
+        return self._count - self._deleted_count
+    
+    def _reset_rows(self, document_ids: List[str]):
+        """Reconstruit l'index id -> ligne et la bitmap pour une matrice dense"""
+        self.document_ids = document_ids
+        self._row_index = {doc_id: row for row, doc_id in enumerate(document_ids)}
+        self._deleted = np.zeros(max(self._matrix.shape[0], len(document_ids)), dtype=bool)
+        self._deleted_count = 0
+    
+    @property
+    def _collection_root(self) -> str:
+        """Répertoire de la collection (pointeur CURRENT + snapshots)"""
+        return os.path.join(self.persist_directory, self.collection_name)
+    
+    @property
+    def _collection_dir(self) -> str:
+        """Répertoire du snapshot ouvert"""
+        if self.snapshot_version is None:
+            return self._collection_root
+        return os.path.join(self._collection_root, self.snapshot_version)
+    
+    def _set_embeddings(self, embeddings: Any):
+        """Remplace toute la matrice (chargement depuis le disque)"""
+        self._matrix = np.empty((0, 0), dtype=np.float32)
+        self._count = 0
+        self._deleted = np.zeros(0, dtype=bool)
+        array = np.asarray(embeddings, dtype=np.float32)
+        if array.ndim == 2 and array.shape[0]:
+            self._append_embeddings(array)
+        self._reset_rows(list(self.document_ids))
     
     async def initialize(self):
         """Initialize le vector store ultra-léger"""
@@ -57,6 +301,7 @@ class VectorStore:
             
             # Charger les données existantes si elles existent
             await self._load_data()
+            self._publish_view()
             
             if not self.documents:
                 # Initialiser les métadonnées pour une nouvelle collection
@@ -77,26 +322,41 @@ class VectorStore:
     
     async def add_documents(self, 
                            documents: List[Dict[str, Any]], 
-                          embeddings: List[List[float]]):
+                          embeddings: List[List[float]]) -> List[str]:
         """
         Ajoute des documents avec leurs embeddings
         
         Args:
             documents: Liste des documents à ajouter
             embeddings: Liste des embeddings correspondants
+            
+        Returns:
+            Pour chaque document ajouté, l'id du chunk stocké qui le contient (le sien,
+            ou celui du chunk dans lequel il a été fusionné comme doublon)
         """
         if not self.is_initialized:
             await self.initialize()
         
         try:
-            for doc, embedding in zip(documents, embeddings):
-                # Générer un ID unique
-                doc_id = str(uuid.uuid4())
-                
+            count = min(len(documents), len(embeddings))
+            if count == 0:
+                return []
+            await self._follow_log()
+            embedding_array = normalize_rows(np.asarray(embeddings[:count], dtype=np.float32))
+            
+            doc_ids = []
+            stored_docs = []
+            new_rows = []
+            updated_docs: Dict[str, Dict[str, Any]] = {}  # Chunks existants recevant une provenance
+            batch_hashes: Dict[str, int] = {}  # content_hash -> position dans stored_docs
+            batch_fingerprints = []
+            merged = 0
+            changed_ids = set()
+            stored_ids = []  # Id du chunk stocké pour chaque document
+            for i, doc in enumerate(documents[:count]):
                 # Stocker le document avec toutes les métadonnées importantes
                 # Les champs title, section, article, source_file peuvent être dans doc ou dans metadata
                 stored_doc = {
-                    "id": doc_id,
                     "content": doc["content"],
                     "metadata": doc.get("metadata", {}),
                     "created_at": datetime.now().isoformat()
@@ -109,25 +369,177 @@ class VectorStore:
                     elif field in doc.get("metadata", {}):
                         stored_doc[field] = doc["metadata"][field]
                 
-                self.documents[doc_id] = stored_doc
+                # ID déterministe (contenu normalisé + source) et clé de déduplication
+                digest = content_hash(doc["content"])
+                stored_doc["id"] = chunk_id(doc["content"], stored_doc.get("source_file"))
+                stored_doc["content_hash"] = digest
+                stored_doc["provenance"] = [provenance_entry(stored_doc)]
+                fingerprint = simhash(doc["content"]) if self.near_duplicate_distance is not None else 0
+                
+                # Doublon : la provenance rejoint le chunk existant, aucun vecteur ajouté
+                target = self._find_duplicate(digest, fingerprint, batch_hashes, batch_fingerprints,
+                                              stored_docs, updated_docs)
+                if target is not None:
+                    stored_ids.append(target["id"])
+                    merged += 1
+                    if self._merge_provenance(target, stored_doc["provenance"][0]) and target["id"] in updated_docs:
+                        changed_ids.add(target["id"])
+                    continue
                 
-                # Stocker l'embedding
-                self.embeddings.append(embedding)
-                self.document_ids.append(doc_id)
+                stored_ids.append(stored_doc["id"])
+                batch_hashes.setdefault(digest, len(stored_docs))
+                batch_fingerprints.append(fingerprint)
+                doc_ids.append(stored_doc["id"])
+                stored_docs.append(stored_doc)
+                new_rows.append(i)
             
-            # Mettre à jour les métadonnées
-            self.collection_metadata["document_count"] = len(self.documents)
-            self.collection_metadata["last_updated"] = datetime.now().isoformat()
+            # Journaliser avant d'appliquer (O(changement), pas de réécriture complète)
+            records = [
+                {"op": OP_ADD, "id": doc_id, "document": stored_doc, "vector": encode_vector(embedding_array[i])}
+                for doc_id, stored_doc, i in zip(doc_ids, stored_docs, new_rows)
+            ]
+            updated_docs = {doc_id: updated_docs[doc_id] for doc_id in changed_ids}
+            records.extend(
+                {"op": OP_UPDATE, "id": doc_id, "document": document}
+                for doc_id, document in updated_docs.items()
+            )
+            records.append(self._metadata_record(len(self.documents) + len(stored_docs)))
+            self._log.append(records)
             
-            # Sauvegarder
-            await self._save_data()
+            if stored_docs:
+                self._apply_add(doc_ids, stored_docs, embedding_array[new_rows])
+            for doc_id, document in updated_docs.items():
+                self._apply_update(doc_id, document)
+            self._apply_metadata(records[-1]["metadata"])
+            # La vue n'est publiée qu'une fois le graphe HNSW à jour
+            await self._extend_hnsw()
+            self._publish_view()
+            self._schedule_compaction()
             
-            logger.info(f"✅ {len(documents)} documents ajoutés au vector store")
+            logger.info(
+                f"✅ {len(stored_docs)} documents ajoutés au vector store "
+                f"({merged} doublons fusionnés)"
+            )
+            return stored_ids
             
         except Exception as e:
             logger.error(f"❌ Erreur ajout documents: {e}")
             raise
     
+    def _find_duplicate(self, digest: str, fingerprint: int,
+                        batch_hashes: Dict[str, int], batch_fingerprints: List[int],
+                        batch_docs: List[Dict[str, Any]],
+                        updated_docs: Dict[str, Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """
+        Document (du lot en cours ou déjà stocké) dont le chunk est un doublon
+        
+        Les documents déjà stockés sont copiés dans updated_docs pour être
+        journalisés comme mises à jour.
+        """
+        if digest in batch_hashes:
+            self._merged_duplicates["exact"] += 1
+            return batch_docs[batch_hashes[digest]]
+        
+        row = self._dedup.find_exact(digest)
+        kind = "exact"
+        if row is None and self.near_duplicate_distance is not None:
+            if batch_fingerprints:
+                distances = hamming_distances(np.array(batch_fingerprints, dtype=np.uint64), fingerprint)
+                position = int(np.argmin(distances))
+                if distances[position] <= self.near_duplicate_distance:
+                    self._merged_duplicates["near"] += 1
+                    return batch_docs[position]
+            row = self._dedup.find_near(fingerprint, ~self._deleted[:self._count], self.near_duplicate_distance)
+            kind = "near"
+        if row is None:
+            return None
+        
+        self._merged_duplicates[kind] += 1
+        doc_id = self.document_ids[row]
+        if doc_id not in updated_docs:
+            document = dict(self.documents[doc_id])
+            document["provenance"] = list(document.get("provenance") or [provenance_entry(document)])
+            updated_docs[doc_id] = document
+        return updated_docs[doc_id]
+    
+    @staticmethod
+    def _merge_provenance(document: Dict[str, Any], entry: Dict[str, Any]) -> bool:
+        """Ajoute une provenance au chunk si elle n'y figure pas déjà"""
+        if entry in document["provenance"]:
+            return False
+        document["provenance"].append(entry)
+        return True
+    
+    def _apply_add(self, doc_ids: List[str], stored_docs: List[Dict[str, Any]], vectors: np.ndarray):
+        """Applique un ajout en mémoire (vecteurs déjà normalisés)"""
+        # Stocker les embeddings dans la matrice contiguë
+        self._reserve(vectors.shape[0], vectors.shape[1])
+        self._metadata_index.set_rows(self._count, stored_docs)
+        self._dedup.set_rows(self._count, stored_docs, with_simhash=self.near_duplicate_distance is not None)
+        self._ivf.add(self._count, vectors)
+        self._quantizer.add(self._count, vectors)
+        if self._prefix is not None:
+            self._prefix.add(self._count, vectors)
+        for row, (doc_id, stored_doc) in enumerate(zip(doc_ids, stored_docs), start=self._count):
+            self.documents[doc_id] = stored_doc
+            self.document_ids.append(doc_id)
+            self._row_index[doc_id] = row
+        
+        self._matrix[self._count:self._count + vectors.shape[0]] = vectors
+        self._count += vectors.shape[0]
+    
+    async def _extend_hnsw(self):
+        """Insère dans le graphe HNSW les lignes ajoutées (hors boucle d'événements)"""
+        if self.index_backend != "hnsw":
+            return
+        async with self._hnsw_lock:
+            loop = asyncio.get_running_loop()
+            # Les lignes ajoutées pendant une insertion sont reprises au tour suivant
+            while self._hnsw.count < self._count:
+                hnsw, matrix, count = self._hnsw, self._matrix, self._count
+                await loop.run_in_executor(None, hnsw.add, matrix, count)
+    
+    def _apply_delete(self, doc_id: str) -> bool:
+        """Applique une suppression en mémoire (marquage de la ligne, sans décalage)"""
+        row = self._row_index.pop(doc_id, None)
+        if row is None:
+            return False
+        
+        if self._deleted_shared:
+            self._deleted = self._deleted.copy()
+            self._deleted_shared = False
+        self._deleted[row] = True
+        self._deleted_count += 1
+        self._dedup.remove(row)
+        del self.documents[doc_id]
+        return True
+    
+    def _apply_update(self, doc_id: str, document: Dict[str, Any]):
+        """Remplace un document existant (même ligne, même vecteur)"""
+        row = self._row_index.get(doc_id)
+        if row is None:
+            return
+        
+        if self._metadata_shared:
+            self._metadata_index = self._metadata_index.copy()
+            self._metadata_shared = False
+        self.documents[doc_id] = document
+        self._metadata_index.set_rows(row, [document])
+        self._dedup.set_rows(row, [document])
+    
+    def _apply_metadata(self, metadata: Dict[str, Any]):
+        """Applique une mise à jour des métadonnées de la collection"""
+        self.collection_metadata.update(metadata)
+    
+    def _metadata_record(self, document_count: int, **extra: Any) -> Dict[str, Any]:
+        """Enregistrement de journal pour les métadonnées de la collection"""
+        metadata = {
+            "document_count": document_count,
+            "last_updated": datetime.now().isoformat(),
+            **extra
+        }
+        return {"op": OP_METADATA, "metadata": metadata}
+    
     async def similarity_search(self, query_embedding: List[float], 
                               top_k: int = 5,
                               filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
@@ -142,96 +554,372 @@ class VectorStore:
         Returns:
             Liste des documents les plus similaires
         """
-        if not self.is_initialized or not self.embeddings:
+        # Une seule lecture de l'état : la recherche reste cohérente même si
+        # des mutations sont publiées pendant son exécution
+        view = self._view
+        if not self.is_initialized or view.live_count == 0:
             return []
         
         try:
-            # Convertir en arrays numpy
-            query_array = np.array(query_embedding).reshape(1, -1)
-            embeddings_array = np.array(self.embeddings)
-            
-            # Calculer les similarités cosinus
-            similarities = cosine_similarity(query_array, embeddings_array)[0]
-            
-            # Créer la liste des résultats avec scores
-            results = []
-            for i, similarity in enumerate(similarities):
-                doc_id = self.document_ids[i]
-                document = self.documents[doc_id]
-                
-                # Appliquer les filtres si spécifiés
-                if filter_criteria and not self._matches_filter(document, filter_criteria):
-                    continue
-                
-                # Construire le résultat avec tous les champs disponibles
-                result = {
-                    "id": doc_id,
-                    "content": document["content"],
-                    "metadata": document.get("metadata", {}),
-                    "similarity_score": float(similarity),
-                    "created_at": document.get("created_at", "")
-                }
-                
-                # Ajouter les champs title, section, article, source_file s'ils existent
-                for field in ["title", "section", "article", "source_file"]:
-                    if field in document:
-                        result[field] = document[field]
-                
-                results.append(result)
-            
-            # Trier par score de similarité décroissant
-            results.sort(key=lambda x: x["similarity_score"], reverse=True)
-            
-            # Retourner les top_k résultats
-            return results[:top_k]
+            return await self._run_search(self._search, view, query_embedding, top_k, filter_criteria)
             
         except Exception as e:
             logger.error(f"❌ Erreur recherche similarité: {e}")
             return []
     
-    def _matches_filter(self, document: Dict[str, Any], filter_criteria: Dict[str, Any]) -> bool:
-        """Vérifie si un document correspond aux critères de filtrage avancé"""
+    async def _run_search(self, func, *args: Any) -> Any:
+        """Exécute une recherche dans le pool de recherche (ou directement sans pool)"""
+        if self.search_executor is None:
+            return func(*args)
+        return await self.search_executor.run(func, *args)
+    
+    def _search(self, view: SearchView, query_embedding: List[float], top_k: int,
+                filter_criteria: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Recherche d'une requête sur une vue (calcul CPU, hors boucle d'événements)"""
+        # Normaliser la requête : la similarité cosinus devient un simple produit scalaire
+        query = normalize_rows(np.asarray(query_embedding, dtype=np.float32).ravel())
+        
+        mask = self._filter_mask(view, filter_criteria)
+        results = []
+        for row, similarity in self._search_rows(view, query, top_k, mask):
+            results.append(self._build_result(view, row, similarity))
+        
+        return results
+    
+    async def similarity_search_batch(self, query_matrix: Union[np.ndarray, List[List[float]]],
+                                      top_k: int = 5,
+                                      filter_criteria: Union[Dict[str, Any], List[Optional[Dict[str, Any]]], None] = None
+                                      ) -> List[List[Dict[str, Any]]]:
+        """
+        Recherche de similarité pour plusieurs requêtes à la fois
+        
+        Les requêtes partageant les mêmes critères sont scorées par un seul
+        produit matrice-matrice (recherche exacte) au lieu de N produits
+        matrice-vecteur.
+        
+        Args:
+            query_matrix: Embeddings des requêtes (une par ligne)
+            top_k: Nombre de résultats par requête
+            filter_criteria: Critères communs, ou une liste de critères (un par requête)
+            
+        Returns:
+            Pour chaque requête, la liste des documents les plus similaires
+        """
+        queries = np.asarray(query_matrix, dtype=np.float32)
+        if queries.ndim == 1:
+            queries = queries.reshape(1, -1)
+        view = self._view
+        if not self.is_initialized or view.live_count == 0:
+            return [[] for _ in range(queries.shape[0])]
+        
         try:
-            metadata = document.get("metadata", {})
-            
-            for key, value in filter_criteria.items():
-                # Filtrage par type d'impôt
-                if key == "impot_type":
-                    impot_types = metadata.get("impot_types", [])
-                    if value.upper() not in [it.upper() for it in impot_types]:
-                        return False
-                
-                # Filtrage par régime
-                elif key == "regime":
-                    regime = metadata.get("regime", "")
-                    if regime.upper() != value.upper():
-                        return False
-                
-                # Filtrage par année de mise à jour
-                elif key == "update_year":
-                    update_date = metadata.get("update_date", "")
-                    if not update_date or str(value) not in update_date:
-                        return False
-                
-                # Filtrage par catégorie fiscale
-                elif key == "fiscal_category":
-                    fiscal_category = metadata.get("fiscal_category", "")
-                    if fiscal_category.upper() != value.upper():
-                        return False
-                
-                # Filtrage standard (métadonnées directes)
-                elif key in metadata:
-                    if metadata[key] != value:
-                        return False
-                else:
-                    # Si la clé n'existe pas dans les métadonnées, le filtre échoue
-                    return False
+            return await self._run_search(self._search_batch, view, queries, top_k, filter_criteria)
             
-            return True
         except Exception as e:
-            logger.warning(f"⚠️ Erreur filtrage: {e}")
-            return False
+            logger.error(f"❌ Erreur recherche similarité groupée: {e}")
+            return [[] for _ in range(queries.shape[0])]
+    
+    def _search_batch(self, view: SearchView, queries: np.ndarray, top_k: int,
+                      filter_criteria: Union[Dict[str, Any], List[Optional[Dict[str, Any]]], None]
+                      ) -> List[List[Dict[str, Any]]]:
+        """Recherche groupée sur une vue (calcul CPU, hors boucle d'événements)"""
+        queries = normalize_rows(queries)
+        if isinstance(filter_criteria, list):
+            criteria_list = filter_criteria
+        else:
+            criteria_list = [filter_criteria] * queries.shape[0]
+        
+        # Un masque par jeu de critères distinct
+        groups: Dict[str, List[int]] = {}
+        for i, criteria in enumerate(criteria_list):
+            key = json.dumps(criteria, sort_keys=True, default=str) if criteria else ""
+            groups.setdefault(key, []).append(i)
+        
+        results: List[List[Dict[str, Any]]] = [[] for _ in range(queries.shape[0])]
+        for indices in groups.values():
+            mask = self._filter_mask(view, criteria_list[indices[0]])
+            for i, hits in zip(indices, self._search_rows_batch(view, queries[indices], top_k, mask)):
+                results[i] = [self._build_result(view, row, similarity) for row, similarity in hits]
+        
+        return results
+    
+    def _search_rows_batch(self, view: SearchView, queries: np.ndarray, top_k: int,
+                           mask: Optional[np.ndarray]) -> List[List[tuple]]:
+        """
+        Sélectionne les top_k lignes pour chaque requête normalisée (même masque)
+        
+        La recherche exacte est groupée par blocs de requêtes ; les backends
+        approchés et les premiers passages grossiers restent requête par requête.
+        """
+        has_coarse_pass = view.prefix is not None or self.quantization == "int8"
+        if self.index_backend != "exact" or has_coarse_pass:
+            return [self._search_rows(view, query, top_k, mask) for query in queries]
+        
+        rows = None
+        if mask is not None:
+            rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                return [[] for _ in range(queries.shape[0])]
+            top_k = min(top_k, rows.size)
+            if rows.size >= view.count // 2:
+                rows = None
+        
+        matrix = view.embeddings if rows is None else view.matrix[rows]
+        block = max(1, BATCH_SCORE_ELEMENTS // max(matrix.shape[0], 1))
+        
+        results = []
+        for start in range(0, queries.shape[0], block):
+            similarities = queries[start:start + block] @ matrix.T
+            if rows is None and mask is not None:
+                similarities[:, ~mask] = -np.inf
+            selected = top_k_indices_batch(similarities, top_k)
+            for scores, indices in zip(similarities, selected):
+                results.append([
+                    (int(rows[i]) if rows is not None else int(i), float(scores[i]))
+                    for i in indices
+                ])
+        return results
+    
+    def _search_rows(self, view: SearchView, query: np.ndarray, top_k: int, mask: Optional[np.ndarray],
+                     nprobe: Optional[int] = None, ef_search: Optional[int] = None,
+                     rescore_factor: Optional[int] = None, exact: bool = False) -> List[tuple]:
+        """
+        Sélectionne les top_k lignes pour une requête normalisée
+        
+        Args:
+            view: État lu (les candidats des index approchés sont bornés à view.count)
+            query: Requête normalisée (float32)
+            top_k: Nombre de résultats
+            mask: Lignes autorisées (None = toutes)
+            nprobe: Listes IVF parcourues (défaut: ivf_nprobe)
+            ef_search: Candidats HNSW explorés (défaut: hnsw_ef_search)
+            rescore_factor: Candidats re-scorés par résultat (défaut: rescore_factor)
+            exact: Forcer le parcours complet
+            
+        Returns:
+            Liste de (ligne, similarité) triée par similarité décroissante
+        """
+        # Lignes candidates : non supprimées et conformes aux filtres
+        rows = None
+        if mask is not None:
+            rows = np.flatnonzero(mask)
+            if rows.size == 0:
+                return []
+        
+        # Recherche approchée : ne scorer que les listes IVF les plus proches
+        if not exact and self.index_backend == "ivf" and view.ivf.is_built:
+            nprobe = nprobe or self.ivf_nprobe
+            expected = view.count * nprobe / view.ivf.n_lists
+            if rows is None or rows.size > expected:
+                candidates = view.ivf.candidates(query, nprobe)
+                candidates = candidates[candidates < view.count]
+                if mask is not None:
+                    candidates = candidates[mask[candidates]]
+                if candidates.size >= top_k:
+                    rows = candidates
+        
+        # Recherche approchée : parcours du graphe HNSW
+        if not exact and self.index_backend == "hnsw" and view.hnsw.count >= view.count:
+            ef_search = max(ef_search or view.hnsw.ef_search, top_k)
+            if rows is None or rows.size > ef_search:
+                candidates = view.hnsw.search(query, view.embeddings, top_k, ef=ef_search)
+                if mask is not None:
+                    candidates = candidates[mask[candidates]]
+                if candidates.size >= top_k:
+                    rows = candidates
+        
+        # Premier passage grossier (préfixe tronqué ou codes int8), seule une
+        # courte liste est re-scorée sur les vecteurs complets float32
+        coarse_index = None
+        if view.prefix is not None and view.prefix.count >= view.count:
+            coarse_index = view.prefix
+        elif self.quantization == "int8" and view.quantizer.count >= view.count:
+            coarse_index = view.quantizer
+        if not exact and coarse_index is not None:
+            rescore = top_k * (rescore_factor or self.rescore_factor)
+            if rows is None or rows.size > rescore:
+                if rows is None:
+                    coarse = coarse_index.score(query)[:view.count]
+                else:
+                    coarse = coarse_index.score(query, rows)
+                selected = top_k_indices(coarse, rescore)
+                rows = selected if rows is None else rows[selected]
+        
+        if rows is not None:
+            top_k = min(top_k, rows.size)
+        
+        if rows is not None and rows.size < view.count // 2:
+            # Filtre sélectif ou candidats (IVF, HNSW, int8) : ne scorer que ces lignes
+            similarities = view.matrix[rows] @ query
+        else:
+            similarities = view.embeddings @ query
+            if mask is not None:
+                similarities = np.where(mask, similarities, -np.inf)
+            rows = None
+        
+        # Sélection top-k partielle, seuls les gagnants sont retournés
+        selected = top_k_indices(similarities, top_k)
+        return [
+            (int(rows[i]) if rows is not None else int(i), float(similarities[i]))
+            for i in selected
+        ]
+    
+    def evaluate_ann_recall(self, queries: np.ndarray, top_k: int = 10,
+                            nprobe_values: Optional[List[int]] = None,
+                            ef_search_values: Optional[List[int]] = None,
+                            rescore_factor_values: Optional[List[int]] = None) -> Dict[str, Any]:
+        """
+        Rapport recall@k de la recherche approchée par rapport à la recherche exacte
+        
+        Args:
+            queries: Matrice de requêtes (une par ligne)
+            top_k: Nombre de résultats comparés
+            nprobe_values: Valeurs de nprobe à évaluer (backend ivf)
+            ef_search_values: Valeurs de ef_search à évaluer (backend hnsw)
+            rescore_factor_values: Valeurs de rescore_factor à évaluer (préfixe ou int8, backend exact)
+            
+        Returns:
+            Recall@k et latence moyenne pour chaque valeur du paramètre
+        """
+        queries = normalize_rows(np.asarray(queries, dtype=np.float32))
+        view = self._view
+        mask = self._filter_mask(view, None)
+        
+        exact_results = []
+        start = time.perf_counter()
+        for query in queries:
+            exact_results.append({row for row, _ in self._search_rows(view, query, top_k, mask, exact=True)})
+        exact_latency = (time.perf_counter() - start) / max(len(queries), 1)
+        
+        report = {
+            "backend": self.index_backend,
+            "top_k": top_k,
+            "queries": len(queries),
+            "live_rows": view.live_count,
+            "exact_latency_ms": round(exact_latency * 1000, 3),
+            "results": []
+        }
+        if self.index_backend == "ivf":
+            report["ivf_lists"] = view.ivf.n_lists
+            parameter, values = "nprobe", nprobe_values or [self.ivf_nprobe]
+        elif self.index_backend == "hnsw":
+            parameter, values = "ef_search", ef_search_values or [view.hnsw.ef_search]
+        elif view.prefix is not None or self.quantization == "int8":
+            report["prefix_dimension"] = self.prefix_dimension
+            report["quantization"] = self.quantization
+            parameter, values = "rescore_factor", rescore_factor_values or [self.rescore_factor]
+        else:
+            parameter, values = "exact", [True]
+        
+        for value in values:
+            hits = 0
+            expected = 0
+            start = time.perf_counter()
+            for query, exact in zip(queries, exact_results):
+                approx = {row for row, _ in self._search_rows(view, query, top_k, mask, **{parameter: value})}
+                hits += len(approx & exact)
+                expected += len(exact)
+            latency = (time.perf_counter() - start) / max(len(queries), 1)
+            report["results"].append({
+                parameter: value,
+                "recall_at_k": round(hits / expected, 4) if expected else 0.0,
+                "mean_latency_ms": round(latency * 1000, 3)
+            })
+        
+        return report
+    
+    def _filter_mask(self, view: SearchView, filter_criteria: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """
+        Masque booléen des lignes recherchables de la vue (None si toutes le sont)
+        
+        Les critères sont compilés sur les colonnes de métadonnées (voir
+        metadata_index.py pour la syntaxe : ET/OU/NON, $in, intervalles).
+        """
+        mask = view.live_mask()
+        if filter_criteria:
+            matches = view.metadata_index.evaluate(
+                filter_criteria, view.count,
+                fallback=lambda key, predicate: self._fallback_mask(view, key, predicate)
+            )
+            mask = matches if mask is None else mask & matches
+        return mask
     
+    @staticmethod
+    def _fallback_mask(view: SearchView, key: str, predicate) -> np.ndarray:
+        """Filtrage ligne par ligne pour une clé de métadonnées sans colonne"""
+        matches = np.zeros(view.count, dtype=bool)
+        for row in np.flatnonzero(~view.deleted[:view.count]):
+            metadata = view.document(row).get("metadata", {})
+            # Si la clé n'existe pas dans les métadonnées, le filtre échoue
+            matches[row] = key in metadata and predicate(metadata[key])
+        return matches
+    
+    @staticmethod
+    def _build_result(view: SearchView, row: int, similarity: float) -> Dict[str, Any]:
+        """Construit le résultat de recherche avec tous les champs disponibles"""
+        doc_id = view.document_ids[row]
+        document = view.document(row)
+        result = {
+            "id": doc_id,
+            "content": document["content"],
+            "metadata": document.get("metadata", {}),
+            "similarity_score": similarity,
+            "created_at": document.get("created_at", "")
+        }
+        
+        # Ajouter les champs title, section, article, source_file s'ils existent
+        for field in ["title", "section", "article", "source_file", "provenance", "content_hash"]:
+            if field in document:
+                result[field] = document[field]
+        
+        return result
+    
+    async def get_documents(self, doc_ids: List[str],
+                            query_embedding: Optional[List[float]] = None,
+                            filter_criteria: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """
+        Résultats (format de similarity_search) pour des chunks désignés par leur id
+
+        Args:
+            doc_ids: Ids des chunks (index lexical, renvoi d'article), ordre conservé
+            query_embedding: Requête pour calculer similarity_score (0.0 sinon)
+            filter_criteria: Critères de filtrage (optionnel)
+
+        Returns:
+            Chunks existants et conformes aux filtres ; les ids inconnus ou supprimés sont ignorés
+        """
+        view = self._view
+        if not self.is_initialized or view.live_count == 0 or not doc_ids:
+            return []
+
+        try:
+            return await self._run_search(self._fetch, view, doc_ids, query_embedding, filter_criteria)
+
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture des chunks: {e}")
+            return []
+
+    def _fetch(self, view: SearchView, doc_ids: List[str], query_embedding: Optional[List[float]],
+               filter_criteria: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Lecture de chunks par id sur une vue (hors boucle d'événements)"""
+        mask = self._filter_mask(view, filter_criteria) if filter_criteria else view.live_mask()
+        query = None
+        if query_embedding is not None:
+            query = normalize_rows(np.asarray(query_embedding, dtype=np.float32).ravel())
+
+        results = []
+        for doc_id in doc_ids:
+            # _row_index suit le store courant : la ligne n'est retenue que si la vue la désigne aussi
+            row = self._row_index.get(doc_id)
+            if row is None or row >= view.count or view.document_ids[row] != doc_id:
+                continue
+            if mask is not None and not mask[row]:
+                continue
+            similarity = float(view.matrix[row] @ query) if query is not None else 0.0
+            results.append(self._build_result(view, row, similarity))
+
+        return results
+
     async def get_document_by_id(self, doc_id: str) -> Optional[Dict[str, Any]]:
         """Récupère un document par son ID"""
         if not self.is_initialized:
@@ -241,29 +929,92 @@ class VectorStore:
     
     async def delete_document(self, doc_id: str) -> bool:
         """Supprime un document"""
-        if not self.is_initialized or doc_id not in self.documents:
+        if not self.is_initialized or doc_id not in self._row_index:
             return False
+        
+        return await self.delete_documents([doc_id]) == 1
     
-        try:
-            # Trouver l'index de l'embedding
-            if doc_id in self.document_ids:
-                idx = self.document_ids.index(doc_id)
-                self.embeddings.pop(idx)
-                self.document_ids.pop(idx)
+    async def delete_documents(self, doc_ids: List[str]) -> int:
+        """
+        Supprime plusieurs documents en une seule écriture du journal
+        
+        Args:
+            doc_ids: IDs des documents à supprimer
             
-            # Supprimer le document
-            del self.documents[doc_id]
+        Returns:
+            Nombre de documents effectivement supprimés
+        """
+        if not self.is_initialized:
+            return 0
+        
+        try:
+            await self._follow_log()
+            to_delete = list(dict.fromkeys(doc_id for doc_id in doc_ids if doc_id in self._row_index))
+            if not to_delete:
+                return 0
             
-            # Mettre à jour les métadonnées
-            self.collection_metadata["document_count"] = len(self.documents)
-            self.collection_metadata["last_updated"] = datetime.now().isoformat()
+            metadata_record = self._metadata_record(len(self.documents) - len(to_delete))
+            records = [{"op": OP_DELETE, "id": doc_id} for doc_id in to_delete]
+            self._log.append(records + [metadata_record])
             
-            await self._save_data()
-            return True
+            for doc_id in to_delete:
+                self._apply_delete(doc_id)
+            self._apply_metadata(metadata_record["metadata"])
+            self._publish_view()
+            self._schedule_compaction()
+            return len(to_delete)
             
         except Exception as e:
-            logger.error(f"❌ Erreur suppression document: {e}")
-            return False
+            logger.error(f"❌ Erreur suppression documents: {e}")
+            return 0
+    
+    async def delete_by_source_file(self, source_file: str) -> int:
+        """
+        Retire un fichier source : ses chunks sont supprimés, sauf ceux partagés
+        avec d'autres fichiers (doublons), qui perdent seulement cette provenance
+        """
+        if not self.is_initialized:
+            return 0
+        
+        await self._follow_log()
+        mask = self._filter_mask(self._view, {"source_file": source_file})
+        rows = np.union1d(np.flatnonzero(mask), self._dedup.shared_rows(self._count))
+        
+        to_delete = []
+        updated_docs = {}
+        for row in rows:
+            if self._deleted[row]:
+                continue
+            doc_id = self.document_ids[row]
+            document = self.documents[doc_id]
+            provenance = document.get("provenance") or [provenance_entry(document)]
+            remaining = [entry for entry in provenance if entry.get("source_file") != source_file]
+            if len(remaining) == len(provenance):
+                continue
+            if not remaining:
+                to_delete.append(doc_id)
+                continue
+            
+            # La première provenance restante devient la source principale du chunk
+            updated = {key: value for key, value in document.items() if key not in PROVENANCE_FIELDS}
+            updated.update(remaining[0])
+            updated["provenance"] = remaining
+            updated_docs[doc_id] = updated
+        
+        if updated_docs:
+            records = [{"op": OP_UPDATE, "id": doc_id, "document": document}
+                       for doc_id, document in updated_docs.items()]
+            self._log.append(records)
+            for doc_id, document in updated_docs.items():
+                self._apply_update(doc_id, document)
+            self._publish_view()
+        
+        deleted = await self.delete_documents(to_delete)
+        logger.info(
+            f"🗑️ {deleted} chunks supprimés pour {source_file} "
+            f"({len(updated_docs)} chunks partagés conservés)"
+        )
+        return deleted
     
     async def get_document_count(self) -> int:
         """Retourne le nombre de documents"""
@@ -273,6 +1024,14 @@ class VectorStore:
         """Vérifie s'il y a des documents"""
         return len(self.documents) > 0 if self.is_initialized else False
     
+    def embedding_providers(self) -> Dict[str, int]:
+        """Vecteurs non supprimés par fournisseur d'embeddings (plusieurs = index mixte)"""
+        view = self._view
+        live = view.live_mask()
+        return view.metadata_index.value_counts(
+            "embedding_provider", live if live is not None else np.ones(view.count, dtype=bool)
+        )
+    
     async def get_stats(self) -> Dict[str, Any]:
         """Retourne les statistiques du vector store"""
         if not self.is_initialized:
@@ -281,20 +1040,73 @@ class VectorStore:
         return {
             "collection_name": self.collection_name,
             "document_count": len(self.documents),
-            "embedding_count": len(self.embeddings),
-            "embedding_dimension": len(self.embeddings[0]) if self.embeddings else 0,
+            "embedding_count": self.live_count,
+            "deleted_rows": self._deleted_count,
+            "embedding_dimension": self._matrix.shape[1] if self._count else 0,
+            "embedding_capacity": self._matrix.shape[0],
+            "index_backend": self.index_backend,
+            "ivf": {"lists": self._ivf.n_lists, "nprobe": self.ivf_nprobe} if self.index_backend == "ivf" else None,
+            "hnsw": {
+                "m": self._hnsw.m,
+                "ef_search": self._hnsw.ef_search,
+                "max_level": self._hnsw.max_level,
+                "nodes": self._hnsw.count
+            } if self.index_backend == "hnsw" else None,
+            "quantization": self._quantization_stats(),
+            "embedding_providers": self.embedding_providers(),
+            "deduplication": {
+                "shared_chunks": int(self._dedup.shared_rows(self._count).size),
+                "merged_exact": self._merged_duplicates["exact"],
+                "merged_near": self._merged_duplicates["near"],
+                "near_duplicate_distance": self.near_duplicate_distance
+            },
+            "prefix": {
+                "dimension": self.prefix_dimension,
+                "rows": self._prefix.count,
+                "bytes": self._prefix.memory_bytes,
+                "rescore_factor": self.rescore_factor
+            } if self._prefix is not None else None,
             "metadata": self.collection_metadata,
+            "storage_format_version": index_storage.FORMAT_VERSION,
+            "snapshot": self._snapshot_stats(),
+            "mutation_log": {
+                "sequence": self._log.sequence,
+                "pending_records": self._log.record_count,
+                "size_bytes": self._log.size_bytes
+            },
+            "shared_mapping": isinstance(self._matrix, np.memmap),
+            "document_store": self.documents.get_stats(),
             "storage_size_mb": await self._get_storage_size()
         }
     
+    def _quantization_stats(self) -> Optional[Dict[str, Any]]:
+        """Mémoire des codes int8 et erreur de quantification mesurée à la compaction"""
+        if self.quantization != "int8":
+            return None
+        
+        float_bytes = self._count * self._matrix.shape[1] * 4 if self._count else 0
+        code_bytes = self._quantizer.memory_bytes
+        return {
+            "mode": self.quantization,
+            "rescore_factor": self.rescore_factor,
+            "encoded_rows": self._quantizer.count,
+            "code_bytes": code_bytes,
+            "float32_bytes": float_bytes,
+            "compression_ratio": round(float_bytes / code_bytes, 2) if code_bytes else None,
+            **self._quantizer.error
+        }
+    
     async def _get_storage_size(self) -> float:
-        """Calcule la taille de stockage en MB"""
+        """Calcule la taille de stockage en MB (base + journal des mutations)"""
         try:
             total_size = 0
-            for doc in self.documents.values():
-                total_size += len(str(doc))
-            for emb in self.embeddings:
-                total_size += len(emb) * 8  # 8 bytes par float64
+            base_directory = index_storage.base_directory(self._collection_dir)
+            for directory in {self._collection_dir, base_directory}:
+                if os.path.isdir(directory):
+                    for name in os.listdir(directory):
+                        path = os.path.join(directory, name)
+                        if os.path.isfile(path):
+                            total_size += os.path.getsize(path)
             
             return round(total_size / (1024 * 1024), 2)
         except Exception:
@@ -306,9 +1118,20 @@ class VectorStore:
             return
         
         try:
-            self.documents.clear()
-            self.embeddings.clear()
-            self.document_ids.clear()
+            await self._wait_for_compaction()
+            # Nouveaux objets : les recherches en cours gardent l'ancienne vue
+            self.documents = DocumentStore(self.document_cache_bytes)
+            self._matrix = np.empty((0, 0), dtype=np.float32)
+            self._count = 0
+            self._reset_rows([])
+            self._metadata_index = MetadataIndex()
+            self._dedup.clear()
+            self._ivf = IVFIndex()
+            self._hnsw = self._new_hnsw()
+            self._quantizer = ScalarQuantizer()
+            if self._prefix is not None:
+                self._prefix = PrefixIndex(self.prefix_dimension)
+            self._publish_view()
             
             # Réinitialiser les métadonnées
             self.collection_metadata = {
@@ -325,60 +1148,399 @@ class VectorStore:
             logger.error(f"❌ Erreur vidage vector store: {e}")
     
     async def _save_data(self):
-        """Sauvegarde les données sur disque"""
-        try:
-            data = {
-                "documents": self.documents,
-                "embeddings": self.embeddings,
-                "document_ids": self.document_ids,
-                "metadata": self.collection_metadata
-            }
+        """Écrit une base complète (compaction du journal) puis la ré-ouvre en mémoire partagée"""
+        async with self._compaction_lock:
+            try:
+                # Base réécrite entre-temps par un autre processus : la recharger puis recommencer
+                while not await self._write_base():
+                    await self._reload_collection()
+                    
+            except Exception as e:
+                logger.error(f"❌ Erreur sauvegarde données: {e}")
+    
+    async def _write_base(self) -> bool:
+        """
+        Écrit une nouvelle génération de la base, puis tronque le journal
+        
+        Returns:
+            False si la base a été compactée par un autre processus avant la capture
+            ou la bascule (l'état en mémoire doit être rechargé)
+        """
+        # Le verrou du graphe HNSW exclut les insertions pendant sa renumérotation
+        async with self._hnsw_lock:
+            # Capturer un état cohérent, mutations des autres processus comprises
+            # (les mutations suivantes restent dans le journal)
+            with self._log.lock:
+                records = self._log.read_new()
+                if records is None:
+                    return False
+                self._replay_records(records)
+                sequence = self._log.sequence
+            live = ~self._deleted[:self._count]
+            document_ids = [doc_id for doc_id, keep in zip(self.document_ids, live) if keep]
+            vectors = np.array(self.embeddings[live], dtype=np.float32)
+            raw_documents = self.documents.raw_many(document_ids)
+            columns = self._metadata_index.to_columns(live)
+            dedup_arrays = self._dedup.to_arrays(live)
+            hnsw, matrix, count = self._hnsw, self._matrix, self._count
+            metadata = dict(self.collection_metadata)
             
-            filepath = os.path.join(self.persist_directory, f"{self.collection_name}.pkl")
-            with open(filepath, 'wb') as f:
-                pickle.dump(data, f)
-                
-        except Exception as e:
-            logger.error(f"❌ Erreur sauvegarde données: {e}")
+            def write():
+                hnsw_arrays = None
+                if self.index_backend == "hnsw":
+                    hnsw.add(matrix, count)
+                    hnsw_arrays = hnsw.to_arrays(live)
+                return index_storage.write_generation(
+                    self._collection_dir, document_ids, vectors, raw_documents,
+                    metadata, log_sequence=sequence, columns=columns,
+                    indexes={**self._build_ann_indexes(vectors, hnsw_arrays), "dedup": dedup_arrays},
+                    lock=self._log.lock
+                )
+            
+            loop = asyncio.get_running_loop()
+            if await loop.run_in_executor(None, write) is None:
+                return False
+            # Le journal n'est tronqué qu'une fois la nouvelle base active (BASE basculé)
+            self._log.truncate_through(sequence)
+            
+            # Ré-ouvrir la base seulement si aucune mutation n'a eu lieu entre-temps
+            if self._log.sequence == sequence:
+                await self._open_collection(sequence)
+            return True
+    
+    def _build_ann_indexes(self, vectors: np.ndarray,
+                           hnsw_arrays: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Index de recherche approchée pour une base dense (hors boucle d'événements)
+        
+        L'IVF et les codes int8 sont ré-entraînés ; le graphe HNSW, construit
+        incrémentalement, est seulement renuméroté (hnsw_arrays capturé avec
+        l'état de la base).
+        """
+        indexes = {}
+        if self.index_backend == "ivf" and vectors.shape[0]:
+            ivf = IVFIndex()
+            ivf.build(vectors, n_lists=self.ivf_lists)
+            logger.info(f"🧭 Index IVF construit: {ivf.n_lists} listes pour {vectors.shape[0]} vecteurs")
+            indexes["ivf"] = ivf.to_arrays()
+        if self.index_backend == "hnsw" and hnsw_arrays is not None:
+            indexes["hnsw"] = hnsw_arrays
+        if self.quantization == "int8" and vectors.shape[0]:
+            quantizer = ScalarQuantizer()
+            quantizer.train(vectors)
+            logger.info(f"🗜️ Codes int8 calculés pour {vectors.shape[0]} vecteurs: {quantizer.error}")
+            indexes["sq8"] = quantizer.to_arrays()
+        return indexes
+    
+    async def build_index(self):
+        """Écrit une base dense et (re)construit l'index approché configuré"""
+        await self._wait_for_compaction()
+        await self._save_data()
+    
+    def _schedule_compaction(self):
+        """
+        Lance une compaction en arrière-plan quand le journal devient trop long,
+        que les lignes supprimées dépassent tombstone_compaction_ratio (la base
+        réécrite est dense, la matrice est donc reconstruite) ou que les documents
+        gardés en mémoire depuis la dernière base dépassent max_pending_documents
+        """
+        threshold = max(self.log_compaction_min_records, int(self._count * self.log_compaction_ratio))
+        too_many_tombstones = (
+            self._deleted_count > 0
+            and self._deleted_count >= self._count * self.tombstone_compaction_ratio
+        )
+        too_many_pending = self.documents.pending_count >= self.max_pending_documents
+        if self._log.record_count < threshold and not too_many_tombstones and not too_many_pending:
+            return
+        if self._compaction_task and not self._compaction_task.done():
+            return
+        
+        logger.info(
+            f"🗜️ Compaction ({self._log.record_count} enregistrements, "
+            f"{self._deleted_count} lignes supprimées)"
+        )
+        self._compaction_task = asyncio.get_running_loop().create_task(self._save_data())
+    
+    def _new_hnsw(self) -> HNSWIndex:
+        """Graphe HNSW vide avec les paramètres courants"""
+        return HNSWIndex(m=self._hnsw.m, ef_construction=self._hnsw.ef_construction,
+                         ef_search=self._hnsw.ef_search)
+    
+    def _rebuild_metadata_index(self):
+        """Reconstruit les colonnes de métadonnées depuis les documents"""
+        self._metadata_index = MetadataIndex()
+        self._metadata_index.reserve(self._matrix.shape[0])
+        self._metadata_index.set_rows(0, [self.documents[doc_id] for doc_id in self.document_ids])
+    
+    def _rebuild_dedup_index(self):
+        """Recalcule les hashes de contenu depuis les documents"""
+        self._dedup.clear()
+        self._dedup.reserve(self._matrix.shape[0])
+        self._dedup.set_rows(
+            0, [self.documents[doc_id] for doc_id in self.document_ids],
+            with_simhash=self.near_duplicate_distance is not None
+        )
+    
+    async def _wait_for_compaction(self):
+        """Attend la fin d'une compaction en cours"""
+        if self._compaction_task and not self._compaction_task.done():
+            await self._compaction_task
+    
+    async def _open_collection(self, sequence: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """
+        Mappe la collection sur disque (vecteurs via np.memmap, documents via offsets)
+        
+        Les index absents de la base (graphe HNSW, codes int8, préfixes) sont
+        reconstruits hors de la boucle d'événements avant de remplacer l'état
+        en mémoire.
+        
+        Args:
+            sequence: Numéro du journal attendu (compaction) ; la ré-ouverture est
+                      abandonnée si une mutation a eu lieu pendant la reconstruction
+        """
+        # Fichiers ouverts sous le verrou : aucune compaction d'un autre processus
+        # ne supprime la génération pendant sa lecture (les mappings restent valides)
+        with self._log.lock:
+            generation = index_storage.read_base(self._collection_dir)
+            base_directory = index_storage.base_directory(self._collection_dir)
+            manifest = index_storage.read_manifest(base_directory)
+            if manifest is None:
+                self._base_generation = generation
+                return None
+            
+            document_ids = index_storage.open_ids(base_directory)
+            count = len(document_ids)
+            matrix = (
+                index_storage.open_vectors(base_directory)
+                if count else np.empty((0, 0), dtype=np.float32)
+            )
+            documents = DocumentStore(self.document_cache_bytes)
+            documents.open(base_directory, document_ids, manifest)
+            arrays = {
+                name: index_storage.open_index_arrays(base_directory, name, manifest)
+                for name in ("hnsw", "sq8", "ivf", "dedup")
+            }
+            columns = index_storage.open_columns(base_directory)
+        
+        hnsw = self._new_hnsw()
+        quantizer = ScalarQuantizer()
+        prefix = PrefixIndex(self.prefix_dimension) if self._prefix is not None else None
+        rebuilds = []
+        if self.index_backend == "hnsw":
+            hnsw_arrays = arrays["hnsw"]
+            if hnsw_arrays is not None and len(hnsw_arrays["levels"]) == count:
+                hnsw.load_arrays(hnsw_arrays)
+            elif count:
+                logger.info(f"🕸️ Construction du graphe HNSW ({count} vecteurs)...")
+                rebuilds.append(lambda: hnsw.add(matrix, count))
+        
+        if self.quantization == "int8" and count:
+            sq8_arrays = arrays["sq8"]
+            if sq8_arrays is not None and len(sq8_arrays["codes"]) == count:
+                quantizer.load_arrays(sq8_arrays)
+            else:
+                logger.info(f"🗜️ Calcul des codes int8 ({count} vecteurs)...")
+                rebuilds.append(lambda: quantizer.train(matrix))
+        
+        if prefix is not None:
+            rebuilds.append(lambda: prefix.build(matrix[:count]))
+        
+        if rebuilds:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, lambda: [rebuild() for rebuild in rebuilds])
+            if sequence is not None and self._log.sequence != sequence:
+                return None
+        
+        # Nouveaux objets (copy-on-write) : une vue publiée avant la compaction
+        # continue de lire l'ancienne matrice, les anciens documents et index
+        self._base_generation = generation
+        self.documents = documents
+        self._count = count
+        self._matrix = matrix
+        self._reset_rows(document_ids)
+        
+        self._ivf = IVFIndex()
+        ivf_arrays = arrays["ivf"]
+        if ivf_arrays is not None and self.index_backend == "ivf":
+            self._ivf.load_arrays(ivf_arrays)
+        
+        self._hnsw = hnsw
+        self._quantizer = quantizer
+        self._prefix = prefix
+        
+        if columns is not None and len(columns["impot_types"]) == self._count:
+            self._metadata_index = MetadataIndex()
+            self._metadata_index.load_columns(columns)
+        else:
+            self._rebuild_metadata_index()
+        
+        dedup_arrays = arrays["dedup"]
+        if dedup_arrays is not None and len(dedup_arrays["content_hashes"]) == self._count:
+            self._dedup.load_arrays(dedup_arrays)
+            self._dedup.reserve(self._matrix.shape[0])
+            if self.near_duplicate_distance is not None and self._count and not dedup_arrays["simhashes"].any():
+                self._dedup.compute_simhashes([self.documents[doc_id] for doc_id in self.document_ids])
+        else:
+            self._rebuild_dedup_index()
+        self.collection_metadata = manifest.get("metadata", self.collection_metadata)
+        self._publish_view()
+        return manifest
+    
+    def _replay_log(self, after_sequence: int) -> int:
+        """Rejoue les mutations du journal postérieures à la base"""
+        return self._replay_records(self._log.replay(after_sequence))
+    
+    def _replay_records(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Applique en mémoire des enregistrements du journal (sans étendre le graphe HNSW)"""
+        replayed = 0
+        pending_ids, pending_docs, pending_vectors = [], [], []
+        pending_set = set()
+        
+        def flush_adds():
+            if pending_ids:
+                self._apply_add(pending_ids[:], pending_docs[:], np.vstack(pending_vectors))
+                pending_ids.clear()
+                pending_docs.clear()
+                pending_vectors.clear()
+                pending_set.clear()
+        
+        for record in records:
+            op = record.get("op")
+            if op == OP_ADD:
+                # Ligne déjà présente dans la base (enregistrement inclus dans une compaction)
+                if record["id"] in self._row_index or record["id"] in pending_set:
+                    logger.warning(f"⚠️ Ajout déjà appliqué ignoré au rejeu: {record['id']}")
+                    replayed += 1
+                    continue
+                pending_ids.append(record["id"])
+                pending_set.add(record["id"])
+                pending_docs.append(record["document"])
+                pending_vectors.append(decode_vector(record["vector"]))
+            else:
+                flush_adds()
+                if op == OP_DELETE:
+                    self._apply_delete(record["id"])
+                elif op == OP_UPDATE:
+                    self._apply_update(record["id"], record["document"])
+                elif op == OP_METADATA:
+                    self._apply_metadata(record["metadata"])
+            replayed += 1
+        
+        flush_adds()
+        return replayed
+    
+    async def _reload_collection(self) -> Tuple[Optional[Dict[str, Any]], int]:
+        """
+        Ouvre la base active puis rejoue le journal qui la suit
+        
+        Le journal est ouvert sous le verrou de la collection ; si un autre
+        processus a basculé la base pendant l'ouverture, elle est recommencée.
+        
+        Returns:
+            Manifeste de la base (None sans base) et nombre de mutations rejouées
+        """
+        while True:
+            manifest = await self._open_collection()
+            with self._log.lock:
+                if index_storage.read_base(self._collection_dir) != self._base_generation:
+                    continue
+                base_sequence = manifest.get("log_sequence", 0) if manifest else 0
+                self._log.open(base_sequence)
+                replayed = self._replay_log(base_sequence)
+            break
+        
+        await self._extend_hnsw()
+        self._publish_view()
+        return manifest, replayed
+    
+    async def _follow_log(self):
+        """
+        Rattrape les mutations journalisées par les autres processus (workers)
+        sur la même collection ; après leur compaction, leur base est rechargée
+        """
+        records = self._log.read_new()
+        if records is None:
+            logger.info("🔄 Base compactée par un autre processus, rechargement")
+            await self._reload_collection()
+        elif records:
+            self._replay_records(records)
+            await self._extend_hnsw()
+            self._publish_view()
+    
+    def _has_root_layout(self) -> bool:
+        return os.path.exists(os.path.join(self._collection_root, index_storage.MANIFEST_FILE))
+    
+    def _resolve_snapshot(self):
+        """Choisit le snapshot à ouvrir puis y rattache le journal des mutations"""
+        self._resolve_snapshot_version()
+        self._log.close()
+        self._log = MutationLog(self._collection_dir)
     
     async def _load_data(self):
-        """Charge les données depuis le disque"""
+        """Charge les données depuis le disque (base + rejeu du journal)"""
+        self._resolve_snapshot()
         try:
+            manifest, replayed = await self._reload_collection()
+            if manifest is not None:
+                logger.info(
+                    f"📚 Données chargées (mmap): {len(self.documents)} documents, "
+                    f"{replayed} mutations rejouées"
+                )
+                
+                # Réécrire une base d'un format antérieur (ex: documents non compressés)
+                if manifest.get("format_version") != index_storage.FORMAT_VERSION:
+                    logger.info(f"🔄 Conversion de la base au format {index_storage.FORMAT_VERSION}")
+                    await self._save_data()
+                return
+            
+            # Migration depuis l'ancien fichier pickle (snapshot actif uniquement)
             filepath = os.path.join(self.persist_directory, f"{self.collection_name}.pkl")
-            if os.path.exists(filepath):
+            if os.path.exists(filepath) and self._follows_current:
                 with open(filepath, 'rb') as f:
                     data = pickle.load(f)
                 
-                self.documents = data.get("documents", {})
-                self.embeddings = data.get("embeddings", [])
+                for doc_id, document in data.get("documents", {}).items():
+                    self.documents[doc_id] = document
                 self.document_ids = data.get("document_ids", [])
+                # Compatible avec l'ancien format (liste de listes de floats)
+                self._set_embeddings(data.get("embeddings", []))
+                self._rebuild_metadata_index()
+                self._rebuild_dedup_index()
                 self.collection_metadata = data.get("metadata", self.collection_metadata)
                 
-                logger.info(f"📚 Données chargées: {len(self.documents)} documents")
+                await self._save_data()
+                logger.info(f"📚 Données migrées depuis {filepath}: {len(self.documents)} documents")
             
         except Exception as e:
             logger.warning(f"⚠️ Impossible de charger les données existantes: {e}")
             # Initialiser avec des valeurs par défaut
-            self.documents = {}
-            self.embeddings = []
+            self.documents = DocumentStore(self.document_cache_bytes)
             self.document_ids = []
+            self._set_embeddings([])
+            if not self._log.is_open:
+                self._log.open()
     
     async def save_indexing_stats(self, stats: Dict[str, Any]):
         """Sauvegarde les statistiques d'indexation (compatibilité)"""
         try:
             # Mettre à jour les métadonnées avec les stats
             if "total_chunks" in stats:
-                self.collection_metadata["total_tokens"] = stats.get("total_chunks", 0)
+                await self._follow_log()
+                record = self._metadata_record(
+                    len(self.documents), total_tokens=stats.get("total_chunks", 0)
+                )
+                self._log.append([record])
+                self._apply_metadata(record["metadata"])
             
-            await self._save_data()
             logger.info("📊 Statistiques d'indexation sauvegardées")
         except Exception as e:
             logger.warning(f"⚠️ Erreur sauvegarde statistiques: {e}")
     
     async def cleanup(self):
-        """Nettoie les ressources"""
+        """Nettoie les ressources (le journal est déjà durable, aucune réécriture complète)"""
         try:
-            await self._save_data()
+            await self._wait_for_compaction()
+            self._log.close()
             logger.info("🧹 Vector store nettoyé")
         except Exception as e:
-            logger.error(f"❌ Erreur nettoyage: {e}")
\ No newline at end of file
+            logger.error(f"❌ Erreur nettoyage: {e}")
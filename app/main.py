@@ -273,7 +273,8 @@ async def stream_query(
     use_reranking: bool = Query(True, description="Utiliser le re-ranking avec cross-encoder"),
     impot_type: Optional[str] = Query(None, description="Filtrer par type d'impôt (TVA, IS, IRF, etc.)"),
     regime: Optional[str] = Query(None, description="Filtrer par régime (REEL, TPS, MICRO)"),
-    update_year: Optional[int] = Query(None, description="Filtrer par année de mise à jour")
+    update_year: Optional[int] = Query(None, description="Filtrer par année de mise à jour"),
+    direct_article: bool = Query(False, description="Renvoyer le texte des articles demandés sans passer par le LLM")
 ):
     """Endpoint de streaming pour les requêtes RAG"""
     
@@ -316,13 +317,19 @@ async def stream_query(
             quota_exceeded = False
             openai_used = False  # Track si OpenAI a été utilisé
             
-            async for chunk in rag_service.generate_response_stream(
-                question, 
-                sources, 
-                temperature=0.3, 
-                max_tokens=1000, 
-                personnalite=personnalite
-            ):
+            # Simple consultation d'articles : texte des articles streamé sans LLM
+            if direct_article and rag_service.is_article_lookup(question, sources):
+                response_stream = rag_service.stream_article_text(sources)
+            else:
+                response_stream = rag_service.generate_response_stream(
+                    question, 
+                    sources, 
+                    temperature=0.3, 
+                    max_tokens=1000, 
+                    personnalite=personnalite
+                )
+            
+            async for chunk in response_stream:
                 # Vérifier les erreurs
                 if chunk.get('error'):
                     error_message = chunk.get('error', 'Erreur inconnue')
@@ -427,13 +434,19 @@ async def query_cgi(request: QueryRequest):
         quota_exceeded = False
         openai_used = False  # Track si OpenAI a été utilisé
         
-        async for chunk in rag_service.generate_response_stream(
-            request.question, 
-            sources, 
-            request.temperature, 
-            1000, 
-            request.personnalite
-        ):
+        # Simple consultation d'articles : texte des articles sans LLM
+        if request.direct_article and rag_service.is_article_lookup(request.question, sources):
+            response_stream = rag_service.stream_article_text(sources)
+        else:
+            response_stream = rag_service.generate_response_stream(
+                request.question, 
+                sources, 
+                request.temperature, 
+                1000, 
+                request.personnalite
+            )
+        
+        async for chunk in response_stream:
             # Vérifier les erreurs
             if chunk.get('error'):
                 error_message = chunk.get('error', 'Erreur inconnue')
@@ -540,15 +553,28 @@ async def get_personnalites():
 
 @app.post("/reindex")
 async def reindex_documents():
-    """Réindexer les documents CGI"""
+    """Réindexer les documents CGI dans un nouveau snapshot (en arrière-plan)"""
+    if not rag_service:
+        raise HTTPException(status_code=503, detail="Service RAG non initialisé")
+    
+    if not rag_service.start_reindex("./data/cgi_documents"):
+        raise HTTPException(status_code=409, detail="Réindexation déjà en cours")
+    return {
+        "message": "Réindexation lancée, le snapshot actif reste servi jusqu'à la bascule",
+        "active_snapshot": rag_service.vector_store.snapshot_version
+    }
+
+@app.post("/reindex/rollback")
+async def rollback_index(version: Optional[str] = Query(None, description="Snapshot à réactiver (défaut: le précédent)")):
+    """Revenir à un snapshot précédent de l'index"""
     if not rag_service:
         raise HTTPException(status_code=503, detail="Service RAG non initialisé")
     
     try:
-        await rag_service.reindex_documents("./data/cgi_documents")
-        return {"message": "Réindexation terminée avec succès"}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erreur réindexation: {str(e)}")
+        active = await rag_service.rollback_index(version)
+        return {"message": "Retour arrière effectué", "active_snapshot": active}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
 
 # ==============================================================================
 # DÉMARRAGE DE L'APPLICATION
@@ -4,112 +4,417 @@
 
 import asyncio
 import logging
+import re
+import time
+import unicodedata
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Tuple, Union
 import json
-from sklearn.metrics.pairwise import cosine_similarity
 import google.generativeai as genai
 
+from app.database.embedding_cache import EmbeddingCache, cache_key
+from app.services.local_embedder import LocalEmbedder
+from app.utils.lru_cache import LRUCache
+from app.utils.micro_batcher import MicroBatcher
+from app.utils.rate_limiter import AsyncRateLimiter, estimate_tokens
+from app.utils.similarity import cosine_scores, top_k_similar
+
 logger = logging.getLogger(__name__)
 
+# Dimension complète des embeddings text-embedding-004
+EMBEDDING_DIMENSION = 768
+
+# Fournisseurs d'embeddings (métadonnée embedding_provider des vecteurs stockés)
+PROVIDER_GOOGLE = "google"
+PROVIDER_LOCAL = "local"
+PROVIDERS = (PROVIDER_GOOGLE, PROVIDER_LOCAL)
+
+# Limites d'une requête groupée (batchEmbedContents accepte 100 textes au plus)
+MAX_BATCH_SIZE = 100
+DEFAULT_BATCH_CHARS = 60000
+
+# Attente par défaut après un 429 sans délai indiqué par l'API
+DEFAULT_RETRY_DELAY = 10.0
+_RETRY_DELAY_PATTERN = re.compile(r"retry in (\d+(?:\.\d+)?)s")
+
+
+def is_quota_error(error: Exception) -> bool:
+    """Erreur de quota (429) renvoyée par l'API Google"""
+    error_str = str(error).lower()
+    return "429" in error_str or "quota" in error_str or "rate limit" in error_str
+
+
+def normalize_query(text: str) -> str:
+    """Clé d'une question : casse, espaces et accents ignorés"""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    without_accents = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(without_accents.lower().split())
+
 class EmbeddingService:
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, output_dimensionality: Optional[int] = None,
+                 batch_size: int = MAX_BATCH_SIZE,
+                 batch_chars: int = DEFAULT_BATCH_CHARS,
+                 max_concurrency: int = 4,
+                 requests_per_minute: float = 1500,
+                 tokens_per_minute: Optional[float] = None,
+                 max_retries: int = 3,
+                 cache: Optional[EmbeddingCache] = None,
+                 query_cache_bytes: int = 8 * 1024 * 1024,
+                 query_cache_ttl: Optional[float] = 3600,
+                 provider: str = PROVIDER_GOOGLE,
+                 local_embedder: Optional[LocalEmbedder] = None,
+                 micro_batch_size: int = 32,
+                 micro_batch_window_ms: float = 5.0):
+        """
+        Args:
+            api_key: Clé API Google
+            output_dimensionality: Dimension réduite demandée à l'API (préfixe
+                Matryoshka, pour les index n'utilisant que la forme courte)
+            batch_size: Nombre maximal de textes par requête groupée
+            batch_chars: Nombre maximal de caractères par requête groupée
+            max_concurrency: Requêtes simultanées à l'API (toutes requêtes confondues)
+            requests_per_minute: Quota de textes encodés par minute du fournisseur
+            tokens_per_minute: Quota de tokens par minute (None = non limité)
+            max_retries: Nouvelles tentatives après un dépassement de quota (429)
+            cache: Cache persistant des embeddings (None = désactivé)
+            query_cache_bytes: Taille du cache mémoire des questions (0 = désactivé)
+            query_cache_ttl: Durée de vie d'une question en cache (secondes)
+            provider: Fournisseur principal (google, ou local pour un fonctionnement hors ligne)
+            local_embedder: Embedder local (fournisseur local et fallback de l'API)
+            micro_batch_size: Questions regroupées au plus en un appel
+            micro_batch_window_ms: Fenêtre de regroupement des questions concurrentes (0 = désactivé)
+        """
+        if provider not in PROVIDERS:
+            raise ValueError(f"Fournisseur d'embeddings inconnu: {provider} (disponibles: {PROVIDERS})")
+        self.provider = provider
         self.api_key = api_key
         # Configuration de l'API Google
         genai.configure(api_key=api_key)
         self.embedding_model = "models/text-embedding-004"
+        self.output_dimensionality = output_dimensionality
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.batch_chars = max(1, batch_chars)
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max(0, max_retries)
+        self.cache = cache
+        self.local_embedder = local_embedder or LocalEmbedder(output_dimensionality or EMBEDDING_DIMENSION)
+        # Clés (modèle:dimension, question normalisée) : changer de modèle invalide les entrées
+        self.query_cache = LRUCache(query_cache_bytes, ttl_seconds=query_cache_ttl) if query_cache_bytes > 0 else None
+        # Questions concurrentes regroupées en un seul appel d'embedding
+        self.query_batcher = MicroBatcher(
+            "query_embeddings", self._embed_query_batch,
+            max_batch_size=micro_batch_size, max_delay_ms=micro_batch_window_ms
+        )
+        # Chaque texte d'une requête groupée compte comme une requête dans le quota
+        self.rate_limiter = AsyncRateLimiter(
+            "embeddings", requests_per_minute, tokens_per_minute, max_in_flight=self.max_concurrency
+        )
         
-    async def _make_embedding_request(self, texts: List[str]) -> List[List[float]]:
-        """Fait une requête à l'API Google pour les embeddings"""
-        embeddings = []
-        
-        try:
-            for text in texts:
-                # Utilisation de l'API Google pour les embeddings
-                result = genai.embed_content(
-                    model=self.embedding_model,
-                    content=text
-                )
-                embedding = result["embedding"]
-                embeddings.append(embedding)
-                
-            logger.info(f"✅ {len(embeddings)} embeddings générés via Google API")
-            return embeddings
-            
-        except Exception as e:
-            logger.error(f"❌ Erreur lors de la requête d'embedding Google: {str(e)}")
-            # Fallback: embeddings aléatoires (pour le développement)
-            return self._generate_fallback_embeddings(texts)
-    
-    def _generate_fallback_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Génère des embeddings de fallback pour le développement"""
-        logger.warning("⚠️ Utilisation d'embeddings de fallback (développement uniquement)")
-        embeddings = []
-        for text in texts:
-            # Embedding aléatoire de dimension 768 (comme text-embedding-004)
-            embedding = np.random.normal(0, 1, 768).tolist()
-            embeddings.append(embedding)
+        # Compteurs des requêtes d'embedding (débit en chunks/s)
+        self.requests = 0
+        self.texts_embedded = 0
+        self.fallback_texts = 0
+        self._embedding_seconds = 0.0
+        self.last_throughput = 0.0
+    
+    def _make_batches(self, texts: List[str]) -> List[Tuple[int, int]]:
+        """Découpe les textes en intervalles [début, fin) bornés en nombre et en caractères"""
+        batches = []
+        start, chars = 0, 0
+        for i, text in enumerate(texts):
+            size = len(text)
+            if i > start and (i - start >= self.batch_size or chars + size > self.batch_chars):
+                batches.append((start, i))
+                start, chars = i, 0
+            chars += size
+        if start < len(texts):
+            batches.append((start, len(texts)))
+        return batches
+    
+    def _embed_batch(self, texts: List[str], options: Dict[str, Any]) -> List[List[float]]:
+        """Une requête groupée à l'API Google (un aller-retour pour tous les textes)"""
+        result = genai.embed_content(
+            model=self.embedding_model,
+            content=texts,
+            **options
+        )
+        embeddings = result["embedding"]
+        if len(embeddings) != len(texts):
+            raise ValueError(f"{len(embeddings)} embeddings reçus pour {len(texts)} textes")
         return embeddings
     
-    async def get_embeddings(self, texts: List[str]) -> List[List[float]]:
-        """Récupère les embeddings pour une liste de textes"""
+    async def _embed_batch_limited(self, texts: List[str], options: Dict[str, Any]) -> List[List[float]]:
+        """
+        Requête groupée sous le limiteur de débit, hors de la boucle d'événements
+        
+        Un 429 suspend le limiteur (délai indiqué par l'API) puis la requête est
+        retentée au lieu de basculer sur le fallback.
+        """
+        tokens = sum(estimate_tokens(text) for text in texts)
+        for attempt in range(self.max_retries + 1):
+            async with self.rate_limiter.limit(requests=len(texts), tokens=tokens):
+                try:
+                    return await asyncio.to_thread(self._embed_batch, texts, options)
+                except Exception as e:
+                    if not is_quota_error(e) or attempt == self.max_retries:
+                        raise
+                    delay_match = _RETRY_DELAY_PATTERN.search(str(e).lower())
+                    self.rate_limiter.pause(float(delay_match.group(1)) + 1 if delay_match else DEFAULT_RETRY_DELAY)
+        
+    async def _make_embedding_request(self, texts: List[str],
+                                      output_dimensionality: Optional[int] = None,
+                                      local_embedder: Optional[LocalEmbedder] = None
+                                      ) -> Tuple[List[List[float]], List[str]]:
+        """
+        Fait les requêtes groupées à l'API Google pour les embeddings
+        
+        Les lots sont envoyés en parallèle (sous le limiteur de débit) et les
+        résultats réassemblés dans l'ordre des textes. Un lot en échec reçoit
+        des embeddings de fallback sans invalider les autres. Chaque lot réussi
+        est écrit dans le cache dès son retour (jamais les vecteurs de fallback).
+        
+        Returns:
+            Embeddings et fournisseur de chacun (google, ou local pour le fallback)
+        """
+        # Paramètre optionnel : ne pas l'envoyer pour garder la dimension complète
+        options = {}
+        if output_dimensionality:
+            options["output_dimensionality"] = output_dimensionality
+        
+        batches = self._make_batches(texts)
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        providers = [PROVIDER_GOOGLE] * len(texts)
+        started_at = time.perf_counter()
+        model = self._cache_model(output_dimensionality)
+        
+        async def run_batch(start: int, end: int):
+            batch = texts[start:end]
+            try:
+                embeddings[start:end] = await self._embed_batch_limited(batch, options)
+                if self.cache is not None:
+                    items = {cache_key(model, text): embeddings[i] for i, text in enumerate(batch, start=start)}
+                    await asyncio.to_thread(self.cache.put_many, model, items)
+            except Exception as e:
+                logger.error(f"❌ Erreur lors de la requête d'embedding Google ({len(batch)} textes): {str(e)}")
+                # Fallback: embeddings locaux (comparables aux autres vecteurs locaux uniquement)
+                embeddings[start:end] = await self._generate_fallback_embeddings(batch, output_dimensionality, local_embedder)
+                providers[start:end] = [PROVIDER_LOCAL] * len(batch)
+            self.requests += 1
+        
+        await asyncio.gather(*(run_batch(start, end) for start, end in batches))
+        
+        elapsed = time.perf_counter() - started_at
+        self.texts_embedded += len(texts)
+        self._embedding_seconds += elapsed
+        self.last_throughput = len(texts) / elapsed if elapsed > 0 else 0.0
+        if len(texts) > 1:
+            logger.info(
+                f"✅ {len(texts)} embeddings générés via Google API en {len(batches)} requêtes "
+                f"({self.last_throughput:.1f} chunks/s)"
+            )
+        return embeddings, providers
+    
+    async def _generate_fallback_embeddings(self, texts: List[str],
+                                            output_dimensionality: Optional[int] = None,
+                                            local_embedder: Optional[LocalEmbedder] = None) -> List[List[float]]:
+        """Génère des embeddings de fallback avec l'embedder local (mode dégradé)"""
+        logger.warning(f"⚠️ Utilisation d'embeddings locaux de fallback pour {len(texts)} textes")
+        self.fallback_texts += len(texts)
+        return await self._local_embeddings(texts, output_dimensionality, local_embedder)
+    
+    async def _local_embeddings(self, texts: List[str],
+                                output_dimensionality: Optional[int] = None,
+                                local_embedder: Optional[LocalEmbedder] = None) -> List[List[float]]:
+        """Embeddings de l'embedder local, calculés hors de la boucle d'événements"""
+        embedder = local_embedder or self.local_embedder
+        vectors = await asyncio.to_thread(embedder.embed, texts, output_dimensionality or EMBEDDING_DIMENSION)
+        return vectors.tolist()
+    
+    async def get_embeddings(self, texts: List[str],
+                             output_dimensionality: Optional[int] = None) -> List[List[float]]:
+        """
+        Récupère les embeddings pour une liste de textes
+        
+        Args:
+            texts: Textes à encoder
+            output_dimensionality: Dimension réduite (défaut: celle du service, sinon 768)
+        """
         if not texts:
             return []
+        embeddings, _ = await self.get_embeddings_with_providers(texts, output_dimensionality)
+        return embeddings
+    
+    async def get_embeddings_with_providers(self, texts: List[str],
+                                            output_dimensionality: Optional[int] = None,
+                                            local_embedder: Optional[LocalEmbedder] = None
+                                            ) -> Tuple[List[List[float]], List[str]]:
+        """
+        Embeddings et fournisseur de chacun (à enregistrer avec les vecteurs)
+        
+        Args:
+            texts: Textes à encoder
+            output_dimensionality: Dimension réduite (défaut: celle du service, sinon 768)
+            local_embedder: Embedder local à utiliser (défaut: celui du service ; celui
+                ajusté pour un nouveau snapshot pendant une réindexation)
+        """
+        if not texts:
+            return [], []
+        output_dimensionality = output_dimensionality or self.output_dimensionality
+        if self.provider == PROVIDER_LOCAL:
+            return await self._local_embeddings(texts, output_dimensionality, local_embedder), [PROVIDER_LOCAL] * len(texts)
+        return await self._embed(texts, output_dimensionality, local_embedder)
+    
+    async def _embed(self, texts: List[str],
+                     output_dimensionality: Optional[int],
+                     local_embedder: Optional[LocalEmbedder] = None) -> Tuple[List[List[float]], List[str]]:
+        """Embeddings Google (cache persistant puis API) et fournisseur de chacun"""
+        if self.cache is None:
+            return await self._request_embeddings(texts, output_dimensionality, local_embedder)
         
+        # Seuls les textes absents du cache (une fois chacun) sont envoyés à l'API
+        model = self._cache_model(output_dimensionality)
+        keys = [cache_key(model, text) for text in texts]
         try:
-            embeddings = await self._make_embedding_request(texts)
-            return embeddings
+            found = await asyncio.to_thread(self.cache.get_many, keys)
+        except Exception as e:
+            logger.warning(f"⚠️ Cache d'embeddings indisponible: {e}")
+            return await self._request_embeddings(texts, output_dimensionality, local_embedder)
+        
+        missing: Dict[str, str] = {}
+        for key, text in zip(keys, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+        fallback_keys = set()
+        if missing:
+            embeddings, providers = await self._request_embeddings(list(missing.values()), output_dimensionality, local_embedder)
+            found.update(zip(missing.keys(), embeddings))
+            fallback_keys = {key for key, provider in zip(missing.keys(), providers) if provider != PROVIDER_GOOGLE}
+            logger.info(f"🗄️ Embeddings: {len(texts) - len(missing)} depuis le cache, {len(missing)} via l'API")
+        return [found[key] for key in keys], [PROVIDER_LOCAL if key in fallback_keys else PROVIDER_GOOGLE for key in keys]
+    
+    async def _request_embeddings(self, texts: List[str],
+                                  output_dimensionality: Optional[int],
+                                  local_embedder: Optional[LocalEmbedder] = None) -> Tuple[List[List[float]], List[str]]:
+        try:
+            return await self._make_embedding_request(texts, output_dimensionality, local_embedder)
         except Exception as e:
             logger.error(f"❌ Erreur lors de la génération des embeddings: {str(e)}")
-            return self._generate_fallback_embeddings(texts)
+            embeddings = await self._generate_fallback_embeddings(texts, output_dimensionality, local_embedder)
+            return embeddings, [PROVIDER_LOCAL] * len(texts)
+    
+    def _cache_model(self, output_dimensionality: Optional[int]) -> str:
+        """Modèle et dimension : un changement de l'un ou l'autre invalide le cache"""
+        return f"{self.embedding_model}:{output_dimensionality or EMBEDDING_DIMENSION}"
     
-    async def get_embedding(self, text: str) -> List[float]:
+    async def get_embedding(self, text: str, output_dimensionality: Optional[int] = None) -> List[float]:
         """Récupère l'embedding pour un seul texte"""
-        embeddings = await self.get_embeddings([text])
-        return embeddings[0] if embeddings else []
+        embedding, _ = await self.get_embedding_with_provider(text, output_dimensionality)
+        return embedding
+    
+    async def get_embedding_with_provider(self, text: str,
+                                          output_dimensionality: Optional[int] = None) -> Tuple[List[float], str]:
+        """
+        Embedding d'une question utilisateur et fournisseur qui l'a produit
+        
+        Les questions répétées (mêmes mots à la casse, aux espaces et aux
+        accents près) sont servies par le cache mémoire, sans appel réseau.
+        """
+        output_dimensionality = output_dimensionality or self.output_dimensionality
+        key = (self._cache_model(output_dimensionality), normalize_query(text))
+        cached = self.query_cache.get(key) if self.query_cache is not None else None
+        if cached is not None:
+            return list(cached), PROVIDER_GOOGLE
+        
+        if output_dimensionality == self.output_dimensionality:
+            embedding, provider = await self.query_batcher.submit(text)
+        else:
+            embeddings, providers = await self.get_embeddings_with_providers([text], output_dimensionality)
+            embedding, provider = embeddings[0], providers[0]
+        # Seuls les embeddings de l'API sont mis en cache (l'embedder local est réajusté à chaque indexation)
+        if provider == PROVIDER_GOOGLE and self.query_cache is not None:
+            self.query_cache.put(key, tuple(embedding), len(embedding) * 8 + len(key[1]))
+        return embedding, provider
+    
+    async def _embed_query_batch(self, texts: List[str]) -> List[Tuple[List[float], str]]:
+        """Appel groupé du micro-batcher : (embedding, fournisseur) de chaque question"""
+        embeddings, providers = await self.get_embeddings_with_providers(texts)
+        return list(zip(embeddings, providers))
+    
+    @property
+    def dimension(self) -> int:
+        """Dimension des embeddings produits"""
+        return self.output_dimensionality or EMBEDDING_DIMENSION
+    
+    def set_local_embedder(self, local_embedder: LocalEmbedder):
+        """Remplace l'embedder local (celui du snapshot servi)"""
+        self.local_embedder = local_embedder
     
     def compute_similarity(self, embedding1: List[float], embedding2: List[float]) -> float:
         """Calcule la similarité cosinus entre deux embeddings"""
         try:
-            # Convertir en arrays numpy
-            emb1 = np.array(embedding1).reshape(1, -1)
-            emb2 = np.array(embedding2).reshape(1, -1)
-            
-            # Calculer la similarité cosinus
-            similarity = cosine_similarity(emb1, emb2)[0][0]
-            return float(similarity)
+            return float(cosine_scores(embedding1, [embedding2])[0])
         except Exception as e:
             logger.error(f"Erreur lors du calcul de similarité: {str(e)}")
             return 0.0
     
     def find_most_similar(self, query_embedding: List[float], 
-                              candidate_embeddings: List[List[float]], 
-                          top_k: int = 5) -> List[tuple]:
-        """Trouve les embeddings les plus similaires"""
-        try:
-            similarities = []
-            for i, candidate in enumerate(candidate_embeddings):
-                similarity = self.compute_similarity(query_embedding, candidate)
-                similarities.append((i, similarity))
-        
-            # Trier par similarité décroissante
-            similarities.sort(key=lambda x: x[1], reverse=True)
+                          candidate_embeddings: Union[np.ndarray, List[List[float]]], 
+                          top_k: int = 5,
+                          candidate_norms: Optional[np.ndarray] = None,
+                          normalized: bool = False) -> List[tuple]:
+        """
+        Trouve les embeddings les plus similaires (un produit matriciel + argpartition)
         
-            # Retourner les top_k
-            return similarities[:top_k]
+        Args:
+            query_embedding: Embedding de la requête
+            candidate_embeddings: Candidats (liste ou matrice, éventuellement vue sur celle du store)
+            top_k: Nombre de résultats
+            candidate_norms: Normes précalculées des candidats (similarity.row_norms)
+            normalized: Candidats déjà normalisés
+            
+        Returns:
+            Liste de (indice, similarité) triée par similarité décroissante
+        """
+        try:
+            indices, similarities = top_k_similar(
+                query_embedding, candidate_embeddings, top_k, candidate_norms, normalized
+            )
+            return [(int(i), float(similarity)) for i, similarity in zip(indices, similarities)]
         except Exception as e:
             logger.error(f"Erreur lors de la recherche de similarité: {str(e)}")
             return []
     
     async def cleanup(self):
         """Nettoie les ressources"""
+        if self.cache is not None:
+            await asyncio.to_thread(self.cache.close)
         logger.info("🧹 Service d'embeddings Google nettoyé")
     
+    async def get_stats(self) -> Dict[str, Any]:
+        """Statistiques des requêtes d'embedding (le cache sqlite est interrogé hors de la boucle d'événements)"""
+        cache_stats = await asyncio.to_thread(self.cache.get_stats) if self.cache is not None else None
+        return {
+            "requests": self.requests,
+            "texts_embedded": self.texts_embedded,
+            "fallback_texts": self.fallback_texts,
+            "batch_size": self.batch_size,
+            "batch_chars": self.batch_chars,
+            "max_concurrency": self.max_concurrency,
+            "mean_chunks_per_second": round(self.texts_embedded / self._embedding_seconds, 1) if self._embedding_seconds else 0.0,
+            "last_chunks_per_second": round(self.last_throughput, 1),
+            "rate_limiter": self.rate_limiter.get_stats(),
+            "cache": cache_stats,
+            "query_cache": self.query_cache.get_stats() if self.query_cache is not None else None,
+            "query_batching": self.query_batcher.get_stats()
+        }
+    
     def get_model_info(self) -> Dict[str, Any]:
         """Retourne les informations sur le modèle d'embedding"""
         return {
             "model": self.embedding_model,
             "api_provider": "Google AI",
-            "embedding_dimension": 768,
-            "fallback_mode": "random_embeddings"
+            "embedding_dimension": self.dimension,
+            "provider": self.provider,
+            "fallback_mode": "local_hashing_svd",
+            "local_embedder": self.local_embedder.get_info()
         }
\ No newline at end of file
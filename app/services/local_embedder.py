@@ -0,0 +1,145 @@
+# ==============================================================================
+# FILE: app/services/local_embedder.py - Embeddings locaux (hashing TF-IDF + SVD)
+# ==============================================================================
+#
+# Embeddings calculés sur CPU, sans réseau, de façon déterministe :
+#
+#   1. HashingVectorizer : mots et bigrammes (accents et casse ignorés) hachés
+#      dans n_features colonnes, sans vocabulaire à stocker
+#   2. pondération TF-IDF (idf appris sur le corpus)
+#   3. TruncatedSVD (LSA) vers la dimension des embeddings du store, puis norme L2
+#
+# Le modèle est ajusté sur les chunks du CGI à l'indexation et enregistré dans
+# le snapshot de l'index (local_embedder.npz). Avant tout ajustement, les textes
+# sont hachés directement dans la dimension cible (sans SVD).
+#
+# Ces vecteurs ne sont comparables qu'entre eux : chaque vecteur stocké est
+# marqué avec le fournisseur qui l'a produit (metadata.embedding_provider).
+
+import hashlib
+import logging
+import os
+from typing import Dict, List, Optional
+
+import numpy as np
+from sklearn.decomposition import TruncatedSVD
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfTransformer
+
+logger = logging.getLogger(__name__)
+
+MODEL_FILE = "local_embedder.npz"
+DEFAULT_FEATURES = 2 ** 14
+
+
+def _hashing_vectorizer(n_features: int) -> HashingVectorizer:
+    return HashingVectorizer(
+        n_features=n_features,
+        strip_accents="unicode",
+        lowercase=True,
+        ngram_range=(1, 2),
+        alternate_sign=False,
+        norm=None
+    )
+
+
+class LocalEmbedder:
+    """Embeddings déterministes par hashing TF-IDF et réduction SVD"""
+
+    def __init__(self, dimension: int, n_features: int = DEFAULT_FEATURES):
+        """
+        Args:
+            dimension: Dimension des embeddings produits (celle du store)
+            n_features: Nombre de colonnes du hachage des mots et bigrammes
+        """
+        self.dimension = dimension
+        self.n_features = n_features
+        self.idf: Optional[np.ndarray] = None
+        self.components: Optional[np.ndarray] = None  # (composantes, n_features)
+
+    @property
+    def is_fitted(self) -> bool:
+        return self.components is not None
+
+    @property
+    def fingerprint(self) -> str:
+        """Identifiant du modèle (change à chaque ajustement)"""
+        if not self.is_fitted:
+            return f"hashing-{self.dimension}"
+        digest = hashlib.blake2b(self.components.tobytes(), digest_size=6).hexdigest()
+        return f"lsa-{self.dimension}-{digest}"
+
+    def fit(self, texts: List[str], seed: int = 0) -> "LocalEmbedder":
+        """Ajuste l'idf et la SVD sur un corpus"""
+        counts = _hashing_vectorizer(self.n_features).transform(texts)
+        tfidf = TfidfTransformer(sublinear_tf=True).fit(counts)
+        weighted = tfidf.transform(counts)
+
+        components = min(self.dimension, weighted.shape[0] - 1, self.n_features - 1)
+        if components < 1:
+            logger.warning("⚠️ Corpus trop petit pour ajuster l'embedder local")
+            return self
+        svd = TruncatedSVD(n_components=components, random_state=seed).fit(weighted)
+
+        self.idf = tfidf.idf_.astype(np.float32)
+        self.components = svd.components_.astype(np.float32)
+        logger.info(f"✅ Embedder local ajusté sur {len(texts)} textes ({components} composantes)")
+        return self
+
+    def embed(self, texts: List[str], dimension: Optional[int] = None) -> np.ndarray:
+        """
+        Embeddings normalisés (float32) des textes
+
+        Args:
+            texts: Textes à encoder
+            dimension: Dimension demandée (défaut: celle de l'embedder ; tronquée ou complétée par des zéros)
+        """
+        dimension = dimension or self.dimension
+        if not self.is_fitted:
+            vectors = _hashing_vectorizer(dimension).transform(texts).toarray().astype(np.float32)
+        else:
+            counts = _hashing_vectorizer(self.n_features).transform(texts)
+            counts.data = (1 + np.log(counts.data)).astype(np.float32)  # tf sous-linéaire, comme à l'ajustement
+            weighted = counts.multiply(self.idf).tocsr()
+            projected = np.asarray(weighted @ self.components.T, dtype=np.float32)
+            vectors = np.zeros((len(texts), dimension), dtype=np.float32)
+            width = min(dimension, projected.shape[1])
+            vectors[:, :width] = projected[:, :width]
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return vectors / norms
+
+    def save(self, directory: str):
+        """Enregistre le modèle ajusté dans un répertoire (snapshot de l'index)"""
+        if not self.is_fitted:
+            return
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, MODEL_FILE)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, idf=self.idf, components=self.components,
+                 shape=np.array([self.dimension, self.n_features]))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, directory: str, dimension: int) -> "LocalEmbedder":
+        """Charge le modèle d'un snapshot (embedder non ajusté s'il n'y en a pas)"""
+        path = os.path.join(directory, MODEL_FILE)
+        if not os.path.exists(path):
+            return cls(dimension)
+        with np.load(path) as arrays:
+            saved_dimension, n_features = (int(value) for value in arrays["shape"])
+            embedder = cls(dimension, n_features=n_features)
+            embedder.idf = arrays["idf"]
+            embedder.components = arrays["components"]
+        if saved_dimension != dimension:
+            logger.warning(f"⚠️ Embedder local ajusté en dimension {saved_dimension}, utilisé en {dimension}")
+        return embedder
+
+    def get_info(self) -> Dict[str, object]:
+        return {
+            "fitted": self.is_fitted,
+            "dimension": self.dimension,
+            "n_features": self.n_features,
+            "components": int(self.components.shape[0]) if self.is_fitted else 0,
+            "fingerprint": self.fingerprint
+        }
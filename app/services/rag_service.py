@@ -13,11 +13,18 @@ import uuid
 
 from app.services.llm_service_gemini import GeminiLLMService, create_gemini_service
 from app.services.embedding_service import EmbeddingService
+from app.services.local_embedder import LocalEmbedder
 from app.services.reranker_service import RerankerService
 from app.services.metadata_extractor import FiscalMetadataExtractor
 from app.database.vector_store import VectorStore
+from app.database.sharded_store import ShardedVectorStore
+from app.database.embedding_cache import EmbeddingCache
+from app.database.bm25_index import BM25Index
+from app.database.article_index import ArticleIndex, article_references, article_text, is_pure_lookup
 from app.utils.markdown_parser import MarkdownParser
 from app.utils.text_splitter import TextSplitter
+from app.utils.executors import InstrumentedExecutor
+from app.utils.rank_fusion import reciprocal_rank_fusion
 
 # Import OpenAI pour fallback
 try:
@@ -105,8 +112,65 @@ class RAGService:
         else:
             logger.warning("⚠️ Module OpenAI non disponible (pip install openai)")
         
-        self.embedding_service = EmbeddingService(self.api_key)
-        self.vector_store = VectorStore()
+        self.embedding_service = EmbeddingService(
+            self.api_key,
+            output_dimensionality=int(os.getenv("EMBEDDING_OUTPUT_DIM")) if os.getenv("EMBEDDING_OUTPUT_DIM") else None,
+            batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "100")),
+            batch_chars=int(os.getenv("EMBEDDING_BATCH_CHARS", "60000")),
+            max_concurrency=int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+            requests_per_minute=float(os.getenv("EMBEDDING_RPM", "1500")),
+            tokens_per_minute=float(os.getenv("EMBEDDING_TPM")) if os.getenv("EMBEDDING_TPM") else None,
+            max_retries=int(os.getenv("EMBEDDING_MAX_RETRIES", "3")),
+            cache=self._create_embedding_cache(),
+            query_cache_bytes=int(os.getenv("QUERY_EMBEDDING_CACHE_MB", "8")) * 1024 * 1024,
+            query_cache_ttl=float(os.getenv("QUERY_EMBEDDING_CACHE_TTL", "3600")),
+            provider=os.getenv("EMBEDDING_PROVIDER", "google"),
+            micro_batch_size=int(os.getenv("EMBEDDING_MICRO_BATCH_SIZE", "32")),
+            micro_batch_window_ms=float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+        )
+        # Pools de threads (par worker uvicorn) : scoring NumPy et parsing des documents
+        self.search_executor = InstrumentedExecutor(
+            "search", int(os.getenv("SEARCH_THREADS", str(min(4, os.cpu_count() or 1))))
+        )
+        self.parse_executor = InstrumentedExecutor("parse", int(os.getenv("PARSE_THREADS", "2")))
+        
+        # Recherche configurable : backend (exact | ivf | hnsw), codes int8 (VECTOR_QUANTIZATION)
+        # et premier passage sur un préfixe des dimensions (VECTOR_PREFIX_DIM)
+        store_options = dict(
+            index_backend=os.getenv("VECTOR_INDEX_BACKEND", "exact"),
+            ivf_lists=int(os.getenv("IVF_LISTS")) if os.getenv("IVF_LISTS") else None,
+            ivf_nprobe=int(os.getenv("IVF_NPROBE", "8")),
+            hnsw_m=int(os.getenv("HNSW_M", "16")),
+            hnsw_ef_construction=int(os.getenv("HNSW_EF_CONSTRUCTION", "100")),
+            hnsw_ef_search=int(os.getenv("HNSW_EF_SEARCH", "64")),
+            quantization=os.getenv("VECTOR_QUANTIZATION", "none"),
+            prefix_dimension=int(os.getenv("VECTOR_PREFIX_DIM")) if os.getenv("VECTOR_PREFIX_DIM") else None,
+            rescore_factor=int(os.getenv("VECTOR_RESCORE_FACTOR", "8")),
+            document_cache_bytes=int(os.getenv("DOCUMENT_CACHE_MB", "32")) * 1024 * 1024,
+            max_pending_documents=int(os.getenv("MAX_PENDING_DOCUMENTS", "20000")),
+            near_duplicate_distance=int(os.getenv("NEAR_DUPLICATE_DISTANCE")) if os.getenv("NEAR_DUPLICATE_DISTANCE") else None,
+            keep_snapshots=int(os.getenv("KEEP_SNAPSHOTS", "3")),
+            search_executor=self.search_executor
+        )
+        # Partitionnement optionnel (none | source_file | update_year) ; changer de topologie impose une réindexation
+        shard_by = os.getenv("VECTOR_SHARD_BY", "none")
+        if shard_by != "none":
+            self.vector_store = ShardedVectorStore(
+                shard_by=shard_by,
+                shard_count=int(os.getenv("VECTOR_SHARDS", "4")),
+                **store_options
+            )
+        else:
+            self.vector_store = VectorStore(**store_options)
+        # Recherche hybride : BM25 (sigles, numéros d'articles) fusionné par RRF avec la recherche dense
+        self.search_mode = os.getenv("SEARCH_MODE", "hybrid")
+        self.hybrid_dense_factor = int(os.getenv("HYBRID_DENSE_FACTOR", "2"))
+        self.rrf_k = int(os.getenv("RRF_K", "60"))
+        self.lexical_index: Optional[BM25Index] = None
+        # Articles cités : renvoi direct pour une simple consultation ("Que dit l'article 23 ?"),
+        # liste supplémentaire de la fusion RRF sinon ; 0 = désactivé
+        self.article_max_chunks = int(os.getenv("ARTICLE_LOOKUP_MAX_CHUNKS", "8"))
+        self.article_index: Optional[ArticleIndex] = None
         self.markdown_parser = MarkdownParser()
         self.text_splitter = TextSplitter()
         
@@ -118,6 +182,26 @@ class RAGService:
         self.query_cache = {}  # Cache des requêtes récentes
         self.query_logs = []   # Logs pour analytics
         
+        # Réindexation en arrière-plan dans un nouveau snapshot
+        self._reindex_task: Optional[asyncio.Task] = None
+        self._snapshot_lock = asyncio.Lock()
+        self.reindex_status: Dict[str, Any] = {"state": "idle"}
+        
+    @staticmethod
+    def _create_embedding_cache() -> Optional[EmbeddingCache]:
+        """Cache persistant des embeddings partagé par les workers (EMBEDDING_CACHE_MB=0 le désactive)"""
+        max_mb = int(os.getenv("EMBEDDING_CACHE_MB", "512"))
+        if max_mb <= 0:
+            return None
+        try:
+            return EmbeddingCache(
+                os.getenv("EMBEDDING_CACHE_PATH", "./vector_db/embedding_cache.sqlite3"),
+                max_bytes=max_mb * 1024 * 1024
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Cache d'embeddings désactivé: {e}")
+            return None
+    
     async def initialize(self):
         """Initialise tous les composants du service RAG"""
         if self.is_initialized:
@@ -129,6 +213,7 @@ class RAGService:
             # Initialiser les composants
             # Le service d'embeddings est maintenant initialisé automatiquement
             await self.vector_store.initialize()
+            self._load_snapshot_models(self.vector_store)
             
             # Initialiser le re-ranker
             await self.reranker_service.initialize()
@@ -153,15 +238,17 @@ class RAGService:
             logger.error(f"❌ Erreur initialisation RAG: {e}")
             raise
     
-    async def index_documents(self, documents_path: str):
+    async def index_documents(self, documents_path: str, vector_store: Optional[VectorStore] = None):
         """
         Indexe tous les documents Markdown du répertoire spécifié
         
         Args:
             documents_path: Chemin vers les documents CGI
+            vector_store: Snapshot cible (défaut: le vector store actif)
         """
         if not self.is_initialized:
             await self.initialize()
+        vector_store = vector_store or self.vector_store
             
         logger.info(f"📚 Début d'indexation: {documents_path}")
         start_time = time.time()
@@ -183,17 +270,18 @@ class RAGService:
             
             logger.info(f"📄 {len(markdown_files)} fichiers Markdown trouvés")
             
-            # Traiter chaque fichier
+            # Traiter les fichiers en parallèle dans le pool de parsing (ordre conservé)
+            results = await asyncio.gather(
+                *(self._process_markdown_file(file_path) for file_path in markdown_files),
+                return_exceptions=True
+            )
             all_chunks = []
-            for file_path in markdown_files:
-                try:
-                    chunks = await self._process_markdown_file(file_path)
-                    all_chunks.extend(chunks)
-                    logger.info(f"✅ {file_path}: {len(chunks)} chunks créés")
-                    
-                except Exception as e:
-                    logger.warning(f"⚠️ Erreur traitement {file_path}: {e}")
+            for file_path, chunks in zip(markdown_files, results):
+                if isinstance(chunks, Exception):
+                    logger.warning(f"⚠️ Erreur traitement {file_path}: {chunks}")
                     continue
+                all_chunks.extend(chunks)
+                logger.info(f"✅ {file_path}: {len(chunks)} chunks créés")
             
             if not all_chunks:
                 raise ValueError("Aucun chunk créé à partir des documents")
@@ -202,12 +290,52 @@ class RAGService:
             
             # Créer les embeddings en batch
             texts = [chunk['content'] for chunk in all_chunks]
+            # Embedder local ajusté sur ce corpus, enregistré avec le snapshot (fournisseur local et fallback)
+            fit_start = time.time()
+            local_embedder = LocalEmbedder(self.embedding_service.dimension)
+            await self.parse_executor.run(local_embedder.fit, texts)
+            local_embedder.save(vector_store.snapshot_directory)
+            if vector_store is self.vector_store:
+                self.embedding_service.set_local_embedder(local_embedder)
+            fit_time = time.time() - fit_start
+            
             logger.info("🧠 Génération des embeddings...")
-            embeddings = await self.embedding_service.get_embeddings(texts)
+            embedding_start = time.time()
+            embeddings, providers = await self.embedding_service.get_embeddings_with_providers(
+                texts, local_embedder=local_embedder
+            )
+            embedding_time = time.time() - embedding_start
+            
+            # Chaque vecteur est marqué avec son fournisseur (index mixte détectable, recherche filtrée)
+            provider_counts: Dict[str, int] = {}
+            for chunk, provider in zip(all_chunks, providers):
+                chunk.setdefault("metadata", {})["embedding_provider"] = provider
+                provider_counts[provider] = provider_counts.get(provider, 0) + 1
+            if len(provider_counts) > 1:
+                logger.warning(f"⚠️ Index mixte (fournisseurs d'embeddings): {provider_counts}")
             
             # Sauvegarder dans la base vectorielle
             logger.info("💾 Sauvegarde dans la base vectorielle...")
-            await self.vector_store.add_documents(all_chunks, embeddings)
+            stored_ids = await vector_store.add_documents(all_chunks, embeddings)
+            
+            # Index lexical BM25 du snapshot : chunks effectivement stockés (un doublon fusionné
+            # n'est indexé que sous l'id du chunk qui l'a absorbé)
+            index_start = time.time()
+            stored_texts: Dict[str, str] = {}
+            for doc_id, text in zip(stored_ids, texts):
+                stored_texts.setdefault(doc_id, text)
+            lexical_index = await self.parse_executor.run(BM25Index().build, list(stored_texts.items()))
+            lexical_index.save(vector_store.snapshot_directory)
+            # Plages de chunks de chaque article (chunks dans l'ordre des fichiers, un doublon
+            # fusionné désigne le chunk stocké qui l'a absorbé)
+            article_index = await self.parse_executor.run(ArticleIndex().build, [
+                (doc_id, chunk["source_file"], chunk["content"]) for doc_id, chunk in zip(stored_ids, all_chunks)
+            ])
+            article_index.save(vector_store.snapshot_directory)
+            if vector_store is self.vector_store:
+                self.lexical_index = lexical_index
+                self.article_index = article_index
+            index_build_time = time.time() - index_start
             
             processing_time = time.time() - start_time
             logger.info(f"✅ Indexation terminée en {processing_time:.2f}s")
@@ -217,11 +345,20 @@ class RAGService:
                 "files_processed": len(markdown_files),
                 "chunks_created": len(all_chunks),
                 "processing_time": processing_time,
+                "embedding_time": embedding_time,
+                "local_embedder_fit_time": fit_time,
+                "index_build_time": index_build_time,
+                "embedding_providers": provider_counts,
+                "embedding_chunks_per_second": len(all_chunks) / embedding_time if embedding_time > 0 else 0.0,
+                "chunks_per_second": len(all_chunks) / processing_time if processing_time > 0 else 0.0,
                 "average_chunk_size": sum(len(chunk['content']) for chunk in all_chunks) / len(all_chunks),
                 "indexed_at": datetime.now().isoformat()
             }
             
-            await self.vector_store.save_indexing_stats(stats)
+            await vector_store.save_indexing_stats(stats)
+            
+            # Écrire une base dense et construire l'index de recherche configuré
+            await vector_store.build_index()
             
         except Exception as e:
             logger.error(f"❌ Erreur durant l'indexation: {e}")
@@ -238,18 +375,8 @@ class RAGService:
             Liste des chunks avec métadonnées
         """
         try:
-            # Lire le fichier
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Parser le Markdown
-            parsed_doc = await self.markdown_parser.parse_document(content, file_path)
-            
-            # Extraire les métadonnées fiscales
-            fiscal_metadata = self.metadata_extractor.extract_metadata(content, file_path)
-            
-            # Découper en chunks intelligents
-            chunks = await self.text_splitter.split_document(parsed_doc)
+            # Lecture, parsing et découpage hors de la boucle d'événements
+            fiscal_metadata, chunks = await self.parse_executor.run(self._parse_file, file_path)
             
             # Enrichir avec des métadonnées
             enriched_chunks = []
@@ -286,6 +413,24 @@ class RAGService:
             logger.error(f"❌ Erreur traitement fichier {file_path}: {e}")
             return []
     
+    def _parse_file(self, file_path: str):
+        """
+        Lit, parse et découpe un fichier Markdown (exécuté dans le pool de parsing)
+        
+        Returns:
+            (métadonnées fiscales, chunks)
+        """
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        
+        # Parser le Markdown puis découper en chunks intelligents (appels synchrones)
+        parsed_doc = self.markdown_parser.parse(content, file_path)
+        chunks = self.text_splitter.split(parsed_doc)
+        
+        # Extraire les métadonnées fiscales
+        fiscal_metadata = self.metadata_extractor.extract_metadata(content, file_path)
+        return fiscal_metadata, chunks
+    
     async def search_relevant_sources(
         self, 
         question: str, 
@@ -309,19 +454,72 @@ class RAGService:
         """
         if not self.is_initialized:
             await self.initialize()
+        await self._refresh_snapshot()
         
         try:
+            # Articles cités explicitement : simple consultation servie directement, sans embedding
+            articles = self._article_hits(question)
+            if articles and is_pure_lookup(question, self.markdown_parser.patterns['article']):
+                article_sources = await self._article_sources(articles, filter_criteria)
+                if article_sources:
+                    return article_sources[:max_sources]
+            
             # Créer l'embedding de la question
-            question_embedding = await self.embedding_service.get_embedding(question)
+            question_embedding, provider = await self.embedding_service.get_embedding_with_provider(question)
+            
+            # Vecteurs de fournisseurs différents non comparables : fallback local ou index mixte.
+            # Le filtre de fournisseur ne concerne que la recherche dense (le BM25 ignore les vecteurs)
+            dense_filter = filter_criteria
+            lexical_embedding = question_embedding
+            index_providers = self.vector_store.embedding_providers()
+            if provider != self.embedding_service.provider or len(index_providers) > 1:
+                provider_filter = {"embedding_provider": provider}
+                dense_filter = {"$and": [filter_criteria, provider_filter]} if filter_criteria else provider_filter
+                lexical_embedding = None  # Similarité cosinus non comparable entre fournisseurs
+                logger.info(f"🔎 Recherche dense limitée aux vecteurs {provider} (index: {index_providers})")
             
             # Rechercher dans la base vectorielle avec filtrage
             # Récupérer plus de résultats pour le re-ranking
             initial_top_k = max_sources * 3 if use_reranking else max_sources * 2
+
+            lexical_index = self.lexical_index
+            if lexical_index is not None and not lexical_index.document_count:
+                lexical_index = None
+            if self.search_mode == "hybrid" and lexical_index is not None:
+                # Dense et BM25 en parallèle puis fusion RRF : le BM25 rattrape les sigles
+                # et numéros d'articles, la recherche dense peut donc ramener moins de candidats
+                dense_results, lexical_results = await asyncio.gather(
+                    self.vector_store.similarity_search(
+                        question_embedding,
+                        top_k=min(initial_top_k, max_sources * self.hybrid_dense_factor),
+                        filter_criteria=dense_filter
+                    ),
+                    self._lexical_search(lexical_index, question, lexical_embedding, initial_top_k, filter_criteria)
+                )
+                if not dense_results:
+                    logger.info("🔎 Aucun résultat dense : résultats BM25 seuls")
+                rankings, names = [dense_results, lexical_results], ["dense", "lexical"]
+            else:
+                results = await self.vector_store.similarity_search(
+                    question_embedding,
+                    top_k=initial_top_k,
+                    filter_criteria=dense_filter
+                )
+                rankings, names = [results], ["dense"]
+                if not results and lexical_index is not None:
+                    # Aucun vecteur comparable (ex: fournisseur de secours sur un index Google) : BM25 seul
+                    logger.info("🔎 Aucun résultat dense : recherche BM25 seule")
+                    rankings, names = [await self._lexical_search(
+                        lexical_index, question, lexical_embedding, initial_top_k, filter_criteria
+                    )], ["lexical"]
             
-            results = await self.vector_store.similarity_search(
-                question_embedding, 
-                top_k=initial_top_k,
-                filter_criteria=filter_criteria
+            # Chunks des articles cités dans une question plus large : liste supplémentaire de la fusion
+            if articles:
+                rankings.append(await self._article_results(articles, lexical_embedding, filter_criteria))
+                names.append("article")
+            results = (
+                reciprocal_rank_fusion(rankings, k=self.rrf_k, names=names)[:initial_top_k]
+                if len(rankings) > 1 else rankings[0]
             )
             
             # Re-ranking avec cross-encoder si disponible
@@ -334,31 +532,7 @@ class RAGService:
                 )
             
             # Convertir en objets DocumentSource
-            sources = []
-            for result in results:
-                metadata = result.get("metadata", {})
-                
-                # Extraire les informations depuis les métadonnées ou directement depuis result
-                # Les métadonnées peuvent contenir title, section, article, source_file
-                # ou ces infos peuvent être dans le document original
-                source = DocumentSource(
-                    title=result.get("title") or metadata.get("title", ""),
-                    section=result.get("section") or metadata.get("section", ""),
-                    article=result.get("article") or metadata.get("article", ""),
-                    content=result.get("content", ""),
-                    source_file=result.get("source_file") or metadata.get("source_file", ""),
-                    relevance_score=result.get("similarity_score", 0.0)
-                )
-                
-                # Copier toutes les métadonnées
-                source.metadata = metadata.copy()
-                
-                # Ajouter le score du re-ranker si disponible
-                if "reranker_score" in result:
-                    source.metadata["reranker_score"] = result["reranker_score"]
-                    source.metadata["original_score"] = result.get("original_score", 0.0)
-                
-                sources.append(source)
+            sources = [self._to_source(result) for result in results]
             
             # Appliquer des filtres contextuels
             filtered_sources = await self._filter_sources_by_context(sources, context_type, question)
@@ -370,6 +544,157 @@ class RAGService:
             logger.error(f"❌ Erreur recherche sources: {e}")
             return []
     
+    @staticmethod
+    def _to_source(result: Dict[str, Any]) -> DocumentSource:
+        """Convertit un résultat du vector store en DocumentSource"""
+        metadata = result.get("metadata", {})
+        
+        # Extraire les informations depuis les métadonnées ou directement depuis result
+        # Les métadonnées peuvent contenir title, section, article, source_file
+        # ou ces infos peuvent être dans le document original
+        source = DocumentSource(
+            title=result.get("title") or metadata.get("title", ""),
+            section=result.get("section") or metadata.get("section", ""),
+            article=result.get("article") or metadata.get("article", ""),
+            content=result.get("content", ""),
+            source_file=result.get("source_file") or metadata.get("source_file", ""),
+            relevance_score=result.get("similarity_score", 0.0)
+        )
+        
+        # Copier toutes les métadonnées
+        source.metadata = metadata.copy()
+        
+        # Ajouter le score du re-ranker si disponible
+        if "reranker_score" in result:
+            source.metadata["reranker_score"] = result["reranker_score"]
+            source.metadata["original_score"] = result.get("original_score", 0.0)
+        
+        # Scores de la recherche hybride (fusion RRF, BM25) et article cité correspondant
+        for key in ("rrf_score", "lexical_score", "article_id"):
+            if key in result:
+                source.metadata[key] = result[key]
+        if "article_id" in result:
+            source.article = source.article or result["article_id"]
+        
+        return source
+    
+    def _article_hits(self, question: str) -> Dict[str, str]:
+        """
+        Chunks des articles cités dans la question (index des articles du snapshot)
+        
+        Returns:
+            id du chunk -> premier article demandé qui le contient (ordre des articles
+            demandés), vide si la question ne cite aucun article indexé
+        """
+        article_index = self.article_index
+        if self.article_max_chunks <= 0 or article_index is None:
+            return {}
+        references = article_references(question, self.markdown_parser.patterns['article'])
+        hits = article_index.lookup(references, limit=self.article_max_chunks) if references else []
+        articles: Dict[str, str] = {}
+        for article_id, doc_id in hits:
+            articles.setdefault(doc_id, article_id)
+        return articles
+    
+    async def _article_results(self, articles: Dict[str, str], question_embedding: Optional[List[float]],
+                               filter_criteria: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Chunks des articles cités, lus dans le vector store (résultats au format de la recherche)
+        
+        similarity_score est la similarité cosinus avec la question, ou 1.0 sans
+        embedding comparable (renvoi direct, fournisseur de secours).
+        """
+        results = await self.vector_store.get_documents(list(articles), question_embedding, filter_criteria)
+        for result in results:
+            result["article_id"] = articles[result["id"]]
+            if question_embedding is None:
+                result["similarity_score"] = 1.0
+        return results
+    
+    async def _article_sources(self, articles: Dict[str, str],
+                               filter_criteria: Optional[Dict[str, Any]]) -> List[DocumentSource]:
+        """Renvoi direct : sources marquées metadata.retrieval = "article" (score 1.0), sans embedding"""
+        sources = [self._to_source(result) for result in await self._article_results(articles, None, filter_criteria)]
+        for source in sources:
+            source.metadata["retrieval"] = "article"
+        if sources:
+            references = ", ".join(dict.fromkeys(articles.values()))
+            logger.info(f"📌 Renvoi direct: article(s) {references} ({len(sources)} chunks, sans embedding)")
+        return sources
+    
+    def is_article_lookup(self, question: str, sources: List[DocumentSource]) -> bool:
+        """Simple consultation d'articles servie par le renvoi direct (réponse possible sans LLM)"""
+        return (
+            bool(sources)
+            and all(source.metadata.get("retrieval") == "article" for source in sources)
+            and is_pure_lookup(question, self.markdown_parser.patterns['article'])
+        )
+    
+    async def stream_article_text(self, sources: List[DocumentSource]) -> AsyncGenerator[Dict[str, Any], None]:
+        """
+        Texte des articles, streamé sans appel au LLM (même format que generate_response_stream)
+        
+        Chaque chunk est limité au texte de son article ; les chunks consécutifs d'un
+        même article sont raccordés sans leur chevauchement.
+        """
+        previous_article, previous_text = None, ""
+        total_content = ""
+        for source in sources:
+            article_id = source.metadata.get("article_id")
+            # Seule la partie du chunk propre à l'article (sans le début de l'article suivant)
+            text = article_text(source.content, article_id)
+            if article_id == previous_article:
+                content = self._strip_overlap(previous_text, text)
+                if content:
+                    content = "\n" + content
+            else:
+                content = f"**Article {article_id}**\n\n{text}"
+                if previous_article is not None:
+                    content = "\n\n" + content
+            previous_article, previous_text = article_id, text
+            if content:
+                total_content += content
+                yield {"content": content, "tokens": 0}
+        yield {
+            "complete": True,
+            "metadata": {"model_used": "article_lookup", "total_content": total_content}
+        }
+    
+    @staticmethod
+    def _strip_overlap(previous: str, current: str, max_overlap: int = 200, min_overlap: int = 20) -> str:
+        """Retire du début de current le chevauchement repris de la fin de previous (TextSplitter)"""
+        for size in range(min(max_overlap, len(previous), len(current)), min_overlap - 1, -1):
+            if current.startswith(previous[-size:]):
+                return current[size:].lstrip()
+        return current
+    
+    async def _lexical_search(self, lexical_index: BM25Index, question: str,
+                              question_embedding: Optional[List[float]], top_k: int,
+                              filter_criteria: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Recherche BM25 (pool de recherche) puis lecture des chunks dans le vector store
+
+        Les chunks lus reçoivent leur similarité cosinus avec la question (similarity_score,
+        comparable aux résultats denses) et leur score BM25 (lexical_score). Sans embedding
+        comparable (question_embedding None), similarity_score est le score BM25 rapporté
+        au meilleur.
+        """
+        # Candidats supplémentaires : une partie peut être écartée par les filtres
+        factor = 4 if filter_criteria else 1
+        hits = await self.search_executor.run(lexical_index.search, question, top_k * factor)
+        if not hits:
+            return []
+        scores = dict(hits)
+        results = await self.vector_store.get_documents(
+            [doc_id for doc_id, _ in hits], question_embedding, filter_criteria
+        )
+        best = hits[0][1]
+        for result in results:
+            result["lexical_score"] = scores[result["id"]]
+            if question_embedding is None:
+                result["similarity_score"] = result["lexical_score"] / best if best > 0 else 0.0
+        return results[:top_k]
+
     async def _filter_sources_by_context(self, sources: List[DocumentSource], 
                                        context_type: str, question: str) -> List[DocumentSource]:
         """
@@ -394,8 +719,12 @@ class RAGService:
         }
         
         keywords = context_keywords.get(context_type, [])
-        
-        # Re-scorer les sources selon le contexte
+        return await self.search_executor.run(self._rescore_by_context, sources, context_type, keywords)
+    
+    @staticmethod
+    def _rescore_by_context(sources: List[DocumentSource], context_type: str,
+                            keywords: List[str]) -> List[DocumentSource]:
+        """Re-score et re-trie les sources selon les mots-clés du contexte (pool de recherche)"""
         for source in sources:
             context_bonus = 0.0
             content_lower = source.content.lower()
@@ -755,31 +1084,126 @@ Important: Base-toi UNIQUEMENT sur le contexte fourni. Si une information n'est
         if not self.is_initialized:
             return {"error": "Service non initialisé"}
         
+        embedding_stats = await self.embedding_service.get_stats()
         return {
             "documents_indexed": await self.get_documents_count(),
             "queries_processed": len(self.query_logs),
-            "embedding_cache_size": len(self.embedding_service.embedding_cache),
+            "embedding_cache_size": embedding_stats["cache"]["entries"] if embedding_stats["cache"] is not None else 0,
             "current_model": self.llm_service.get_current_model_info(),
             "embedding_info": self.embedding_service.get_model_info(),
+            "embedding_stats": embedding_stats,
+            "query_embedding_cache_hit_ratio": self.embedding_service.query_cache.hit_ratio if self.embedding_service.query_cache is not None else 0.0,
+            "active_snapshot": self.vector_store.snapshot_version,
+            "reindex": self.reindex_status,
             "vector_store_stats": await self.vector_store.get_stats(),
+            "lexical_index": self.lexical_index.get_info() if self.lexical_index is not None else None,
+            "article_index": self.article_index.get_info() if self.article_index is not None else None,
+            "executors": {
+                "search": self.search_executor.get_stats(),
+                "parse": self.parse_executor.get_stats()
+            },
             "recent_queries": self.query_logs[-10:] if self.query_logs else []
         }
     
     async def reindex_documents(self, documents_path: str):
-        """Réindexe complètement les documents"""
+        """
+        Réindexe complètement les documents dans un nouveau snapshot
+        
+        Les requêtes continuent d'utiliser le snapshot actif pendant la
+        construction ; la bascule (pointeur CURRENT) n'a lieu qu'une fois
+        le nouveau snapshot complet.
+        """
         logger.info("🔄 Début de la réindexation...")
         
-        # Vider la base vectorielle
-        await self.vector_store.clear()
+        staging = await self.vector_store.create_snapshot()
+        self.reindex_status = {
+            "state": "running",
+            "snapshot": staging.snapshot_version,
+            "started_at": datetime.now().isoformat()
+        }
+        try:
+            await self.index_documents(documents_path, vector_store=staging)
+            await staging.activate()
+        except Exception as e:
+            self.reindex_status = {**self.reindex_status, "state": "failed", "error": str(e)}
+            await staging.discard()
+            raise
         
-        # Vider les caches
-        await self.embedding_service.clear_cache()
-        self.query_cache.clear()
+        await self._swap_vector_store(staging)
+        self.reindex_status = {**self.reindex_status, "state": "done", "finished_at": datetime.now().isoformat()}
+        logger.info(f"✅ Réindexation terminée (snapshot {staging.snapshot_version})")
+    
+    def start_reindex(self, documents_path: str) -> bool:
+        """Lance la réindexation en arrière-plan (False si une réindexation est déjà en cours)"""
+        if self._reindex_task and not self._reindex_task.done():
+            return False
+        self._reindex_task = asyncio.get_running_loop().create_task(self.reindex_documents(documents_path))
+        self._reindex_task.add_done_callback(self._log_reindex_result)
+        return True
+    
+    @staticmethod
+    def _log_reindex_result(task: asyncio.Task):
+        if not task.cancelled() and task.exception():
+            logger.error(f"❌ Erreur durant la réindexation: {task.exception()}")
+    
+    async def rollback_index(self, version: Optional[str] = None) -> str:
+        """
+        Revient à un snapshot précédent (par défaut celui qui précède l'actif)
         
-        # Réindexer
-        await self.index_documents(documents_path)
+        Returns:
+            Version du snapshot rendu actif
+        """
+        if version is None:
+            older = [
+                snapshot["version"] for snapshot in self.vector_store.list_snapshots()
+                if snapshot["version"] < self.vector_store.snapshot_version
+            ]
+            if not older:
+                raise ValueError("Aucun snapshot précédent disponible")
+            version = older[-1]
         
-        logger.info("✅ Réindexation terminée")
+        store = await self.vector_store.open_snapshot(version)
+        await store.activate()
+        await self._swap_vector_store(store)
+        logger.info(f"⏪ Retour au snapshot {version}")
+        return version
+    
+    async def _refresh_snapshot(self):
+        """Suit une bascule de snapshot faite par un autre worker"""
+        if self.vector_store.is_current():
+            return
+        async with self._snapshot_lock:
+            if self.vector_store.is_current():
+                return
+            store = await self.vector_store.open_active_snapshot()
+            await self._swap_vector_store(store)
+            logger.info(f"🔀 Snapshot {store.snapshot_version} chargé (bascule par un autre worker)")
+    
+    def _load_snapshot_models(self, store: VectorStore):
+        """Charge l'embedder local, l'index BM25 et l'index des articles construits avec le snapshot servi"""
+        try:
+            self.embedding_service.set_local_embedder(
+                LocalEmbedder.load(store.snapshot_directory, self.embedding_service.dimension)
+            )
+        except Exception as e:
+            logger.warning(f"⚠️ Embedder local du snapshot illisible: {e}")
+        try:
+            self.lexical_index = BM25Index.load(store.snapshot_directory)
+        except Exception as e:
+            self.lexical_index = None
+            logger.warning(f"⚠️ Index BM25 du snapshot illisible: {e}")
+        try:
+            self.article_index = ArticleIndex.load(store.snapshot_directory)
+        except Exception as e:
+            self.article_index = None
+            logger.warning(f"⚠️ Index des articles du snapshot illisible: {e}")
+    
+    async def _swap_vector_store(self, store: VectorStore):
+        """Remplace le vector store servi (une affectation) puis ferme l'ancien"""
+        self._load_snapshot_models(store)
+        previous, self.vector_store = self.vector_store, store
+        self.query_cache.clear()
+        await previous.cleanup()
     
     async def cleanup(self):
         """Nettoyage des ressources"""
@@ -788,6 +1212,8 @@ Important: Base-toi UNIQUEMENT sur le contexte fourni. Si une information n'est
         if hasattr(self.vector_store, 'cleanup'):
             await self.vector_store.cleanup()
         
+        await self.embedding_service.cleanup()
+        
         # Nettoyer le re-ranker
         if hasattr(self.reranker_service, 'cleanup'):
             await self.reranker_service.cleanup()
@@ -802,4 +1228,7 @@ Important: Base-toi UNIQUEMENT sur le contexte fourni. Si une information n'est
             except Exception as e:
                 logger.warning(f"⚠️ Erreur sauvegarde logs: {e}")
         
+        self.search_executor.shutdown()
+        self.parse_executor.shutdown()
+        
         logger.info("✅ Nettoyage terminé")
\ No newline at end of file
@@ -0,0 +1,103 @@
+# ==============================================================================
+# FILE: app/utils/executors.py - Pools de threads dédiés au travail CPU
+# ==============================================================================
+#
+# Le calcul NumPy (produits matrice-vecteur, top-k) relâche le GIL : exécuté
+# dans un pool de threads, il ne bloque plus la boucle d'événements qui sert
+# les flux SSE. Chaque pool mesure sa file d'attente (tâches soumises non
+# encore démarrées) pour montrer quand la recherche sature.
+
+import asyncio
+import logging
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class InstrumentedExecutor:
+    """Pool de threads nommé avec mesure de la profondeur de file et des temps d'attente"""
+
+    def __init__(self, name: str, max_workers: int):
+        """
+        Args:
+            name: Nom du pool (préfixe des threads, clé des statistiques)
+            max_workers: Nombre de threads du pool (par worker uvicorn)
+        """
+        self.name = name
+        self.max_workers = max(1, max_workers)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+
+        self.queued = 0  # Tâches soumises pas encore démarrées
+        self.active = 0
+        self.peak_queued = 0
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self._wait_seconds = 0.0
+        self._run_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    async def run(self, func: Callable[..., Any], *args: Any) -> Any:
+        """Exécute func(*args) dans le pool et attend son résultat"""
+        submitted_at = time.perf_counter()
+        with self._lock:
+            self.queued += 1
+            self.submitted += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+
+        def task():
+            started_at = time.perf_counter()
+            with self._lock:
+                self.queued -= 1
+                self.active += 1
+                wait = started_at - submitted_at
+                self._wait_seconds += wait
+                self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            failed = False
+            try:
+                return func(*args)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                with self._lock:
+                    self.active -= 1
+                    self.completed += 1
+                    self.failed += failed
+                    self._run_seconds += time.perf_counter() - started_at
+
+        future = self._executor.submit(task)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, future: Future):
+        # Tâche annulée avant son démarrage (requête abandonnée) : elle quitte la file
+        if future.cancelled():
+            with self._lock:
+                self.queued -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            started = self.completed + self.active
+            return {
+                "max_workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                "saturated": self.queued > 0,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "mean_wait_ms": round(self._wait_seconds / started * 1000, 3) if started else 0.0,
+                "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+                "mean_run_ms": round(self._run_seconds / self.completed * 1000, 3) if self.completed else 0.0,
+            }
+
+    def shutdown(self):
+        """Arrête le pool (les tâches en attente sont annulées)"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        logger.info(f"🧹 Pool {self.name} arrêté")
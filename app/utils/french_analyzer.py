@@ -0,0 +1,95 @@
+# ==============================================================================
+# FILE: app/utils/french_analyzer.py - Analyseur lexical français (textes juridiques)
+# ==============================================================================
+#
+# Découpe un texte en termes pour l'index BM25, de la même façon à
+# l'indexation et à la requête :
+#
+#   élision       l'impôt -> impôt, d'assiette -> assiette (apostrophes ' et ’)
+#   sigles        T.V.A. -> tva ; les sigles en capitales (AIB, TPS, IRCM) ne
+#                 sont ni racinisés ni filtrés comme mots vides
+#   numéros       "45 bis", "45bis" -> 45bis (suffixes latins des articles)
+#   accents       casse et accents ignorés (é -> e, ç -> c)
+#   abréviations  art. -> article, al. -> alinéa
+#   mots vides    articles, prépositions et pronoms fréquents retirés
+#   racinisation  légère : pluriels (-s, -x, -aux -> -al) et e muets finaux
+#
+# La racinisation ne touche pas les termes de 4 caractères ou moins : un sigle
+# tapé en minuscules dans une question ("tps", "ircm") reste identique au sigle
+# indexé.
+
+import re
+import unicodedata
+from typing import List
+
+LATIN_SUFFIXES = ("bis", "ter", "quater", "quinquies", "sexies", "septies", "octies", "nonies", "decies")
+
+STOPWORDS = frozenset("""
+a ai au aux avec ce ces cet cette dans de des du elle elles en entre est et etre il ils
+je la le les leur leurs lui ma mais me meme mes moi mon ne ni nos notre nous on ou par
+pas pour qu que quel quelle quels qui quoi sa sans se ses si son sont sur ta te tes ton
+tu un une vos votre vous y
+""".split())
+
+# Abréviations courantes des références juridiques
+ABBREVIATIONS = {"art": "article", "al": "alinea"}
+
+MIN_STEM_LENGTH = 5
+
+_ELISION_PATTERN = re.compile(r"\b(?:qu|jusqu|lorsqu|puisqu|quoiqu|[cdjlmnst])['’]", re.IGNORECASE)
+_DOTTED_ACRONYM_PATTERN = re.compile(r"\b(?:[A-Z]\.){2,}")
+_TOKEN_PATTERN = re.compile(
+    r"\d+(?:[.,]\d+)*(?:\s*(?:" + "|".join(LATIN_SUFFIXES) + r")\b)?|[^\W\d_]+",
+    re.IGNORECASE
+)
+
+
+def fold(text: str) -> str:
+    """Minuscules sans accents"""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+
+def light_stem(term: str) -> str:
+    """Racinisation légère (pluriels et e muets) d'un terme déjà replié"""
+    if len(term) < MIN_STEM_LENGTH:
+        return term
+    if term.endswith("aux") and len(term) > MIN_STEM_LENGTH:
+        return term[:-3] + "al"
+    if term[-1] in "sx":
+        term = term[:-1]
+    while len(term) >= MIN_STEM_LENGTH and term.endswith("e"):
+        term = term[:-1]
+    return term
+
+
+def is_acronym(token: str) -> bool:
+    """Sigle en capitales (AIB, TPS, IRCM)"""
+    return len(token) >= 2 and token.isalpha() and token.isupper()
+
+
+def analyze(text: str) -> List[str]:
+    """
+    Termes d'un texte (ordre conservé, répétitions comprises)
+
+    Args:
+        text: Texte brut (chunk du CGI ou question)
+    """
+    if not text:
+        return []
+    text = _ELISION_PATTERN.sub(" ", text)
+    text = _DOTTED_ACRONYM_PATTERN.sub(lambda match: match.group(0).replace(".", ""), text)
+
+    terms = []
+    for match in _TOKEN_PATTERN.finditer(text):
+        token = match.group(0)
+        if token[0].isdigit():
+            terms.append("".join(fold(token).split()))  # "45 bis" -> 45bis
+            continue
+        term = fold(token)
+        term = ABBREVIATIONS.get(term, term)
+        if is_acronym(token):
+            terms.append(term)
+        elif term not in STOPWORDS and len(term) > 1:
+            terms.append(light_stem(term))
+    return terms
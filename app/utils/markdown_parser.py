@@ -4,6 +4,7 @@
 
 import re
 import logging
+import threading
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 import markdown
@@ -15,13 +16,12 @@ class MarkdownParser:
     """Parser spécialisé pour les documents Markdown du Code Général des Impôts"""
     
     def __init__(self):
-        self.md_processor = markdown.Markdown(extensions=[
-            'toc', 'tables', 'fenced_code', 'attr_list'
-        ])
+        # Un convertisseur Markdown par thread (pool de parsing) : l'instance garde un état
+        self._local = threading.local()
         
         # Patterns pour identifier les éléments juridiques
         self.patterns = {
-            'article': re.compile(r'(?:article|art\.?)\s*(\d+(?:[a-z]|bis|ter|quater)?)', re.IGNORECASE),
+            'article': re.compile(r'\b(?:articles?|art\.?)\s*(\d+(?:\s?(?:bis|ter|quater|quinquies|sexies)\b|er\b|[a-z]\b)?)', re.IGNORECASE),
             'section': re.compile(r'section\s*(\d+|[ivx]+)', re.IGNORECASE),
             'paragraph': re.compile(r'(?:paragraphe|§)\s*(\d+)', re.IGNORECASE),
             'alinea': re.compile(r'alinéa\s*(\d+)', re.IGNORECASE),
@@ -51,7 +51,18 @@ class MarkdownParser:
             ]
         }
     
-    async def parse_document(self, content: str, file_path: str) -> Dict[str, Any]:
+    @property
+    def md_processor(self) -> markdown.Markdown:
+        """Convertisseur Markdown du thread courant"""
+        processor = getattr(self._local, "md_processor", None)
+        if processor is None:
+            processor = markdown.Markdown(extensions=[
+                'toc', 'tables', 'fenced_code', 'attr_list'
+            ])
+            self._local.md_processor = processor
+        return processor
+    
+    def parse(self, content: str, file_path: str) -> Dict[str, Any]:
         """
         Parse un document Markdown en extrayant la structure et les métadonnées
         
@@ -71,16 +82,16 @@ class MarkdownParser:
             soup = BeautifulSoup(html_content, 'html.parser')
             
             # Extraire la structure
-            structure = await self._extract_structure(soup, content)
+            structure = self._extract_structure(soup, content)
             
             # Identifier les éléments juridiques
-            legal_elements = await self._extract_legal_elements(content)
+            legal_elements = self._extract_legal_elements(content)
             
             # Catégoriser le contenu
-            categories = await self._categorize_content(content)
+            categories = self._categorize_content(content)
             
             # Extraire les métadonnées
-            metadata = await self._extract_metadata(content, file_path)
+            metadata = self._extract_metadata(content, file_path)
             
             document = {
                 'file_name': file_name,
@@ -102,7 +113,11 @@ class MarkdownParser:
             logger.error(f"❌ Erreur parsing document {file_path}: {e}")
             return self._create_fallback_document(content, file_path)
     
-    async def _extract_structure(self, soup: BeautifulSoup, content: str) -> Dict[str, Any]:
+    async def parse_document(self, content: str, file_path: str) -> Dict[str, Any]:
+        """Parse depuis une coroutine (sans E/S : appelle parse directement)"""
+        return self.parse(content, file_path)
+    
+    def _extract_structure(self, soup: BeautifulSoup, content: str) -> Dict[str, Any]:
         """Extrait la structure hiérarchique du document"""
         structure = {
             'title': '',
@@ -156,7 +171,7 @@ class MarkdownParser:
         
         return structure
     
-    async def _extract_legal_elements(self, content: str) -> Dict[str, List]:
+    def _extract_legal_elements(self, content: str) -> Dict[str, List]:
         """Extrait les éléments juridiques du contenu"""
         legal_elements = {
             'articles': [],
@@ -235,7 +250,7 @@ class MarkdownParser:
         
         return legal_elements
     
-    async def _categorize_content(self, content: str) -> Dict[str, Any]:
+    def _categorize_content(self, content: str) -> Dict[str, Any]:
         """Catégorise le contenu selon les thèmes fiscaux"""
         categories = {
             'primary_category': None,
@@ -282,7 +297,7 @@ class MarkdownParser:
         
         return categories
     
-    async def _extract_metadata(self, content: str, file_path: str) -> Dict[str, Any]:
+    def _extract_metadata(self, content: str, file_path: str) -> Dict[str, Any]:
         """Extrait les métadonnées du document"""
         metadata = {
             'file_size': 0,
@@ -0,0 +1,56 @@
+# ==============================================================================
+# FILE: app/utils/metrics.py - Histogrammes à seaux fixes
+# ==============================================================================
+
+import bisect
+import threading
+from typing import Any, Dict, Sequence
+
+
+class Histogram:
+    """Histogramme cumulatif à bornes fixes (percentiles approchés par seau)"""
+
+    def __init__(self, buckets: Sequence[float]):
+        """
+        Args:
+            buckets: Bornes supérieures croissantes des seaux (un seau +inf est ajouté)
+        """
+        self.buckets = sorted(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.count += 1
+            self.total += value
+            self.max = max(self.max, value)
+
+    def percentile(self, q: float) -> float:
+        """Borne supérieure du seau contenant le q-ième percentile (max pour le seau +inf)"""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.max
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "count": self.count,
+                "mean": round(self.total / self.count, 3) if self.count else 0.0,
+                "max": round(self.max, 3),
+                "p50": self.percentile(50),
+                "p95": self.percentile(95),
+                "buckets": {
+                    **{f"le_{bound:g}": count for bound, count in zip(self.buckets, self.counts)},
+                    "inf": self.counts[-1]
+                },
+            }
@@ -0,0 +1,102 @@
+# ==============================================================================
+# FILE: app/utils/micro_batcher.py - Regroupement des appels concurrents
+# ==============================================================================
+#
+# Plusieurs requêtes arrivant presque en même temps (flux /query/stream) sont
+# regroupées en un seul appel : le premier élément ouvre une fenêtre de quelques
+# millisecondes, l'appel part à la fin de la fenêtre ou dès max_batch_size
+# éléments, et chaque coroutine en attente reçoit son propre résultat.
+
+import asyncio
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+from app.utils.metrics import Histogram
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64)
+DELAY_MS_BUCKETS = (0.5, 1, 2, 5, 10, 20, 50, 100)
+
+
+class MicroBatcher:
+    """Regroupe les éléments soumis pendant une courte fenêtre en un appel groupé"""
+
+    def __init__(self, name: str,
+                 process: Callable[[List[Any]], Awaitable[List[Any]]],
+                 max_batch_size: int = 32,
+                 max_delay_ms: float = 5.0):
+        """
+        Args:
+            name: Nom du regroupement (journaux, statistiques)
+            process: Appel groupé : liste d'éléments -> liste de résultats (même ordre)
+            max_batch_size: Taille maximale d'un lot
+            max_delay_ms: Durée de la fenêtre de regroupement (0 = pas de regroupement)
+        """
+        self.name = name
+        self.process = process
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_delay_ms = max_delay_ms
+
+        self._pending: List[Tuple[Any, asyncio.Future, float]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+        self.batches = 0
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_delays_ms = Histogram(DELAY_MS_BUCKETS)
+
+    async def submit(self, item: Any) -> Any:
+        """Soumet un élément et attend son résultat"""
+        if self.max_delay_ms <= 0:
+            self.batch_sizes.observe(1)
+            return (await self.process([item]))[0]
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_delay_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)  # Référence gardée jusqu'à la fin de l'appel
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future, float]]):
+        started_at = time.perf_counter()
+        self.batches += 1
+        self.batch_sizes.observe(len(batch))
+        for _, _, enqueued_at in batch:
+            self.queue_delays_ms.observe((started_at - enqueued_at) * 1000)
+
+        try:
+            results = await self.process([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future, _), result in zip(batch, results):
+            if not future.done():  # Requête abandonnée entre-temps
+                future.set_result(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_delay_ms": self.max_delay_ms,
+            "batches": self.batches,
+            "pending": len(self._pending),
+            "batch_size": self.batch_sizes.get_stats(),
+            "queue_delay_ms": self.queue_delays_ms.get_stats(),
+        }
@@ -0,0 +1,43 @@
+# ==============================================================================
+# FILE: app/utils/rank_fusion.py - Fusion de classements (Reciprocal Rank Fusion)
+# ==============================================================================
+#
+# RRF combine des classements dont les scores ne sont pas comparables (cosinus
+# dense, BM25) en n'utilisant que les rangs : score(d) = Σ 1 / (k + rang(d)).
+# Un chunk bien classé par les deux recherches passe devant un chunk classé
+# premier par une seule ; k amortit l'écart entre les premiers rangs.
+
+from typing import Any, Dict, List, Sequence
+
+DEFAULT_RRF_K = 60
+
+
+def reciprocal_rank_fusion(rankings: Sequence[List[Dict[str, Any]]],
+                           k: int = DEFAULT_RRF_K,
+                           names: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """
+    Fusionne des listes de résultats (dictionnaires avec un "id") par RRF
+
+    Args:
+        rankings: Classements à fusionner, chacun trié par pertinence décroissante
+        k: Constante de lissage des rangs
+        names: Nom de chaque classement (rang enregistré dans "<nom>_rank")
+
+    Returns:
+        Résultats uniques triés par score RRF ("rrf_score") ; pour un chunk présent
+        dans plusieurs classements, les champs du premier classement priment
+    """
+    fused: Dict[str, Dict[str, Any]] = {}
+    for position, ranking in enumerate(rankings):
+        name = names[position] if position < len(names) else None
+        for rank, result in enumerate(ranking, start=1):
+            entry = fused.get(result["id"])
+            if entry is None:
+                entry = fused[result["id"]] = {**result, "rrf_score": 0.0}
+            else:
+                for key, value in result.items():
+                    entry.setdefault(key, value)  # Champs propres à ce classement (ex: lexical_score)
+            entry["rrf_score"] += 1.0 / (k + rank)
+            if name:
+                entry[f"{name}_rank"] = rank
+    return sorted(fused.values(), key=lambda result: result["rrf_score"], reverse=True)
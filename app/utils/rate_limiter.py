@@ -0,0 +1,127 @@
+# ==============================================================================
+# FILE: app/utils/rate_limiter.py - Limitation de débit asynchrone (token bucket)
+# ==============================================================================
+#
+# Les quotas des API Google s'expriment en requêtes/min et en tokens/min. Chaque
+# appel réserve sa part dans les deux seaux puis attend (asyncio.sleep) le temps
+# nécessaire pour rester sous le quota, au lieu de recevoir un 429. Un sémaphore
+# borne en plus le nombre d'appels simultanés.
+#
+# La réservation est immédiate (le solde peut devenir négatif) : les appelants
+# sont servis dans l'ordre d'arrivée, sans verrou.
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimation grossière du nombre de tokens d'un texte (~4 caractères par token)"""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Seau de jetons rechargé en continu (quota par minute)"""
+
+    def __init__(self, per_minute: float):
+        """
+        Args:
+            per_minute: Jetons rechargés par minute (aussi la capacité du seau)
+        """
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self.paused_until = 0.0
+
+    def reserve(self, amount: float) -> float:
+        """Réserve des jetons et retourne le délai d'attente (secondes) avant de les utiliser"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+        # Une demande plus grande que le seau ne doit pas attendre indéfiniment
+        self.tokens -= min(amount, self.capacity)
+        delay = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        return max(delay, self.paused_until - now)
+
+    def pause(self, seconds: float):
+        """Suspend le seau (quota dépassé côté fournisseur)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+class AsyncRateLimiter:
+    """Quotas requêtes/min et tokens/min avec nombre d'appels simultanés borné"""
+
+    def __init__(self, name: str,
+                 requests_per_minute: float,
+                 tokens_per_minute: Optional[float] = None,
+                 max_in_flight: int = 4):
+        """
+        Args:
+            name: Nom du limiteur (journaux, statistiques)
+            requests_per_minute: Quota de requêtes par minute
+            tokens_per_minute: Quota de tokens par minute (None = non limité)
+            max_in_flight: Appels simultanés au plus
+        """
+        self.name = name
+        self.max_in_flight = max(1, max_in_flight)
+        self._requests = TokenBucket(requests_per_minute)
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        self.acquired = 0
+        self.delayed = 0  # Appels ayant attendu le quota
+        self.throttled = 0  # Quotas dépassés signalés par le fournisseur (429)
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    @asynccontextmanager
+    async def limit(self, requests: int = 1, tokens: int = 0) -> AsyncIterator[None]:
+        """Attend le quota et une place libre, le temps de l'appel"""
+        started_at = time.monotonic()
+        delay = self._requests.reserve(requests)
+        if self._tokens is not None and tokens:
+            delay = max(delay, self._tokens.reserve(tokens))
+        if delay > 0:
+            self.delayed += 1
+            await asyncio.sleep(delay)
+
+        async with self._semaphore:
+            wait = time.monotonic() - started_at
+            self.acquired += 1
+            self._wait_seconds += wait
+            self.max_wait_seconds = max(self.max_wait_seconds, wait)
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            try:
+                yield
+            finally:
+                self.in_flight -= 1
+
+    def pause(self, seconds: float):
+        """Suspend les appels suivants après un 429 du fournisseur"""
+        self.throttled += 1
+        self._requests.pause(seconds)
+        if self._tokens is not None:
+            self._tokens.pause(seconds)
+        logger.warning(f"⏳ Quota {self.name} dépassé : appels suspendus {seconds:.1f}s")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "requests_per_minute": self._requests.capacity,
+            "tokens_per_minute": self._tokens.capacity if self._tokens is not None else None,
+            "max_in_flight": self.max_in_flight,
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "acquired": self.acquired,
+            "delayed": self.delayed,
+            "throttled": self.throttled,
+            "mean_wait_ms": round(self._wait_seconds / self.acquired * 1000, 3) if self.acquired else 0.0,
+            "max_wait_ms": round(self.max_wait_seconds * 1000, 3),
+        }
@@ -0,0 +1,109 @@
+# ==============================================================================
+# FILE: app/utils/similarity.py - Noyau de similarité cosinus en bloc
+# ==============================================================================
+#
+# Toutes les similarités passent par un produit matriciel float32 sur des
+# vecteurs normalisés, puis une sélection top-k par argpartition (O(n)) suivie
+# d'un tri des seuls k candidats. Les normes des candidats peuvent être
+# précalculées (ou les candidats déjà normalisés, comme la matrice du store)
+# pour éviter de les recalculer à chaque requête.
+
+from typing import Optional, Tuple, Union
+
+import numpy as np
+
+ArrayLike = Union[np.ndarray, list]
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Normalise chaque vecteur (norme L2, dernier axe) ; les vecteurs nuls restent nuls"""
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def row_norms(matrix: ArrayLike) -> np.ndarray:
+    """Normes L2 des lignes (à précalculer pour des candidats réutilisés)"""
+    return np.linalg.norm(np.asarray(matrix, dtype=np.float32), axis=1)
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices des top_k meilleurs scores, triés par score décroissant"""
+    if top_k <= 0 or scores.size == 0:
+        return np.empty(0, dtype=np.int64)
+    if top_k < scores.size:
+        candidates = np.argpartition(-scores, top_k - 1)[:top_k]
+    else:
+        candidates = np.arange(scores.size)
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+def top_k_indices_batch(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices des top_k meilleurs scores de chaque ligne (requête), triés par score décroissant"""
+    if top_k <= 0 or scores.shape[1] == 0:
+        return np.empty((scores.shape[0], 0), dtype=np.int64)
+    if top_k < scores.shape[1]:
+        candidates = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    else:
+        candidates = np.broadcast_to(np.arange(scores.shape[1]), scores.shape)
+    order = np.argsort(-np.take_along_axis(scores, candidates, axis=1), axis=1, kind="stable")
+    return np.take_along_axis(candidates, order, axis=1)
+
+
+def cosine_scores(query: ArrayLike,
+                  candidates: ArrayLike,
+                  candidate_norms: Optional[np.ndarray] = None,
+                  normalized: bool = False) -> np.ndarray:
+    """
+    Similarités cosinus d'une requête avec chaque candidat (un produit matrice-vecteur)
+
+    Args:
+        query: Vecteur de la requête
+        candidates: Matrice (n, d) des candidats, ou vue sur la matrice du store
+        candidate_norms: Normes précalculées des candidats (row_norms)
+        normalized: Candidats déjà normalisés (normes ignorées)
+    """
+    matrix = np.asarray(candidates, dtype=np.float32)
+    if matrix.ndim != 2 or matrix.shape[0] == 0:
+        return np.zeros(0, dtype=np.float32)
+    query = normalize_rows(np.asarray(query, dtype=np.float32))
+    scores = matrix @ query
+    if not normalized:
+        norms = candidate_norms if candidate_norms is not None else row_norms(matrix)
+        scores = np.divide(scores, norms, out=np.zeros_like(scores), where=norms > 0)
+    return scores
+
+
+def pairwise_cosine(a: ArrayLike,
+                    b: Optional[ArrayLike] = None,
+                    normalized: bool = False) -> np.ndarray:
+    """
+    Matrice des similarités cosinus entre les lignes de a et celles de b (défaut: a)
+
+    Pour la diversification (MMR), la déduplication ou un cache sémantique.
+    """
+    left = np.asarray(a, dtype=np.float32)
+    if not normalized:
+        left = normalize_rows(left)
+    if b is None:
+        return left @ left.T
+    right = np.asarray(b, dtype=np.float32)
+    if not normalized:
+        right = normalize_rows(right)
+    return left @ right.T
+
+
+def top_k_similar(query: ArrayLike,
+                  candidates: ArrayLike,
+                  top_k: int,
+                  candidate_norms: Optional[np.ndarray] = None,
+                  normalized: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Les top_k candidats les plus similaires à la requête
+
+    Returns:
+        (indices, similarités), triés par similarité décroissante
+    """
+    scores = cosine_scores(query, candidates, candidate_norms, normalized)
+    selected = top_k_indices(scores, top_k)
+    return selected, scores[selected]
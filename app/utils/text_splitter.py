@@ -59,7 +59,7 @@ class TextSplitter:
             'enumeration': re.compile(r'^\s*(?:\d+°?|[a-z]\))', re.MULTILINE)
         }
     
-    async def split_document(self, document: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def split(self, document: Dict[str, Any]) -> List[Dict[str, Any]]:
         """
         Découpe un document parsé en chunks intelligents
         
@@ -76,21 +76,21 @@ class TextSplitter:
             
             if self.preserve_structure and structure.get('sections'):
                 # Découpage basé sur la structure
-                chunks = await self._split_by_structure(document)
+                chunks = self._split_by_structure(document)
             else:
                 # Découpage basé sur le contenu
-                chunks = await self._split_by_content(content)
+                chunks = self._split_by_content(content)
             
             # Enrichir chaque chunk avec des métadonnées
             enriched_chunks = []
             for i, chunk in enumerate(chunks):
-                enriched_chunk = await self._enrich_chunk(
+                enriched_chunk = self._enrich_chunk(
                     chunk, i, document, legal_elements
                 )
                 enriched_chunks.append(enriched_chunk)
             
             # Post-traitement : fusionner les chunks trop petits
-            final_chunks = await self._post_process_chunks(enriched_chunks)
+            final_chunks = self._post_process_chunks(enriched_chunks)
             
             logger.info(f"📄 Document découpé en {len(final_chunks)} chunks")
             return final_chunks
@@ -98,19 +98,23 @@ class TextSplitter:
         except Exception as e:
             logger.error(f"❌ Erreur découpage document: {e}")
             # Fallback : découpage simple par taille
-            return await self._fallback_split(document['raw_content'])
+            return self._fallback_split(document['raw_content'])
+    
+    async def split_document(self, document: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Découpage depuis une coroutine (le découpage lui-même est synchrone)"""
+        return self.split(document)
     
-    async def _split_by_structure(self, document: Dict[str, Any]) -> List[Dict[str, str]]:
+    def _split_by_structure(self, document: Dict[str, Any]) -> List[Dict[str, str]]:
         """Découpage basé sur la structure hiérarchique du document"""
         chunks = []
         content = document['raw_content']
         sections = document['structure']['sections']
         
         if not sections:
-            return await self._split_by_content(content)
+            return self._split_by_content(content)
         
         # Diviser le contenu par sections principales
-        section_contents = await self._extract_section_contents(content, sections)
+        section_contents = self._extract_section_contents(content, sections)
         
         for section_info in section_contents:
             section_text = section_info['content']
@@ -118,7 +122,7 @@ class TextSplitter:
             
             # Si la section est trop grande, la subdiviser
             if len(section_text) > self.max_chunk_size:
-                sub_chunks = await self._split_large_section(section_text, section_title)
+                sub_chunks = self._split_large_section(section_text, section_title)
                 chunks.extend(sub_chunks)
             else:
                 chunks.append({
@@ -130,7 +134,7 @@ class TextSplitter:
         
         return chunks
     
-    async def _extract_section_contents(self, content: str, sections: List[Dict]) -> List[Dict]:
+    def _extract_section_contents(self, content: str, sections: List[Dict]) -> List[Dict]:
         """Extrait le contenu de chaque section"""
         section_contents = []
         lines = content.split('\n')
@@ -180,7 +184,7 @@ class TextSplitter:
         
         return section_contents
     
-    async def _split_large_section(self, text: str, section_title: str) -> List[Dict[str, str]]:
+    def _split_large_section(self, text: str, section_title: str) -> List[Dict[str, str]]:
         """Découpe une section trop grande en respectant la structure"""
         chunks = []
         
@@ -198,7 +202,7 @@ class TextSplitter:
                 
                 if len(article_text) > self.max_chunk_size:
                     # Article encore trop grand, découper davantage
-                    sub_chunks = await self._split_by_content(article_text)
+                    sub_chunks = self._split_by_content(article_text)
                     for j, sub_chunk in enumerate(sub_chunks):
                         sub_chunk['title'] = f"{article_title} (partie {j+1})"
                         sub_chunk['section'] = section_title
@@ -214,7 +218,7 @@ class TextSplitter:
                     })
         else:
             # Pas d'articles, découpage par contenu
-            content_chunks = await self._split_by_content(text)
+            content_chunks = self._split_by_content(text)
             for i, chunk in enumerate(content_chunks):
                 chunk['title'] = f"{section_title} (partie {i+1})"
                 chunk['section'] = section_title
@@ -222,7 +226,7 @@ class TextSplitter:
         
         return chunks
     
-    async def _split_by_content(self, text: str) -> List[Dict[str, str]]:
+    def _split_by_content(self, text: str) -> List[Dict[str, str]]:
         """Découpage intelligent basé sur le contenu et les séparateurs naturels"""
         chunks = []
         
@@ -237,14 +241,14 @@ class TextSplitter:
             if separator_name in ['article_start', 'section_start']:
                 continue  # Déjà traité dans split_by_structure
             
-            splits = await self._try_split_with_separator(text, pattern, separator_name)
+            splits = self._try_split_with_separator(text, pattern, separator_name)
             if splits:
                 return splits
         
         # Fallback : découpage par taille fixe avec chevauchement
-        return await self._split_by_size(text)
+        return self._split_by_size(text)
     
-    async def _try_split_with_separator(self, text: str, pattern: re.Pattern, 
+    def _try_split_with_separator(self, text: str, pattern: re.Pattern, 
                                       separator_name: str) -> Optional[List[Dict[str, str]]]:
         """Essaie de découper avec un séparateur spécifique"""
         splits = list(pattern.finditer(text))
@@ -294,7 +298,7 @@ class TextSplitter:
         for chunk in chunks:
             if len(chunk['text']) > self.max_chunk_size:
                 # Subdiviser davantage
-                sub_chunks = await self._split_by_size(chunk['text'])
+                sub_chunks = self._split_by_size(chunk['text'])
                 for sub_chunk in sub_chunks:
                     sub_chunk['parent_type'] = separator_name
                     valid_chunks.append(sub_chunk)
@@ -303,7 +307,7 @@ class TextSplitter:
         
         return valid_chunks if valid_chunks else None
     
-    async def _split_by_size(self, text: str) -> List[Dict[str, str]]:
+    def _split_by_size(self, text: str) -> List[Dict[str, str]]:
         """Découpage par taille fixe avec préservation des mots"""
         chunks = []
         words = text.split()
@@ -344,7 +348,7 @@ class TextSplitter:
         
         return chunks
     
-    async def _enrich_chunk(self, chunk: Dict[str, str], index: int, 
+    def _enrich_chunk(self, chunk: Dict[str, str], index: int, 
                           document: Dict[str, Any], legal_elements: Dict) -> Dict[str, Any]:
         """Enrichit un chunk avec des métadonnées"""
         text = chunk['text']
@@ -358,22 +362,22 @@ class TextSplitter:
             'type': chunk.get('type', 'content'),
             'word_count': len(text.split()),
             'char_count': len(text),
-            'token_count': await self._count_tokens(text),
-            'keywords': await self._extract_keywords(text),
-            'legal_references': await self._find_legal_references_in_chunk(text, legal_elements),
+            'token_count': self._count_tokens(text),
+            'keywords': self._extract_keywords(text),
+            'legal_references': self._find_legal_references_in_chunk(text, legal_elements),
             'metadata': {
                 'separator_used': chunk.get('separator_used', 'none'),
                 'parent_type': chunk.get('parent_type', ''),
                 'has_amounts': bool(re.search(r'\d+(?:\s?\d{3})*(?:,\d+)?\s*€', text)),
                 'has_percentages': bool(re.search(r'\d+(?:,\d+)?\s*%', text)),
                 'has_dates': bool(re.search(r'\b\d{1,2}[-/\.]\d{1,2}[-/\.]\d{2,4}\b', text)),
-                'complexity_score': await self._calculate_chunk_complexity(text)
+                'complexity_score': self._calculate_chunk_complexity(text)
             }
         }
         
         return enriched
     
-    async def _count_tokens(self, text: str) -> int:
+    def _count_tokens(self, text: str) -> int:
         """Compte approximativement les tokens dans un texte"""
         try:
             return len(self.tokenizer.encode(text))
@@ -381,7 +385,7 @@ class TextSplitter:
             # Approximation grossière : 1 token ≈ 4 caractères en français
             return len(text) // 4
     
-    async def _extract_keywords(self, text: str) -> List[str]:
+    def _extract_keywords(self, text: str) -> List[str]:
         """Extrait les mots-clés importants d'un chunk"""
         # Mots-clés juridiques courants
         legal_keywords = [
@@ -400,7 +404,7 @@ class TextSplitter:
         
         return found_keywords[:10]  # Limiter à 10 mots-clés
     
-    async def _find_legal_references_in_chunk(self, text: str, legal_elements: Dict) -> List[str]:
+    def _find_legal_references_in_chunk(self, text: str, legal_elements: Dict) -> List[str]:
         """Trouve les références légales dans un chunk"""
         references = []
         
@@ -416,7 +420,7 @@ class TextSplitter:
         
         return references
     
-    async def _calculate_chunk_complexity(self, text: str) -> float:
+    def _calculate_chunk_complexity(self, text: str) -> float:
         """Calcule un score de complexité pour un chunk"""
         factors = []
         
@@ -437,7 +441,7 @@ class TextSplitter:
         
         return sum(factors) / len(factors) if factors else 0.0
     
-    async def _post_process_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _post_process_chunks(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Post-traitement des chunks : fusion des petits chunks"""
         if not chunks:
             return chunks
@@ -493,9 +497,9 @@ class TextSplitter:
         
         return text.strip()
     
-    async def _fallback_split(self, content: str) -> List[Dict[str, Any]]:
+    def _fallback_split(self, content: str) -> List[Dict[str, Any]]:
         """Découpage de secours en cas d'erreur"""
-        chunks = await self._split_by_size(content)
+        chunks = self._split_by_size(content)
         
         return [{
             'text': chunk['text'],
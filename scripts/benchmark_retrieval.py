@@ -0,0 +1,156 @@
+#!/usr/bin/env python
+# ==============================================================================
+# FILE: scripts/benchmark_retrieval.py - Recall@k et latence de la recherche approchée
+# ==============================================================================
+#
+# Usage (depuis la racine du projet) :
+#   python scripts/benchmark_retrieval.py --backend ivf --nprobe 1,2,4,8,16 --top-k 10
+#   python scripts/benchmark_retrieval.py --backend hnsw --ef-search 16,32,64,128
+#   python scripts/benchmark_retrieval.py --backend exact --prefix-dims 64,128,256 --rescore-factor 2,4,8,16
+#
+# Les requêtes sont des chunks de la collection tirés au hasard, légèrement
+# bruités pour ne pas se retrouver eux-mêmes à coup sûr.
+#
+# La mesure porte sur une copie du snapshot actif (base active + journal) dans
+# un répertoire temporaire : les index y sont reconstruits sans jamais réécrire
+# la collection servie par l'application. Les fichiers d'une génération ne sont
+# jamais modifiés après écriture : ils sont liés (hard link) plutôt que copiés.
+
+import argparse
+import asyncio
+import json
+import os
+import shutil
+import sys
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.database import index_storage  # noqa: E402
+from app.database.vector_store import VectorStore  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Recall@k de la recherche approchée vs exacte")
+    parser.add_argument("--persist-directory", default="./vector_db")
+    parser.add_argument("--collection", default="cgi_documents")
+    parser.add_argument("--backend", default="ivf")
+    parser.add_argument("--ivf-lists", type=int, default=None)
+    parser.add_argument("--quantization", default="none", help="none | int8")
+    parser.add_argument("--prefix-dims", default="", help="Dimensions de préfixe (Matryoshka) séparées par des virgules")
+    parser.add_argument("--rescore-factor", default="2,4,8,16", help="Valeurs de rescore_factor séparées par des virgules")
+    parser.add_argument("--nprobe", default="1,2,4,8,16", help="Valeurs de nprobe séparées par des virgules")
+    parser.add_argument("--ef-search", default="16,32,64,128", help="Valeurs de ef_search (HNSW) séparées par des virgules")
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--noise", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=0)
+    return parser.parse_args()
+
+
+def parse_values(text: str):
+    return [int(value) for value in text.split(",") if value]
+
+
+def link_or_copy(source: str, target: str):
+    try:
+        os.link(source, target)
+    except OSError:
+        shutil.copy2(source, target)
+
+
+def copy_active_snapshot(args, directory: str) -> bool:
+    """Copie le snapshot actif de la collection dans directory (False sans snapshot)"""
+    root = os.path.join(args.persist_directory, args.collection)
+    version = index_storage.read_current(root)
+    if version is None:
+        return False
+
+    source = os.path.join(root, version)
+    target = os.path.join(directory, args.collection, version)
+    # Sous le verrou de la collection : ni ajout au journal ni bascule de base pendant la copie
+    with index_storage.CollectionLock(source):
+        base = index_storage.read_base(source)
+        skipped = set(index_storage.list_generations(source)) - {base} | {index_storage.LOCK_FILE}
+        os.makedirs(target)
+        for name in os.listdir(source):
+            path = os.path.join(source, name)
+            if name in skipped:
+                continue
+            if os.path.isdir(path):
+                shutil.copytree(path, os.path.join(target, name), copy_function=link_or_copy)
+            else:
+                # Le journal continue de recevoir des ajouts : copie réelle
+                shutil.copy2(path, os.path.join(target, name))
+    index_storage.write_current(os.path.join(directory, args.collection), version)
+    return True
+
+
+async def open_store(args, persist_directory: str, prefix_dimension=None) -> VectorStore:
+    store = VectorStore(
+        persist_directory=persist_directory,
+        collection_name=args.collection,
+        index_backend=args.backend,
+        ivf_lists=args.ivf_lists,
+        quantization=args.quantization,
+        prefix_dimension=prefix_dimension
+    )
+    await store.initialize()
+    return store
+
+
+async def main():
+    args = parse_args()
+    # Sur le même système de fichiers que la collection (liens physiques)
+    directory = tempfile.mkdtemp(prefix=".benchmark-", dir=args.persist_directory)
+    try:
+        if not copy_active_snapshot(args, directory):
+            print("Aucun snapshot actif : lancez d'abord l'indexation (ou ouvrez la collection une fois).")
+            return
+        await benchmark(args, directory)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+async def benchmark(args, directory: str):
+    store = await open_store(args, directory)
+    if not store.live_count:
+        print("Collection vide : lancez d'abord l'indexation.")
+        return
+
+    # (Re)construire l'index approché pour le backend demandé (dans la copie)
+    await store.build_index()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = store.live_embeddings()
+    sample = vectors[rng.choice(vectors.shape[0], min(args.queries, vectors.shape[0]), replace=False)]
+    queries = sample + rng.normal(0, args.noise, sample.shape).astype(np.float32)
+
+    report = store.evaluate_ann_recall(
+        queries,
+        top_k=args.top_k,
+        nprobe_values=parse_values(args.nprobe),
+        ef_search_values=parse_values(args.ef_search),
+        rescore_factor_values=parse_values(args.rescore_factor)
+    )
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    await store.cleanup()
+
+    # Premier passage sur préfixe tronqué : une ré-ouverture par dimension
+    for dimension in parse_values(args.prefix_dims):
+        prefix_store = await open_store(args, directory, prefix_dimension=dimension)
+        report = prefix_store.evaluate_ann_recall(
+            queries,
+            top_k=args.top_k,
+            nprobe_values=parse_values(args.nprobe),
+            ef_search_values=parse_values(args.ef_search),
+            rescore_factor_values=parse_values(args.rescore_factor)
+        )
+        print(json.dumps(report, indent=2, ensure_ascii=False))
+        await prefix_store.cleanup()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
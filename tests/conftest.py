@@ -0,0 +1,108 @@
+# ==============================================================================
+# FILE: tests/conftest.py - Fixtures communes des tests (vector store, corpus)
+# ==============================================================================
+#
+# Les tests n'appellent aucune API : vecteurs aléatoires (graine fixe), API
+# d'embeddings simulée et documents synthétiques au format des chunks du CGI.
+# Les coroutines sont exécutées avec asyncio.run (pas de plugin pytest
+# asynchrone requis).
+
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pytest
+
+DIMENSION = 32
+
+
+def make_documents(start: int, stop: int, **fields: Any) -> List[Dict[str, Any]]:
+    """Chunks synthétiques c{start}..c{stop-1} (contenus distincts)"""
+    documents = []
+    for i in range(start, stop):
+        metadata = {
+            "impot_types": ["TVA" if i % 2 else "IS"],
+            "regime": "REEL" if i % 3 else "SIMPLIFIE",
+            "update_date": f"{2018 + i % 8}-01-01",
+        }
+        documents.append({
+            "content": f"Chunk numéro {i} du code général des impôts",
+            "source_file": f"livre_{i % 4}.md",
+            "metadata": metadata,
+            **fields
+        })
+    return documents
+
+
+@pytest.fixture
+def vectors() -> np.ndarray:
+    """Vecteurs float32 aléatoires (un par document)"""
+    return np.random.default_rng(0).normal(size=(400, DIMENSION)).astype(np.float32)
+
+
+@pytest.fixture
+def store_options(tmp_path) -> Dict[str, Any]:
+    """Options d'un VectorStore isolé (compaction automatique désactivée)"""
+    return {
+        "persist_directory": str(tmp_path / "vector_db"),
+        "log_compaction_min_records": 10 ** 9,
+        "tombstone_compaction_ratio": 1.0,
+    }
+
+
+def clustered_vectors(rows: int, dimension: int = 64, clusters: int = 20) -> np.ndarray:
+    """Corpus en grappes (comme des chunks d'un même article), pour mesurer le rappel"""
+    rng = np.random.default_rng(1)
+    centers = rng.normal(size=(clusters, dimension))
+    return (centers[rng.integers(0, clusters, rows)] + 0.3 * rng.normal(size=(rows, dimension))).astype(np.float32)
+
+
+def noisy_queries(vectors: np.ndarray, count: int = 40) -> np.ndarray:
+    """Requêtes proches de chunks existants (sans les retrouver à coup sûr)"""
+    return vectors[:count] + 0.05 * np.random.default_rng(2).normal(size=(count, vectors.shape[1]))
+
+
+def fake_vector(text: str) -> List[float]:
+    """Embedding déterministe d'un texte (longueur, somme des caractères, constante)"""
+    return [float(len(text)), float(sum(map(ord, text)) % 97), 1.0]
+
+
+class FakeEmbeddingAPI:
+    """Remplace genai.embed_content : appels enregistrés, échecs et latence simulés"""
+
+    def __init__(self):
+        self.calls: List[List[str]] = []
+        self.fail_on: Optional[str] = None  # Un lot contenant ce texte échoue
+        self.delay = 0.0
+        self.active = 0
+        self.peak_active = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, model: str, content: List[str], **options: Any) -> Dict[str, Any]:
+        with self._lock:
+            self.calls.append(list(content))
+            self.active += 1
+            self.peak_active = max(self.peak_active, self.active)
+        try:
+            time.sleep(self.delay)
+            if self.fail_on is not None and self.fail_on in content:
+                raise RuntimeError("500 erreur serveur")
+            return {"embedding": [fake_vector(text) for text in content]}
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    @property
+    def texts(self) -> List[str]:
+        return [text for call in self.calls for text in call]
+
+
+@pytest.fixture
+def embedding_api(monkeypatch) -> FakeEmbeddingAPI:
+    """API d'embeddings simulée (aucun appel réseau)"""
+    from app.services import embedding_service
+
+    api = FakeEmbeddingAPI()
+    monkeypatch.setattr(embedding_service.genai, "embed_content", api)
+    return api
@@ -0,0 +1,77 @@
+# ==============================================================================
+# FILE: tests/test_article_index.py - Index des articles et renvoi direct
+# ==============================================================================
+
+from app.database.article_index import (
+    ArticleIndex, article_references, article_text, is_pure_lookup, normalize_article_id
+)
+from app.utils.markdown_parser import MarkdownParser
+
+ARTICLE_PATTERN = MarkdownParser().patterns['article']
+
+CHUNKS = [
+    ("c0", "livre_1.md", "# LIVRE PREMIER\n## Titre I"),
+    ("c1", "livre_1.md", "Article 1er : Il est établi un impôt général."),
+    ("c2", "livre_1.md", "Suite de l'article premier : champ d'application."),
+    ("c3", "livre_1.md", "Article 2 : Exonérations.\nArticle 3 : Taux de 30 %."),
+    ("c4", "livre_1.md", "Fin de l'article 3 (taux réduit)."),
+    ("c5", "livre_1.md", "## Section II"),
+    ("c6", "livre_2.md", "Article 45 bis : Acompte sur impôt (AIB)."),
+    ("c7", "livre_2.md", "Article 46 - Base de l'acompte."),
+]
+
+
+def _index() -> ArticleIndex:
+    return ArticleIndex().build(CHUNKS)
+
+
+def test_article_ranges_follow_headings_and_stop_at_file_boundaries():
+    index = _index()
+    assert index.lookup(["1"]) == [("1", "c1"), ("1", "c2")]
+    assert index.lookup(["2"]) == [("2", "c3")]
+    # Titre de section (chunk structurel) hors de l'article 3
+    assert index.lookup(["3"]) == [("3", "c3"), ("3", "c4")]
+    assert index.lookup(["45bis"]) == [("45bis", "c6")]
+    assert index.lookup(["46"]) == [("46", "c7")]
+    assert index.lookup(["99"]) == []
+
+
+def test_lookup_keeps_requested_order_limit_and_merged_duplicates():
+    index = _index()
+    assert [doc_id for _, doc_id in index.lookup(["46", "1"], limit=2)] == ["c7", "c1"]
+
+    # Doublon fusionné : deux positions désignent le même chunk stocké
+    merged = ArticleIndex().build([
+        ("a", "f.md", "Article 7 : Début."), ("b", "f.md", "Suite."), ("b", "f.md", "Suite.")
+    ])
+    assert merged.lookup(["7"]) == [("7", "a"), ("7", "b")]
+
+
+def test_save_and_load_round_trip(tmp_path):
+    index = _index()
+    index.save(str(tmp_path))
+    loaded = ArticleIndex.load(str(tmp_path))
+    assert loaded.ranges == index.ranges
+    assert loaded.doc_ids == index.doc_ids
+    assert ArticleIndex.load(str(tmp_path / "absent")) is None
+
+
+def test_references_and_pure_lookup_detection():
+    assert normalize_article_id("1er") == "1"
+    assert normalize_article_id("45 bis") == "45bis"
+    assert article_references("Que disent les articles 12, 13 et 14 bis ?", ARTICLE_PATTERN) == ["12", "13", "14bis"]
+    # Montants et pourcentages ne prolongent pas une liste d'articles
+    assert article_references("Article 12 et 2 000 FCFA", ARTICLE_PATTERN) == ["12"]
+
+    assert is_pure_lookup("Que dit l'article 23 du CGI ?", ARTICLE_PATTERN)
+    assert is_pure_lookup("Donne-moi le texte de l'art. 45 bis", ARTICLE_PATTERN)
+    assert not is_pure_lookup("Quel taux l'article 23 applique aux sociétés ?", ARTICLE_PATTERN)
+    assert not is_pure_lookup("Quel est le taux de la TVA ?", ARTICLE_PATTERN)
+
+
+def test_article_text_is_limited_to_the_requested_article():
+    text = "Fin de l'article 1.\nArticle 2 : Exonérations.\nArticle 3 : Taux."
+    assert article_text(text, "2") == "Article 2 : Exonérations."
+    assert article_text(text, "3") == "Article 3 : Taux."
+    # Sans son titre, le chunk est la suite de l'article (jusqu'au titre suivant)
+    assert article_text(text, "1") == "Fin de l'article 1."
@@ -0,0 +1,54 @@
+# ==============================================================================
+# FILE: tests/test_bm25_rrf.py - Analyseur français, index BM25 et fusion RRF
+# ==============================================================================
+
+from app.database.bm25_index import BM25Index
+from app.utils.french_analyzer import analyze
+from app.utils.rank_fusion import reciprocal_rank_fusion
+
+DOCUMENTS = [
+    ("tps", "La TPS est due par les petites entreprises soumises au régime simplifié."),
+    ("aib", "Article 45 bis : acompte sur impôt assis sur les bénéfices (AIB)."),
+    ("foncier", "Les impôts fonciers sont dus par les propriétaires."),
+    ("tva", "La taxe sur la valeur ajoutée (T.V.A.) s'applique aux livraisons de biens."),
+]
+
+
+def test_analyzer_normalizes_french_legal_text():
+    assert analyze("L'impôt d'après l'art. 45 bis") == analyze("impot apres article 45bis")
+    assert analyze("l'art. 45 bis")[-1] == "45bis"
+    assert analyze("T.V.A. et TPS") == ["tva", "tps"]
+    assert analyze("taxes foncières") == analyze("taxe foncière")
+    assert analyze("") == []
+
+
+def test_bm25_ranks_acronyms_and_article_numbers():
+    index = BM25Index().build(DOCUMENTS)
+    assert index.document_count == 4
+    assert index.search("tps", 1)[0][0] == "tps"
+    assert index.search("AIB", 1)[0][0] == "aib"
+    assert index.search("article 45bis", 1)[0][0] == "aib"
+    assert index.search("la tva", 1)[0][0] == "tva"
+    assert index.search("terme absent", 3) == []
+
+
+def test_bm25_ignores_duplicate_ids_and_round_trips(tmp_path):
+    index = BM25Index().build(DOCUMENTS + [("tps", "doublon ignoré")])
+    assert index.document_count == 4
+    index.save(str(tmp_path))
+    loaded = BM25Index.load(str(tmp_path))
+    assert loaded.search("impôt foncier", 2) == index.search("impôt foncier", 2)
+    assert BM25Index.load(str(tmp_path / "absent")) is None
+
+
+def test_reciprocal_rank_fusion_combines_rankings():
+    dense = [{"id": "a", "similarity_score": 0.9}, {"id": "b", "similarity_score": 0.8}]
+    lexical = [{"id": "b", "lexical_score": 7.0}, {"id": "c", "lexical_score": 3.0}]
+    fused = reciprocal_rank_fusion([dense, lexical], k=60, names=("dense", "lexical"))
+
+    assert [result["id"] for result in fused] == ["b", "a", "c"]
+    first = fused[0]
+    assert first["similarity_score"] == 0.8 and first["lexical_score"] == 7.0
+    assert (first["dense_rank"], first["lexical_rank"]) == (2, 1)
+    assert first["rrf_score"] == 1 / 62 + 1 / 61
+    assert "dense_rank" not in fused[2]
@@ -0,0 +1,72 @@
+# ==============================================================================
+# FILE: tests/test_dedup.py - Identifiants par hash de contenu et fusion des doublons
+# ==============================================================================
+
+import asyncio
+
+import numpy as np
+
+from app.database.dedup_index import chunk_id, content_hash, hamming_distances, simhash
+from app.database.vector_store import VectorStore
+from tests.conftest import make_documents
+
+ARTICLE = "Article 45 : Le taux de la taxe sur la valeur ajoutée est fixé à 18 % du prix hors taxe des biens livrés."
+
+
+def test_ids_are_deterministic_on_normalized_content():
+    assert chunk_id("Article 1er :  Impôt", "livre_1.md") == chunk_id("article 1er : impôt\n", "livre_1.md")
+    assert chunk_id("Article 1er", "livre_1.md") != chunk_id("Article 1er", "livre_2.md")
+    assert content_hash("Article 1er") == content_hash("  ARTICLE   1er ")
+    assert content_hash("Article 1er") != content_hash("Article 2")
+
+    near = ARTICLE.replace("livrés", "vendus")
+    distances = hamming_distances(np.array([simhash(near), simhash("Texte sans rapport aucun")], dtype=np.uint64),
+                                  simhash(ARTICLE))
+    assert distances[0] < distances[1]
+
+
+def test_duplicate_chunks_are_merged_with_provenance(store_options, vectors):
+    async def scenario():
+        store = VectorStore(**store_options)
+        await store.initialize()
+        ids = await store.add_documents(make_documents(0, 10), vectors[:10].tolist())
+        # Copies déjà stockées et doublon au sein du même lot
+        copies = [{**document, "source_file": "copie.md"} for document in make_documents(0, 3)]
+        stored_ids = await store.add_documents(copies + copies[:1], vectors[100:104].tolist())
+
+        assert stored_ids == ids[:3] + ids[:1]
+        assert store.live_count == 10
+        document = await store.get_document_by_id(ids[0])
+        assert {entry["source_file"] for entry in document["provenance"]} == {"livre_0.md", "copie.md"}
+
+        # Retirer un fichier ne supprime pas les chunks partagés avec un autre
+        assert await store.delete_by_source_file("copie.md") == 0
+        document = await store.get_document_by_id(ids[0])
+        assert [entry["source_file"] for entry in document["provenance"]] == ["livre_0.md"]
+
+        # La fusion est journalisée : elle survit à la ré-ouverture
+        await store.add_documents(copies[:1], vectors[100:101].tolist())
+        store._log.close()
+        reopened = VectorStore(**store_options)
+        await reopened.initialize()
+        document = await reopened.get_document_by_id(ids[0])
+        assert len(document["provenance"]) == 2
+
+    asyncio.run(scenario())
+
+
+def test_near_duplicates_are_merged_when_enabled(store_options, vectors):
+    near = {"content": ARTICLE.replace("livrés", "vendus"), "source_file": "resume.md"}
+
+    async def scenario(distance):
+        store = VectorStore(**store_options, near_duplicate_distance=distance)
+        await store.initialize()
+        await store.clear()
+        first = await store.add_documents([{"content": ARTICLE, "source_file": "livre_2.md"}], vectors[:1].tolist())
+        second = await store.add_documents([near], vectors[1:2].tolist())
+        return first, second, store.live_count
+
+    first, second, count = asyncio.run(scenario(16))
+    assert second == first and count == 1
+    first, second, count = asyncio.run(scenario(0))
+    assert second != first and count == 2
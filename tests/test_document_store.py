@@ -0,0 +1,71 @@
+# ==============================================================================
+# FILE: tests/test_document_store.py - Documents en blocs compressés et cache LRU
+# ==============================================================================
+
+import asyncio
+
+import numpy as np
+
+from app.database import index_storage
+from app.database.document_store import DocumentStore
+from app.database.vector_store import VectorStore
+from tests.conftest import DIMENSION, make_documents
+
+COUNT = 100  # 4 blocs de DOCUMENTS_PER_BLOCK documents
+
+
+def _open_store(tmp_path, cache_bytes: int) -> DocumentStore:
+    documents = [{**document, "id": f"c{i}"} for i, document in enumerate(make_documents(0, COUNT))]
+    index_storage.write_index(
+        str(tmp_path), [document["id"] for document in documents],
+        np.zeros((COUNT, DIMENSION), dtype=np.float32),
+        [index_storage.encode_document(document) for document in documents], {}
+    )
+    store = DocumentStore(cache_bytes)
+    store.open(str(tmp_path), [document["id"] for document in documents], index_storage.read_manifest(str(tmp_path)))
+    return store
+
+
+def test_blocks_round_trip(tmp_path):
+    store = _open_store(tmp_path, cache_bytes=1 << 20)
+    assert len(store) == COUNT
+    assert store["c0"]["content"] == "Chunk numéro 0 du code général des impôts"
+    assert store["c99"]["source_file"] == "livre_3.md"
+    assert [index_storage.decode_document(raw)["id"] for raw in store.raw_many(["c40", "c3", "c99"])] == ["c40", "c3", "c99"]
+    assert store.get("absent") is None
+
+
+def test_lru_evicts_least_recent_blocks(tmp_path):
+    probe = _open_store(tmp_path, cache_bytes=1 << 20)
+    probe["c0"]
+    block_bytes = probe.get_stats()["cache"]["resident_bytes"]
+
+    # Place pour deux blocs décompressés
+    store = _open_store(tmp_path, cache_bytes=2 * block_bytes + block_bytes // 2)
+    for doc_id in ("c0", "c32", "c1", "c64"):  # Blocs 0, 1, 0 (succès), 2 : évince le bloc 1
+        store[doc_id]
+    stats = store.get_stats()["cache"]
+    assert (stats["hits"], stats["misses"], stats["evictions"]) == (1, 3, 1)
+
+    store["c33"]  # Bloc 1 relu : évince le bloc 0, le bloc 2 reste en cache
+    store["c65"]
+    stats = store.get_stats()["cache"]
+    assert (stats["hits"], stats["misses"]) == (2, 4)
+    assert stats["resident_bytes"] <= stats["max_bytes"]
+
+
+def test_pending_documents_are_bounded_by_compaction(store_options, vectors):
+    async def scenario():
+        store = VectorStore(**store_options, max_pending_documents=25)
+        await store.initialize()
+        ids = await store.add_documents(make_documents(0, 20), vectors[:20].tolist())
+        await store.delete_documents(ids[:3])
+        assert store.documents.pending_count == 20  # 17 ajoutés + 3 gardés pour les vues antérieures
+
+        await store.add_documents(make_documents(20, 30), vectors[20:30].tolist())
+        await store._wait_for_compaction()
+        assert store.documents.pending_count == 0
+        assert store.live_count == 27
+        assert (await store.get_document_by_id(ids[5]))["content"] == "Chunk numéro 5 du code général des impôts"
+
+    asyncio.run(scenario())
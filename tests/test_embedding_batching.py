@@ -0,0 +1,36 @@
+# ==============================================================================
+# FILE: tests/test_embedding_batching.py - Requêtes d'embeddings groupées et concurrentes
+# ==============================================================================
+
+import asyncio
+
+from app.services.embedding_service import PROVIDER_GOOGLE, PROVIDER_LOCAL, EmbeddingService
+from tests.conftest import fake_vector
+
+TEXTS = [f"Article {i} : disposition fiscale numéro {i}" + " détail" * (i % 7) for i in range(250)]
+
+
+def test_batches_are_bounded_and_results_keep_text_order(embedding_api):
+    service = EmbeddingService("test", batch_size=40, batch_chars=1500, max_concurrency=3, micro_batch_window_ms=0)
+    embedding_api.delay = 0.02
+    embeddings = asyncio.run(service.get_embeddings(TEXTS))
+
+    assert embeddings == [fake_vector(text) for text in TEXTS]
+    assert embedding_api.texts and sorted(embedding_api.texts) == sorted(TEXTS)
+    assert all(len(call) <= 40 for call in embedding_api.calls)
+    assert all(sum(map(len, call)) <= 1500 or len(call) == 1 for call in embedding_api.calls)
+    assert service.requests == len(embedding_api.calls) < len(TEXTS)
+    # Lots envoyés en parallèle, jamais plus que max_concurrency
+    assert 1 < embedding_api.peak_active <= 3
+
+
+def test_failed_batch_falls_back_without_invalidating_others(embedding_api):
+    service = EmbeddingService("test", batch_size=10, micro_batch_window_ms=0)
+    embedding_api.fail_on = TEXTS[15]
+    embeddings, providers = asyncio.run(service.get_embeddings_with_providers(TEXTS[:30]))
+
+    assert providers == [PROVIDER_GOOGLE] * 10 + [PROVIDER_LOCAL] * 10 + [PROVIDER_GOOGLE] * 10
+    assert embeddings[:10] == [fake_vector(text) for text in TEXTS[:10]]
+    assert embeddings[20:] == [fake_vector(text) for text in TEXTS[20:30]]
+    assert service.fallback_texts == 10
+    assert len(embeddings[15]) == service.dimension
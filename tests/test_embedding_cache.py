@@ -0,0 +1,71 @@
+# ==============================================================================
+# FILE: tests/test_embedding_cache.py - Cache sqlite des embeddings (hits, modèle, éviction)
+# ==============================================================================
+
+import asyncio
+
+import numpy as np
+
+from app.database.embedding_cache import EmbeddingCache, cache_key
+from app.services.embedding_service import PROVIDER_GOOGLE, PROVIDER_LOCAL, EmbeddingService
+from tests.conftest import fake_vector
+
+TEXTS = ["Article 1er : impôt général", "Article 2 : exonérations", "Article 3 : taux"]
+
+
+def test_service_hits_misses_and_model_change(tmp_path, embedding_api):
+    path = str(tmp_path / "cache" / "embeddings.sqlite")
+    cache = EmbeddingCache(path)
+    service = EmbeddingService("test", cache=cache, micro_batch_window_ms=0)
+
+    # Textes en double (à la normalisation près) envoyés une seule fois
+    first = asyncio.run(service.get_embeddings(TEXTS + ["  article 1ER : impôt général"]))
+    assert first[:3] == [fake_vector(text) for text in TEXTS] and first[3] == first[0]
+    assert embedding_api.texts == TEXTS
+    assert (cache.hits, cache.misses, cache.writes) == (0, 3, 3)
+
+    # Deuxième passage (autre worker, même fichier) : aucun appel à l'API
+    shared = EmbeddingService("test", cache=EmbeddingCache(path), micro_batch_window_ms=0)
+    assert asyncio.run(shared.get_embeddings(TEXTS)) == first[:3]
+    assert len(embedding_api.calls) == 1 and shared.cache.hits == 3
+
+    # Autre dimension demandée : clés distinctes, le cache ne répond pas
+    asyncio.run(service.get_embeddings(TEXTS[:1], output_dimensionality=256))
+    assert embedding_api.texts[-1] == TEXTS[0] and len(cache) == 4
+    assert cache_key("models/text-embedding-004:768", TEXTS[0]) != cache_key("models/text-embedding-004:256", TEXTS[0])
+    cache.close()
+    shared.cache.close()
+
+
+def test_fallback_vectors_are_never_cached(tmp_path, embedding_api):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    service = EmbeddingService("test", cache=cache, batch_size=1, micro_batch_window_ms=0)
+    embedding_api.fail_on = TEXTS[1]
+
+    _, providers = asyncio.run(service.get_embeddings_with_providers(TEXTS))
+    assert providers == [PROVIDER_GOOGLE, PROVIDER_LOCAL, PROVIDER_GOOGLE]
+    assert len(cache) == 2
+
+    embedding_api.fail_on = None
+    _, providers = asyncio.run(service.get_embeddings_with_providers(TEXTS))
+    assert providers == [PROVIDER_GOOGLE] * 3
+    assert embedding_api.calls[-1] == [TEXTS[1]]
+    cache.close()
+
+
+def test_least_recently_read_entries_are_evicted(tmp_path):
+    cache = EmbeddingCache(str(tmp_path / "embeddings.sqlite"))
+    vector = np.ones(768, dtype=np.float32).tolist()
+    cache.put_many("m", {f"old{i}": vector for i in range(50)})
+    cache.put_many("m", {f"new{i}": vector for i in range(50)})
+    assert len(cache.get_many(["old0", "old1"])) == 2  # relues : redeviennent récentes
+
+    cache.max_bytes = cache.get_stats()["used_bytes"] * 4 // 5
+    cache.put_many("m", {"extra": vector})
+    found = cache.get_many(["old0", "old1", "old2", "new49", "extra"])
+    assert {"old0", "old1", "new49", "extra"} <= set(found) and "old2" not in found
+    assert cache.evictions > 0 and cache.get_stats()["used_bytes"] <= cache.max_bytes
+
+    cache.clear("m")
+    assert len(cache) == 0
+    cache.close()
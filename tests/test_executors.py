@@ -0,0 +1,81 @@
+# ==============================================================================
+# FILE: tests/test_executors.py - Pools de threads instrumentés et parsing hors boucle
+# ==============================================================================
+
+import asyncio
+import threading
+
+import pytest
+
+from app.utils import text_splitter
+from app.utils.executors import InstrumentedExecutor
+from app.utils.markdown_parser import MarkdownParser
+
+DOCUMENT = """# LIVRE PREMIER
+
+## Section 1 : Impôt sur les sociétés
+
+Article 1er : Il est établi un impôt annuel sur les bénéfices des sociétés.
+
+Article 2 : Le taux de l'impôt est fixé à 30 %.
+"""
+
+
+class _WordTokenizer:
+    """Tokenizer hors ligne (le vocabulaire tiktoken est téléchargé à la demande)"""
+
+    def encode(self, text):
+        return text.split()
+
+
+def test_pool_counts_queue_depth_and_failures():
+    executor = InstrumentedExecutor("test", 1)
+    release = threading.Event()
+
+    def fail():
+        raise ValueError("échec")
+
+    async def scenario():
+        blocked = asyncio.ensure_future(executor.run(release.wait))
+        queued = asyncio.ensure_future(executor.run(sum, [1, 2, 3]))
+        await asyncio.sleep(0.05)
+        stats = executor.get_stats()
+        assert (stats["active"], stats["queued"], stats["saturated"]) == (1, 1, True)
+
+        release.set()
+        assert await queued == 6
+        await blocked
+        with pytest.raises(ValueError):
+            await executor.run(fail)
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    stats = executor.get_stats()
+    assert (stats["submitted"], stats["completed"], stats["failed"]) == (3, 3, 1)
+    assert stats["peak_queued"] >= 1 and stats["queued"] == 0
+
+
+def test_parse_and_split_run_synchronously_in_the_pool(monkeypatch):
+    monkeypatch.setattr(text_splitter.tiktoken, "encoding_for_model", lambda model: _WordTokenizer())
+    parser = MarkdownParser()
+    splitter = text_splitter.TextSplitter(max_chunk_size=120, min_chunk_size=10)
+    executor = InstrumentedExecutor("parse", 2)
+
+    def parse_and_split():
+        # Aucune boucle d'événements dans le thread du pool
+        with pytest.raises(RuntimeError):
+            asyncio.get_running_loop()
+        return splitter.split(parser.parse(DOCUMENT, "livre_1.md"))
+
+    try:
+        chunks = asyncio.run(executor.run(parse_and_split))
+    finally:
+        executor.shutdown()
+
+    assert chunks
+    text = " ".join(chunk["text"] for chunk in chunks)
+    assert "Article 1er" in text and "30 %" in text
+    assert chunks == asyncio.run(splitter.split_document(asyncio.run(parser.parse_document(DOCUMENT, "livre_1.md"))))
@@ -0,0 +1,63 @@
+# ==============================================================================
+# FILE: tests/test_hnsw_index.py - Graphe HNSW : rappel, insertions et persistance
+# ==============================================================================
+
+import asyncio
+
+import numpy as np
+
+from app.database.hnsw_index import HNSWIndex
+from app.database.vector_store import VectorStore
+from app.utils.similarity import normalize_rows
+from tests.conftest import clustered_vectors, make_documents, noisy_queries
+
+ROWS = 600
+
+
+def test_search_only_visits_rows_of_the_view():
+    vectors = normalize_rows(clustered_vectors(300)).astype(np.float32)
+    index = HNSWIndex(m=8, ef_construction=50)
+    index.add(vectors, 300)
+    assert index.count == 300 and index.is_built
+
+    # Vue antérieure aux 100 dernières insertions
+    found = index.search(vectors[250], vectors[:200], k=5)
+    assert found.size >= 5 and found.max() < 200
+    assert index.search(vectors[42], vectors, k=1, ef=32)[0] == 42
+
+
+def test_hnsw_recall_and_reopen(store_options):
+    vectors = clustered_vectors(ROWS)
+
+    async def scenario():
+        store = VectorStore(**store_options, index_backend="hnsw", hnsw_ef_search=64)
+        await store.initialize()
+        ids = await store.add_documents(make_documents(0, ROWS), vectors.tolist())
+        await store.delete_documents(ids[:50])
+        await store.build_index()  # Base dense : graphe renuméroté sans les lignes supprimées
+        store._log.close()
+
+        reopened = VectorStore(**store_options, index_backend="hnsw", hnsw_ef_search=64)
+        await reopened.initialize()
+        return reopened
+
+    store = asyncio.run(scenario())
+    assert store._view.hnsw.count == store._view.count == ROWS - 50
+    report = store.evaluate_ann_recall(noisy_queries(vectors[50:]), top_k=10)
+    assert report["results"][0]["recall_at_k"] >= 0.9
+
+
+def test_hnsw_search_sees_rows_added_after_compaction(store_options):
+    vectors = clustered_vectors(300)
+
+    async def scenario():
+        store = VectorStore(**store_options, index_backend="hnsw")
+        await store.initialize()
+        await store.add_documents(make_documents(0, 200), vectors[:200].tolist())
+        await store.build_index()
+        ids = await store.add_documents(make_documents(200, 300), vectors[200:].tolist())
+        assert store._view.hnsw.count == store._view.count == 300
+        results = await store.similarity_search(vectors[250].tolist(), top_k=1)
+        assert results[0]["id"] == ids[50]
+
+    asyncio.run(scenario())
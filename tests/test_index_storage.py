@@ -0,0 +1,81 @@
+# ==============================================================================
+# FILE: tests/test_index_storage.py - Format disque versionné et migration du pickle
+# ==============================================================================
+
+import asyncio
+import os
+import pickle
+
+import numpy as np
+
+from app.database import index_storage
+from app.database.vector_store import VectorStore
+from tests.conftest import make_documents
+
+
+def test_write_index_round_trip_with_memory_mapped_vectors(tmp_path, vectors):
+    directory = str(tmp_path / "base")
+    documents = make_documents(0, 70)  # plus de deux blocs compressés
+    ids = [f"id{i}" for i in range(70)]
+    index_storage.write_index(
+        directory, ids, vectors[:70], (index_storage.encode_document(d) for d in documents),
+        {"name": "test"}, log_sequence=12
+    )
+
+    manifest = index_storage.read_manifest(directory)
+    assert manifest["format_version"] == index_storage.FORMAT_VERSION
+    assert (manifest["count"], manifest["dimension"], manifest["log_sequence"]) == (70, vectors.shape[1], 12)
+    assert manifest["metadata"] == {"name": "test"}
+
+    matrix = index_storage.open_vectors(directory)
+    assert isinstance(matrix, np.memmap) and matrix.dtype == np.float32
+    np.testing.assert_array_equal(matrix, vectors[:70])
+    assert index_storage.open_ids(directory) == ids
+
+    offsets = np.load(os.path.join(directory, index_storage.BLOCK_OFFSETS_FILE))
+    with open(os.path.join(directory, index_storage.BLOCKS_FILE), "rb") as f:
+        data = f.read()
+    block = index_storage.decompress_block(data[offsets[2]:offsets[3]])
+    assert index_storage.decode_document(block[0]) == documents[2 * index_storage.DOCUMENTS_PER_BLOCK]
+
+
+def test_unsupported_manifest_version_is_ignored(tmp_path, vectors):
+    directory = str(tmp_path / "base")
+    index_storage.write_index(directory, ["a"], vectors[:1], [b"{}"], {})
+    manifest_path = os.path.join(directory, index_storage.MANIFEST_FILE)
+    with open(manifest_path, "r", encoding="utf-8") as f:
+        content = f.read().replace('"format_version": 2', '"format_version": 99')
+    with open(manifest_path, "w", encoding="utf-8") as f:
+        f.write(content)
+    assert index_storage.read_manifest(directory) is None
+
+
+def test_pickle_collection_is_migrated(store_options, vectors):
+    persist_directory = store_options["persist_directory"]
+    os.makedirs(persist_directory)
+    documents = {f"doc{i}": {**document, "id": f"doc{i}"} for i, document in enumerate(make_documents(0, 5))}
+    with open(os.path.join(persist_directory, "cgi_documents.pkl"), "wb") as f:
+        pickle.dump({
+            "documents": documents,
+            "embeddings": vectors[:5].tolist(),  # ancien format : liste de listes
+            "document_ids": list(documents),
+            "metadata": {"name": "cgi_documents"}
+        }, f)
+
+    async def scenario():
+        store = VectorStore(**store_options)
+        await store.initialize()
+        assert store.live_count == 5
+        results = await store.similarity_search(vectors[3].tolist(), top_k=1)
+        assert results[0]["id"] == "doc3"
+
+        # Base versionnée écrite : une réouverture ne relit plus le pickle
+        os.remove(os.path.join(persist_directory, "cgi_documents.pkl"))
+        store._log.close()
+        reopened = VectorStore(**store_options)
+        await reopened.initialize()
+        assert reopened.live_count == 5
+        document = await reopened.get_document_by_id("doc1")
+        assert document["content"] == documents["doc1"]["content"]
+
+    asyncio.run(scenario())
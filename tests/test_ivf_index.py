@@ -0,0 +1,53 @@
+# ==============================================================================
+# FILE: tests/test_ivf_index.py - Listes IVF (k-means) et rappel de la recherche approchée
+# ==============================================================================
+
+import asyncio
+
+import numpy as np
+
+from app.database.ivf_index import IVFIndex
+from app.database.vector_store import VectorStore
+from app.utils.similarity import normalize_rows
+from tests.conftest import clustered_vectors, make_documents, noisy_queries
+
+ROWS = 600
+
+
+def test_lists_partition_rows_and_include_added_rows():
+    vectors = normalize_rows(clustered_vectors(ROWS)).astype(np.float32)
+    index = IVFIndex()
+    index.build(vectors[:500], n_lists=16)
+
+    assert index.n_lists == 16
+    assert np.array_equal(np.sort(index.list_rows), np.arange(500))
+    assert np.array_equal(np.sort(index.candidates(vectors[0], nprobe=16)), np.arange(500))
+
+    # Lignes ajoutées après l'entraînement : assignées sans reconstruire les listes
+    index.add(500, vectors[500:])
+    assert np.array_equal(np.sort(index.candidates(vectors[0], nprobe=16)), np.arange(ROWS))
+    assert 550 in index.candidates(vectors[550], nprobe=1)
+
+    # Seules les listes construites sont persistées (les ajouts sont rejoués)
+    restored = IVFIndex()
+    restored.load_arrays(index.to_arrays())
+    np.testing.assert_array_equal(restored.centroids, index.centroids)
+    assert np.array_equal(np.sort(restored.candidates(vectors[0], nprobe=16)), np.arange(500))
+
+
+def test_ivf_recall_grows_with_nprobe(store_options):
+    vectors = clustered_vectors(ROWS)
+
+    async def scenario():
+        store = VectorStore(**store_options, index_backend="ivf", ivf_lists=16, ivf_nprobe=6)
+        await store.initialize()
+        await store.add_documents(make_documents(0, ROWS), vectors.tolist())
+        await store.build_index()  # Base dense : centroïdes entraînés
+        return store
+
+    store = asyncio.run(scenario())
+    assert store._view.ivf.n_lists == 16
+    report = store.evaluate_ann_recall(noisy_queries(vectors), top_k=10, nprobe_values=[6, 16])
+    recalls = [result["recall_at_k"] for result in report["results"]]
+    assert recalls[0] >= 0.9
+    assert recalls[1] == 1.0
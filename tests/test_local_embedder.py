@@ -0,0 +1,63 @@
+# ==============================================================================
+# FILE: tests/test_local_embedder.py - Embedder local déterministe (hashing TF-IDF + SVD)
+# ==============================================================================
+
+import asyncio
+
+import numpy as np
+
+from app.services.embedding_service import EMBEDDING_DIMENSION, PROVIDER_LOCAL, EmbeddingService
+from app.services.local_embedder import LocalEmbedder
+
+CORPUS = [
+    "La taxe sur la valeur ajoutée s'applique aux livraisons de biens.",
+    "Le taux de la TVA est fixé à 18 % du prix hors taxe.",
+    "L'impôt sur les sociétés est dû par les personnes morales.",
+    "Le taux de l'impôt sur les sociétés est de 30 % du bénéfice.",
+    "Les impôts fonciers sont dus par les propriétaires d'immeubles.",
+    "La contribution foncière des propriétés bâties est annuelle.",
+    "Les petites entreprises acquittent la taxe professionnelle synthétique.",
+    "Les pénalités de retard s'appliquent aux déclarations tardives.",
+]
+
+
+def test_unfitted_embeddings_are_deterministic_and_normalized():
+    embedder = LocalEmbedder(64)
+    first = embedder.embed(CORPUS)
+    assert first.shape == (len(CORPUS), 64) and first.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(first, axis=1), 1.0, rtol=1e-5)
+    np.testing.assert_array_equal(first, LocalEmbedder(64).embed(CORPUS))
+    # Accents et casse ignorés
+    np.testing.assert_array_equal(embedder.embed(["Impôt FONCIER"]), embedder.embed(["impot foncier"]))
+    assert embedder.fingerprint == "hashing-64"
+
+
+def test_fitted_model_ranks_related_texts_and_round_trips(tmp_path):
+    embedder = LocalEmbedder(6, n_features=2 ** 12).fit(CORPUS)
+    assert embedder.is_fitted and embedder.fingerprint.startswith("lsa-6-")
+    assert embedder.fingerprint == LocalEmbedder(6, n_features=2 ** 12).fit(CORPUS).fingerprint
+
+    vectors = embedder.embed(CORPUS)
+    query = embedder.embed(["taux de l'impôt sur les sociétés"])[0]
+    assert int(np.argmax(vectors @ query)) in (2, 3)
+    # Dimension demandée plus grande : complétée par des zéros
+    assert embedder.embed(CORPUS[:1], dimension=10)[0, 6:].tolist() == [0.0] * 4
+
+    embedder.save(str(tmp_path))
+    loaded = LocalEmbedder.load(str(tmp_path), 6)
+    assert loaded.fingerprint == embedder.fingerprint
+    np.testing.assert_allclose(loaded.embed(CORPUS), vectors, rtol=1e-6)
+    assert not LocalEmbedder.load(str(tmp_path / "absent"), 6).is_fitted
+
+
+def test_service_fallback_uses_the_local_embedder(embedding_api):
+    service = EmbeddingService("test", micro_batch_window_ms=0, local_embedder=LocalEmbedder(16))
+    embedding_api.fail_on = CORPUS[0]
+
+    async def scenario():
+        return [await service.get_embeddings_with_providers(CORPUS[:1]) for _ in range(2)]
+
+    (first, providers), (second, _) = asyncio.run(scenario())
+    assert providers == [PROVIDER_LOCAL]
+    # Vecteur reproductible (plus de vecteur aléatoire de fallback)
+    assert first == second == LocalEmbedder(16).embed(CORPUS[:1], EMBEDDING_DIMENSION).tolist()
@@ -0,0 +1,58 @@
+# ==============================================================================
+# FILE: tests/test_metadata_filters.py - Colonnes de métadonnées et filtres compilés
+# ==============================================================================
+
+import asyncio
+
+from app.database.vector_store import VectorStore
+from tests.conftest import make_documents
+
+DOCUMENTS = make_documents(0, 80)
+
+
+async def _filled_store(options, vectors):
+    store = VectorStore(**options)
+    await store.initialize()
+    ids = await store.add_documents(DOCUMENTS, vectors[:80].tolist())
+    return store, ids
+
+
+def _search_ids(store, query, filter_criteria):
+    return [result["id"] for result in asyncio.run(store.similarity_search(query, 80, filter_criteria))]
+
+
+def test_filters_on_metadata_columns(store_options, vectors):
+    store, ids = asyncio.run(_filled_store(store_options, vectors))
+
+    def expected(predicate):
+        return {doc_id for doc_id, document in zip(ids, DOCUMENTS) if predicate(document["metadata"], document)}
+
+    def found(criteria):
+        return set(_search_ids(store, vectors[0].tolist(), criteria))
+
+    assert found({"impot_type": "TVA"}) == expected(lambda m, d: "TVA" in m["impot_types"])
+    assert found({"impot_type": "tva", "regime": "REEL"}) == expected(
+        lambda m, d: "TVA" in m["impot_types"] and m["regime"] == "REEL"
+    )
+    assert found({"update_year": {"$gte": 2020, "$lte": 2022}}) == expected(
+        lambda m, d: 2020 <= int(m["update_date"][:4]) <= 2022
+    )
+    assert found({"$or": [{"regime": "SIMPLIFIE"}, {"source_file": "livre_1.md"}]}) == expected(
+        lambda m, d: m["regime"] == "SIMPLIFIE" or d["source_file"] == "livre_1.md"
+    )
+    assert found({"$not": {"impot_type": "IS"}}) == expected(lambda m, d: "IS" not in m["impot_types"])
+    assert found({"regime": {"$in": ["SIMPLIFIE", "INCONNU"]}}) == expected(lambda m, d: m["regime"] == "SIMPLIFIE")
+    # Clé sans colonne : évaluée ligne par ligne sur les métadonnées
+    assert found({"update_date": "2019-01-01"}) == expected(lambda m, d: m["update_date"] == "2019-01-01")
+    assert found({"regime": "INCONNU"}) == set()
+
+
+def test_filter_and_tombstones_combine(store_options, vectors):
+    store, ids = asyncio.run(_filled_store(store_options, vectors))
+    tva_ids = _search_ids(store, vectors[1].tolist(), {"impot_type": "TVA"})
+    asyncio.run(store.delete_documents(tva_ids[:5]))
+
+    remaining = _search_ids(store, vectors[1].tolist(), {"impot_type": "TVA"})
+    assert set(remaining) == set(tva_ids[5:])
+    fetched = asyncio.run(store.get_documents(tva_ids + [ids[0]], filter_criteria={"impot_type": "TVA"}))
+    assert [result["id"] for result in fetched] == tva_ids[5:]
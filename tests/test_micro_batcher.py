@@ -0,0 +1,76 @@
+# ==============================================================================
+# FILE: tests/test_micro_batcher.py - Regroupement des questions concurrentes
+# ==============================================================================
+
+import asyncio
+
+import pytest
+
+from app.services.embedding_service import PROVIDER_GOOGLE, EmbeddingService
+from app.utils.micro_batcher import MicroBatcher
+from tests.conftest import fake_vector
+
+
+class _Recorder:
+    """Appel groupé qui enregistre les lots reçus"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        if "erreur" in items:
+            raise ValueError("lot en échec")
+        return [item.upper() for item in items]
+
+
+def test_flush_on_size_then_on_timeout():
+    process = _Recorder()
+    batcher = MicroBatcher("test", process, max_batch_size=4, max_delay_ms=30)
+
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        started_at = loop.time()
+        # Quatre éléments : lot plein envoyé sans attendre la fenêtre
+        full = await asyncio.gather(*(batcher.submit(f"q{i}") for i in range(4)))
+        size_flush = loop.time() - started_at
+
+        started_at = loop.time()
+        partial = await asyncio.gather(*(batcher.submit(f"r{i}") for i in range(2)))
+        return full, size_flush, partial, loop.time() - started_at
+
+    full, size_flush, partial, timeout_flush = asyncio.run(scenario())
+    assert full == ["Q0", "Q1", "Q2", "Q3"] and partial == ["R0", "R1"]
+    assert process.batches == [["q0", "q1", "q2", "q3"], ["r0", "r1"]]
+    assert size_flush < 0.025 <= timeout_flush
+
+    stats = batcher.get_stats()
+    assert (stats["batches"], stats["pending"], stats["batch_size"]["count"]) == (2, 0, 2)
+
+
+def test_batch_failure_reaches_every_waiter_and_window_zero_disables_batching():
+    process = _Recorder()
+    batcher = MicroBatcher("test", process, max_batch_size=8, max_delay_ms=5)
+
+    async def scenario():
+        results = await asyncio.gather(batcher.submit("a"), batcher.submit("erreur"), return_exceptions=True)
+        assert all(isinstance(result, ValueError) for result in results)
+
+        direct = MicroBatcher("direct", process, max_delay_ms=0)
+        return await asyncio.gather(direct.submit("b"), direct.submit("c"))
+
+    assert asyncio.run(scenario()) == ["B", "C"]
+    assert process.batches == [["a", "erreur"], ["b"], ["c"]]
+
+
+@pytest.mark.parametrize("window_ms, expected_calls", [(20, 1), (0, 3)])
+def test_concurrent_questions_share_one_embedding_call(embedding_api, window_ms, expected_calls):
+    service = EmbeddingService("test", query_cache_bytes=0, micro_batch_window_ms=window_ms)
+    questions = ["Taux de la TVA ?", "Qui paie l'IS ?", "Article 45 bis ?"]
+
+    async def scenario():
+        return await asyncio.gather(*(service.get_embedding_with_provider(question) for question in questions))
+
+    results = asyncio.run(scenario())
+    assert results == [(fake_vector(question), PROVIDER_GOOGLE) for question in questions]
+    assert len(embedding_api.calls) == expected_calls
@@ -0,0 +1,48 @@
+# ==============================================================================
+# FILE: tests/test_prefix_search.py - Recherche en deux passes sur préfixe (Matryoshka)
+# ==============================================================================
+
+import asyncio
+
+import numpy as np
+
+from app.database.vector_store import VectorStore
+from tests.conftest import clustered_vectors, make_documents, noisy_queries
+
+ROWS = 600
+
+
+async def _prefix_store(options, vectors, **extra) -> VectorStore:
+    store = VectorStore(**options, prefix_dimension=32, **extra)
+    await store.initialize()
+    await store.add_documents(make_documents(0, ROWS), vectors.tolist())
+    return store
+
+
+def test_prefix_recall_after_rescoring(store_options):
+    vectors = clustered_vectors(ROWS)
+    store = asyncio.run(_prefix_store(store_options, vectors, rescore_factor=8))
+    report = store.evaluate_ann_recall(noisy_queries(vectors), top_k=10, rescore_factor_values=[1, 8])
+
+    recalls = {result["rescore_factor"]: result["recall_at_k"] for result in report["results"]}
+    assert report["prefix_dimension"] == 32
+    assert recalls[8] >= 0.9
+    assert recalls[8] >= recalls[1]
+
+
+def test_rescored_similarities_use_full_vectors(store_options):
+    vectors = clustered_vectors(ROWS)
+
+    async def scenario():
+        store = await _prefix_store(store_options, vectors)
+        await store.build_index()  # Préfixes reconstruits depuis la base mappée
+        assert store._view.prefix.count == ROWS
+
+        query = noisy_queries(vectors, 1)[0]
+        results = await store.similarity_search(query.tolist(), top_k=5)
+        normalized = query / np.linalg.norm(query)
+        for result in results:
+            row = store._row_index[result["id"]]
+            assert np.isclose(result["similarity_score"], float(store.embeddings[row] @ normalized), atol=1e-5)
+
+    asyncio.run(scenario())
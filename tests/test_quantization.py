@@ -0,0 +1,59 @@
+# ==============================================================================
+# FILE: tests/test_quantization.py - Codes int8 : erreur de reconstruction et rappel
+# ==============================================================================
+
+import asyncio
+
+import numpy as np
+
+from app.database.quantization import ScalarQuantizer
+from app.database.vector_store import VectorStore
+from app.utils.similarity import normalize_rows
+from tests.conftest import clustered_vectors, make_documents, noisy_queries
+
+ROWS = 600
+
+
+def test_reconstruction_error_is_bounded_by_half_a_level():
+    vectors = normalize_rows(clustered_vectors(ROWS)).astype(np.float32)
+    quantizer = ScalarQuantizer()
+    quantizer.train(vectors[:500])
+
+    assert quantizer.codes.dtype == np.int8 and quantizer.count == 500
+    difference = np.abs(quantizer.decode(quantizer.codes[:500]) - vectors[:500])
+    assert np.all(difference <= quantizer.scale / 2 + 1e-6)
+    assert quantizer.error["max_abs_error"] <= float(quantizer.scale.max()) / 2 + 1e-6
+
+    # Score approché sur les codes ≈ produit scalaire exact
+    query = vectors[510]
+    np.testing.assert_allclose(quantizer.score(query), vectors[:500] @ query, atol=0.02)
+
+    # Lignes ajoutées avec les paramètres existants (valeurs hors intervalle saturées)
+    quantizer.add(500, vectors[500:] * 10)
+    assert quantizer.count == ROWS
+    assert quantizer.codes[500:].min() == -128 and quantizer.codes[500:].max() == 127
+
+    restored = ScalarQuantizer()
+    restored.load_arrays(quantizer.to_arrays())
+    np.testing.assert_array_equal(restored.score(query), quantizer.score(query))
+    assert restored.error == quantizer.error
+
+
+def test_int8_search_recall_against_exact(store_options):
+    vectors = clustered_vectors(ROWS)
+
+    async def scenario():
+        store = VectorStore(**store_options, quantization="int8", rescore_factor=4)
+        await store.initialize()
+        await store.add_documents(make_documents(0, ROWS), vectors.tolist())
+        await store.build_index()  # Base dense : codes int8 calculés
+        return store, await store.get_stats()
+
+    store, stats = asyncio.run(scenario())
+    assert stats["quantization"]["encoded_rows"] == ROWS
+    assert stats["quantization"]["compression_ratio"] == 4.0
+
+    report = store.evaluate_ann_recall(noisy_queries(vectors), top_k=10, rescore_factor_values=[1, 4])
+    recalls = [result["recall_at_k"] for result in report["results"]]
+    assert recalls[1] >= 0.95
+    assert recalls[1] >= recalls[0]
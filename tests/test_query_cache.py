@@ -0,0 +1,71 @@
+# ==============================================================================
+# FILE: tests/test_query_cache.py - Cache mémoire des embeddings de questions (LRU + TTL)
+# ==============================================================================
+
+import asyncio
+import time
+
+from app.services.embedding_service import PROVIDER_GOOGLE, PROVIDER_LOCAL, EmbeddingService
+from app.utils import lru_cache
+from app.utils.lru_cache import LRUCache
+from tests.conftest import fake_vector
+
+
+def _clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(lru_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_entries_expire_after_ttl(monkeypatch):
+    now = _clock(monkeypatch)
+    cache = LRUCache(100, ttl_seconds=60)
+    cache.put("tva", "taux", 10)
+
+    now[0] += 59
+    assert cache.get("tva") == "taux"
+    now[0] += 2
+    assert cache.get("tva") is None
+    assert (cache.hits, cache.misses, cache.expirations, cache.resident_bytes) == (1, 1, 1, 0)
+
+    # Réécrire une entrée repousse son expiration
+    cache.put("is", 1, 10)
+    now[0] += 50
+    cache.put("is", 2, 10)
+    now[0] += 50
+    assert cache.get("is") == 2
+
+
+def test_repeated_questions_skip_the_api_until_expiry(embedding_api):
+    service = EmbeddingService("test", query_cache_ttl=0.5, micro_batch_window_ms=0)
+
+    async def scenario():
+        first = await service.get_embedding_with_provider("Quel est le taux de la TVA ?")
+        # Casse, espaces et accents ignorés
+        again = await service.get_embedding_with_provider("  quel est le TAUX de la tva ?")
+        return first, again
+
+    first, again = asyncio.run(scenario())
+    assert first == again == (fake_vector("Quel est le taux de la TVA ?"), PROVIDER_GOOGLE)
+    assert len(embedding_api.calls) == 1
+
+    # Autre dimension : autre clé
+    asyncio.run(service.get_embedding("Quel est le taux de la TVA ?", output_dimensionality=256))
+    assert len(embedding_api.calls) == 2
+
+    time.sleep(0.6)
+    asyncio.run(service.get_embedding("Quel est le taux de la TVA ?"))
+    assert len(embedding_api.calls) == 3
+    assert service.query_cache.expirations == 1
+
+
+def test_fallback_embeddings_are_not_cached(embedding_api):
+    service = EmbeddingService("test", micro_batch_window_ms=0)
+    embedding_api.fail_on = "Article 12 ?"
+
+    _, provider = asyncio.run(service.get_embedding_with_provider("Article 12 ?"))
+    assert provider == PROVIDER_LOCAL and len(service.query_cache) == 0
+
+    embedding_api.fail_on = None
+    _, provider = asyncio.run(service.get_embedding_with_provider("Article 12 ?"))
+    assert provider == PROVIDER_GOOGLE and len(service.query_cache) == 1
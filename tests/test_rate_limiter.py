@@ -0,0 +1,74 @@
+# ==============================================================================
+# FILE: tests/test_rate_limiter.py - Seaux de jetons et limitation des appels d'embedding
+# ==============================================================================
+
+import asyncio
+import time
+
+from app.services import embedding_service
+from app.services.embedding_service import PROVIDER_GOOGLE, EmbeddingService
+from app.utils import rate_limiter
+from app.utils.rate_limiter import AsyncRateLimiter, TokenBucket
+from tests.conftest import fake_vector
+
+
+def test_token_bucket_accounting(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(rate_limiter.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(600)  # 10 jetons par seconde
+
+    assert bucket.reserve(600) == 0.0
+    assert bucket.reserve(5) == 0.5
+    # Réservations successives : servies dans l'ordre d'arrivée
+    assert bucket.reserve(10) == 1.5
+
+    now[0] += 1.5
+    assert bucket.reserve(1) == 0.1
+    # Une demande plus grande que le seau attend au plus le temps de le remplir
+    now[0] += 100
+    assert bucket.reserve(5000) == 0.0
+
+    bucket.pause(3)
+    assert bucket.reserve(0) == 3.0
+
+
+def test_limiter_bounds_in_flight_calls_and_waits_for_quota():
+    limiter = AsyncRateLimiter("test", requests_per_minute=6000, tokens_per_minute=60000, max_in_flight=2)
+
+    async def call(requests, tokens):
+        async with limiter.limit(requests=requests, tokens=tokens):
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        await asyncio.gather(*(call(1, 10) for _ in range(6)))
+        assert limiter.delayed == 0
+        # Seau de tokens (1000 tokens/s) vidé par un gros appel : chacun attend sa part
+        started_at = time.monotonic()
+        await call(1, 60000)
+        await call(1, 100)
+        return time.monotonic() - started_at
+
+    elapsed = asyncio.run(scenario())
+    stats = limiter.get_stats()
+    assert elapsed >= 0.1
+    assert (stats["acquired"], stats["delayed"], stats["peak_in_flight"], stats["in_flight"]) == (8, 2, 2, 0)
+
+
+def test_quota_error_pauses_and_retries_instead_of_falling_back(embedding_api, monkeypatch):
+    monkeypatch.setattr(embedding_service, "DEFAULT_RETRY_DELAY", 0.05)
+    failures = [RuntimeError("429 Resource has been exhausted (e.g. check quota).")]
+
+    def embed_content(model, content, **options):
+        if failures:
+            raise failures.pop()
+        return embedding_api(model, content, **options)
+
+    monkeypatch.setattr(embedding_service.genai, "embed_content", embed_content)
+    service = EmbeddingService("test", micro_batch_window_ms=0)
+    embeddings, providers = asyncio.run(service.get_embeddings_with_providers(["Article 1er", "Article 2"]))
+
+    assert providers == [PROVIDER_GOOGLE, PROVIDER_GOOGLE]
+    assert embeddings == [fake_vector("Article 1er"), fake_vector("Article 2")]
+    assert service.fallback_texts == 0
+    stats = service.rate_limiter.get_stats()
+    assert (stats["throttled"], stats["acquired"]) == (1, 2)
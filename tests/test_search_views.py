@@ -0,0 +1,65 @@
+# ==============================================================================
+# FILE: tests/test_search_views.py - Vues copy-on-write lues sans verrou par les recherches
+# ==============================================================================
+
+import asyncio
+
+from app.database.vector_store import VectorStore
+from app.utils.executors import InstrumentedExecutor
+from tests.conftest import make_documents
+
+
+def _ids(results):
+    return [result["id"] for result in results]
+
+
+def test_published_view_is_unchanged_by_later_mutations(store_options, vectors):
+    async def scenario():
+        store = VectorStore(**{**store_options, "tombstone_compaction_ratio": 0.1})
+        await store.initialize()
+        ids = await store.add_documents(make_documents(0, 60), vectors[:60].tolist())
+        view = store._view
+        query = vectors[5].tolist()
+        before = store._search(view, query, 10, {"impot_type": "IS"})
+
+        # Ajouts (avec croissance de la matrice), suppressions, mise à jour, compaction
+        await store.add_documents(make_documents(60, 300), vectors[60:300].tolist())
+        await store.delete_documents(ids[:30])
+        await store.delete_by_source_file("livre_0.md")
+        await store._wait_for_compaction()
+        assert store._count < 300 and store._view is not view
+
+        assert store._search(view, query, 10, {"impot_type": "IS"}) == before
+        assert view.live_count == 60 and view.document(0)["id"] == ids[0]
+        assert ids[4] in _ids(before)
+        assert ids[4] not in _ids(await store.similarity_search(query, 10, {"impot_type": "IS"}))
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_searches_during_writes_stay_consistent(store_options, vectors):
+    executor = InstrumentedExecutor("search", 4)
+
+    async def scenario():
+        store = VectorStore(**store_options, search_executor=executor)
+        await store.initialize()
+        ids = await store.add_documents(make_documents(0, 100), vectors[:100].tolist())
+
+        async def write():
+            for start in range(100, 300, 20):
+                await store.add_documents(make_documents(start, start + 20), vectors[start:start + 20].tolist())
+                await store.delete_documents(ids[start // 10:start // 10 + 2])
+                await asyncio.sleep(0)
+
+        searches = [store.similarity_search(vectors[i].tolist(), 8) for i in range(300, 360)]
+        results = await asyncio.gather(write(), *searches)
+        for hits in results[1:]:
+            assert len(hits) == 8 and len(set(_ids(hits))) == 8
+            scores = [hit["similarity_score"] for hit in hits]
+            assert scores == sorted(scores, reverse=True)
+        assert store.live_count == 300 - 20
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        executor.shutdown()
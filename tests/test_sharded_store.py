@@ -0,0 +1,71 @@
+# ==============================================================================
+# FILE: tests/test_sharded_store.py - Vector store partitionné (scatter-gather)
+# ==============================================================================
+
+import asyncio
+
+from app.database.sharded_store import ShardedVectorStore
+from tests.conftest import make_documents
+
+
+async def _sharded_store(tmp_path, **options) -> ShardedVectorStore:
+    store = ShardedVectorStore(persist_directory=str(tmp_path / "sharded"),
+                               log_compaction_min_records=10 ** 9, **options)
+    await store.initialize()
+    return store
+
+
+def test_routes_filters_and_keeps_fetch_order(tmp_path, vectors):
+    async def scenario():
+        store = await _sharded_store(tmp_path, shard_by="source_file", shard_count=2)
+        documents = make_documents(0, 40)
+        ids = await store.add_documents(documents, vectors[:40].tolist())
+        assert len(store.shards) == 2
+
+        results = await store.similarity_search(vectors[5].tolist(), top_k=1)
+        assert results[0]["id"] == ids[5]
+        filtered = await store.similarity_search(vectors[5].tolist(), top_k=40,
+                                                 filter_criteria={"source_file": "livre_2.md"})
+        assert {result["id"] for result in filtered} == {
+            doc_id for doc_id, document in zip(ids, documents) if document["source_file"] == "livre_2.md"
+        }
+        requested = [ids[3], ids[0], ids[2], ids[1]]
+        assert [result["id"] for result in await store.get_documents(requested)] == requested
+
+    asyncio.run(scenario())
+
+
+def test_year_pruning_counts_only_similarity_searches(tmp_path, vectors):
+    async def scenario():
+        store = await _sharded_store(tmp_path, shard_by="update_year")
+        ids = await store.add_documents(make_documents(0, 16), vectors[:16].tolist())
+        assert len(store.shards) == 8
+
+        results = await store.similarity_search(vectors[0].tolist(), top_k=16,
+                                                filter_criteria={"update_year": {"$gte": 2024}})
+        assert {result["metadata"]["update_date"][:4] for result in results} == {"2024", "2025"}
+        await store.get_documents(ids[:4])
+        await store.get_documents(ids[:4], filter_criteria={"update_year": 2019})
+
+        sharding = (await store.get_stats())["sharding"]
+        assert (sharding["searches"], sharding["shards_searched"], sharding["shards_pruned"]) == (1, 2, 6)
+
+    asyncio.run(scenario())
+
+
+def test_same_content_in_two_shards_is_returned_once(tmp_path, vectors):
+    async def scenario():
+        store = await _sharded_store(tmp_path, shard_by="update_year")
+        original = make_documents(0, 1)[0]
+        copy = {**original, "source_file": "copie.md", "metadata": {**original["metadata"], "update_date": "2025-01-01"}}
+        ids = await store.add_documents([original, copy], [vectors[0].tolist(), (vectors[0] * 0.99).tolist()])
+        await store.add_documents(make_documents(1, 10), vectors[1:10].tolist())
+        assert ids[0] != ids[1] and len(store.shards) > 1
+
+        found = [result["id"] for result in await store.similarity_search(vectors[0].tolist(), top_k=3)]
+        assert len(found) == 3
+        assert found[0] == ids[0] and ids[1] not in found
+        batch = await store.similarity_search_batch([vectors[0].tolist()], top_k=3)
+        assert [result["id"] for result in batch[0]] == found
+
+    asyncio.run(scenario())
@@ -0,0 +1,59 @@
+# ==============================================================================
+# FILE: tests/test_similarity_kernel.py - Noyau de similarité cosinus en bloc
+# ==============================================================================
+
+import numpy as np
+
+from app.services.embedding_service import EmbeddingService
+from app.utils.similarity import (
+    cosine_scores, normalize_rows, pairwise_cosine, row_norms, top_k_indices, top_k_indices_batch, top_k_similar
+)
+
+
+def _reference(query, candidates):
+    """Similarités cosinus calculées une par une (implémentation naïve)"""
+    return np.array([
+        float(np.dot(query, candidate) / (np.linalg.norm(query) * np.linalg.norm(candidate)))
+        if np.linalg.norm(candidate) else 0.0
+        for candidate in candidates
+    ])
+
+
+def test_scores_match_the_naive_loop(vectors):
+    query, candidates = vectors[0], vectors[1:200].copy()
+    candidates[5] = 0.0  # vecteur nul : similarité 0 au lieu d'une division par zéro
+    expected = _reference(query, candidates)
+
+    np.testing.assert_allclose(cosine_scores(query, candidates), expected, atol=1e-5)
+    np.testing.assert_allclose(cosine_scores(query, candidates, row_norms(candidates)), expected, atol=1e-5)
+    np.testing.assert_allclose(cosine_scores(query.tolist(), normalize_rows(candidates), normalized=True),
+                               expected, atol=1e-5)
+    np.testing.assert_allclose(pairwise_cosine(vectors[:3], candidates)[0], expected, atol=1e-5)
+    assert cosine_scores(query, np.zeros((0, query.size))).size == 0
+
+
+def test_top_k_selection_is_sorted_and_matches_a_full_sort(vectors):
+    scores = vectors[:, 0].copy()
+    assert top_k_indices(scores, 10).tolist() == np.argsort(-scores)[:10].tolist()
+    assert top_k_indices(scores, 1000).tolist() == np.argsort(-scores, kind="stable").tolist()
+    assert top_k_indices(scores, 0).size == 0
+
+    matrix = vectors[:5, :20]
+    selected = top_k_indices_batch(matrix, 4)
+    assert selected.tolist() == [np.argsort(-row)[:4].tolist() for row in matrix]
+
+    indices, similarities = top_k_similar(vectors[7], vectors[:100], 3)
+    assert indices[0] == 7 and abs(similarities[0] - 1.0) < 1e-5
+    assert list(similarities) == sorted(similarities, reverse=True)
+
+
+def test_find_most_similar_accepts_lists_and_matrices(vectors, embedding_api):
+    service = EmbeddingService("test")
+    candidates = vectors[:50]
+    expected = np.argsort(-_reference(vectors[60], candidates))[:5].tolist()
+
+    from_list = service.find_most_similar(vectors[60].tolist(), candidates.tolist(), top_k=5)
+    from_matrix = service.find_most_similar(vectors[60], normalize_rows(candidates), top_k=5, normalized=True)
+    assert [i for i, _ in from_list] == [i for i, _ in from_matrix] == expected
+    assert service.compute_similarity([1.0, 0.0], [0.0, 2.0]) == 0.0
+    assert service.find_most_similar(vectors[0].tolist(), [], top_k=3) == []
@@ -0,0 +1,57 @@
+# ==============================================================================
+# FILE: tests/test_similarity_search_batch.py - Recherche groupée de plusieurs requêtes
+# ==============================================================================
+
+import asyncio
+
+import pytest
+
+from app.database import vector_store
+from app.database.vector_store import VectorStore
+from tests.conftest import make_documents
+
+FILTERS = [None, {"impot_type": "TVA"}, {"regime": "SIMPLIFIE"}, None, {"impot_type": "TVA"}]
+
+
+def _ids(results):
+    return [[result["id"] for result in hits] for hits in results]
+
+
+@pytest.mark.parametrize("options", [{}, {"quantization": "int8"}])
+def test_batch_matches_per_query_results(store_options, vectors, monkeypatch, options):
+    # Blocs de requêtes minuscules : le découpage du produit matrice-matrice est exercé
+    monkeypatch.setattr(vector_store, "BATCH_SCORE_ELEMENTS", 300)
+
+    async def scenario():
+        store = VectorStore(**store_options, **options)
+        await store.initialize()
+        await store.add_documents(make_documents(0, 150), vectors[:150].tolist())
+        await store.build_index()
+        queries = vectors[200:205]
+
+        single = [await store.similarity_search(query.tolist(), 6) for query in queries]
+        assert _ids(await store.similarity_search_batch(queries, 6)) == _ids(single)
+
+        # Critères par requête : un masque par jeu de critères distinct
+        filtered = [await store.similarity_search(query.tolist(), 6, criteria)
+                    for query, criteria in zip(queries, FILTERS)]
+        batch = await store.similarity_search_batch(queries.tolist(), 6, FILTERS)
+        assert _ids(batch) == _ids(filtered)
+        for hits, expected in zip(batch, filtered):
+            assert [hit["similarity_score"] for hit in hits] == pytest.approx(
+                [hit["similarity_score"] for hit in expected], abs=1e-5
+            )
+
+    asyncio.run(scenario())
+
+
+def test_batch_of_one_vector_and_empty_store(store_options, vectors):
+    async def scenario():
+        store = VectorStore(**store_options)
+        await store.initialize()
+        assert await store.similarity_search_batch(vectors[:3], 4) == [[], [], []]
+        ids = await store.add_documents(make_documents(0, 10), vectors[:10].tolist())
+        results = await store.similarity_search_batch(vectors[4], 1)
+        assert _ids(results) == [[ids[4]]]
+
+    asyncio.run(scenario())
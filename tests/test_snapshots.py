@@ -0,0 +1,55 @@
+# ==============================================================================
+# FILE: tests/test_snapshots.py - Snapshots versionnés, bascule et retour arrière
+# ==============================================================================
+
+import asyncio
+
+from app.database import index_storage
+from app.database.vector_store import VectorStore
+from tests.conftest import make_documents
+
+
+def test_reindex_in_new_snapshot_then_activate_and_roll_back(store_options, vectors):
+    async def scenario():
+        active = VectorStore(**store_options)
+        await active.initialize()
+        await active.add_documents(make_documents(0, 10), vectors[:10].tolist())
+        first_version = active.snapshot_version
+
+        # Réindexation à côté du snapshot actif, qui continue de servir
+        candidate = await active.create_snapshot()
+        await candidate.add_documents(make_documents(100, 130), vectors[100:130].tolist())
+        await candidate.build_index()
+        assert active.is_current()
+        assert active.live_count == 10
+
+        await candidate.activate()
+        assert not active.is_current()
+        follower = await active.open_active_snapshot()
+        assert follower.snapshot_version == candidate.snapshot_version
+        assert follower.live_count == 30
+        summaries = {summary["version"]: summary for summary in follower.list_snapshots()}
+        assert summaries[candidate.snapshot_version]["active"]
+        assert summaries[candidate.snapshot_version]["count"] == 30
+
+        # Retour arrière : le snapshot précédent est conservé et réactivable
+        previous = await follower.open_snapshot(first_version)
+        await previous.activate()
+        assert index_storage.read_current(active._collection_root) == first_version
+        restored = await active.open_active_snapshot()
+        assert restored.live_count == 10
+
+    asyncio.run(scenario())
+
+
+def test_discarded_snapshot_is_removed(store_options, vectors):
+    async def scenario():
+        active = VectorStore(**store_options)
+        await active.initialize()
+        candidate = await active.create_snapshot()
+        await candidate.add_documents(make_documents(0, 5), vectors[:5].tolist())
+        await candidate.discard()
+        assert candidate.snapshot_version not in index_storage.list_snapshots(active._collection_root)
+        assert active.is_current()
+
+    asyncio.run(scenario())
@@ -0,0 +1,50 @@
+# ==============================================================================
+# FILE: tests/test_tombstones.py - Suppressions en O(1) et compaction des lignes supprimées
+# ==============================================================================
+
+import asyncio
+
+from app.database.vector_store import VectorStore
+from tests.conftest import make_documents
+
+
+def test_deleted_rows_are_excluded_everywhere(store_options, vectors):
+    async def scenario():
+        store = VectorStore(**store_options)
+        await store.initialize()
+        ids = await store.add_documents(make_documents(0, 80), vectors[:80].tolist())
+        await store.delete_documents([ids[7], ids[8]])
+
+        results = await store.similarity_search(vectors[7].tolist(), top_k=80)
+        assert ids[7] not in {result["id"] for result in results}
+        assert len(results) == 78
+        assert [result["id"] for result in await store.get_documents([ids[7], ids[9]])] == [ids[9]]
+        assert await store.get_document_by_id(ids[7]) is None
+        assert store.live_count == 78
+        # La ligne reste dans la matrice jusqu'à la prochaine compaction
+        assert store.embeddings.shape[0] == 80
+        # Suppression d'un id inconnu ou déjà supprimé
+        assert await store.delete_documents([ids[7], "inconnu"]) == 0
+
+    asyncio.run(scenario())
+
+
+def test_tombstone_ratio_triggers_a_dense_rewrite(store_options, vectors):
+    async def scenario():
+        store = VectorStore(**{**store_options, "tombstone_compaction_ratio": 0.25})
+        await store.initialize()
+        ids = await store.add_documents(make_documents(0, 100), vectors[:100].tolist())
+
+        await store.delete_documents(ids[:20])
+        assert store._compaction_task is None
+        await store.delete_by_source_file("livre_1.md")  # 20 des 80 restants
+        await store._wait_for_compaction()
+
+        # Base dense : plus aucune ligne supprimée, lignes renumérotées
+        assert (store._count, store._deleted_count, store.live_count) == (60, 0, 60)
+        expected = [doc_id for i, doc_id in enumerate(ids) if i >= 20 and i % 4 != 1]
+        assert store.document_ids == expected
+        results = await store.similarity_search(vectors[42].tolist(), top_k=1)
+        assert results[0]["id"] == ids[42]
+
+    asyncio.run(scenario())
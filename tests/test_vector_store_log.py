@@ -0,0 +1,214 @@
+# ==============================================================================
+# FILE: tests/test_vector_store_log.py - Journal des mutations et compaction
+# ==============================================================================
+
+import asyncio
+import multiprocessing
+import os
+from unittest import mock
+
+import numpy as np
+
+from app.database import index_storage
+from app.database.vector_store import VectorStore
+from tests.conftest import make_documents
+
+
+async def _open(options) -> VectorStore:
+    store = VectorStore(**options)
+    await store.initialize()
+    return store
+
+
+def _live_ids(store: VectorStore):
+    return {doc_id for doc_id in store.document_ids if doc_id in store._row_index}
+
+
+def test_log_replay_restores_adds_and_deletes(store_options, vectors):
+    async def scenario():
+        store = await _open(store_options)
+        ids = await store.add_documents(make_documents(0, 30), vectors[:30].tolist())
+        assert await store.delete_documents(ids[:5]) == 5
+        store._log.close()
+
+        reopened = await _open(store_options)
+        assert reopened.live_count == 25
+        assert _live_ids(reopened) == set(ids[5:])
+        assert await reopened.get_document_by_id(ids[0]) is None
+        results = await reopened.similarity_search(vectors[10].tolist(), top_k=1)
+        assert results[0]["id"] == ids[10]
+
+    asyncio.run(scenario())
+
+
+def test_compaction_writes_generation_and_truncates_log(store_options, vectors):
+    async def scenario():
+        store = await _open(store_options)
+        ids = await store.add_documents(make_documents(0, 40), vectors[:40].tolist())
+        await store.delete_documents(ids[:10])
+        await store.build_index()
+
+        assert store._log.record_count == 0
+        assert index_storage.read_base(store.snapshot_directory) is not None
+        assert store._count == 30  # Base dense : les lignes supprimées ont disparu
+
+        await store.add_documents(make_documents(40, 50), vectors[40:50].tolist())
+        store._log.close()
+        reopened = await _open(store_options)
+        assert reopened.live_count == 40
+        assert _live_ids(reopened) == set(ids[10:]) | set(store.document_ids[30:])
+
+    asyncio.run(scenario())
+
+
+def test_replay_after_compaction_interrupted_before_log_truncation(store_options, vectors):
+    """Base basculée mais journal non tronqué : les ajouts ne sont pas rejoués une seconde fois"""
+    async def scenario():
+        store = await _open(store_options)
+        await store.add_documents(make_documents(0, 100), vectors[:100].tolist())
+        await store.build_index()
+        await store.add_documents(make_documents(100, 150), vectors[100:150].tolist())
+        with mock.patch.object(store._log, "truncate_through", side_effect=OSError("arrêt brutal")):
+            await store._save_data()
+        store._log.close()
+
+        reopened = await _open(store_options)
+        assert reopened._count == 150
+        assert reopened.live_count == 150
+        assert len(reopened.documents) == 150
+
+    asyncio.run(scenario())
+
+
+def test_interrupted_generation_is_ignored_then_removed(store_options, vectors):
+    async def scenario():
+        store = await _open(store_options)
+        await store.add_documents(make_documents(0, 60), vectors[:60].tolist())
+        await store.build_index()
+        active = index_storage.read_base(store.snapshot_directory)
+
+        def interrupted(directory, *args, **kwargs):
+            os.makedirs(directory, exist_ok=True)
+            with open(os.path.join(directory, index_storage.VECTORS_FILE), "w") as f:
+                f.write("partiel")
+            raise OSError("arrêt brutal")
+
+        await store.add_documents(make_documents(60, 80), vectors[60:80].tolist())
+        with mock.patch.object(index_storage, "write_index", side_effect=interrupted):
+            await store._save_data()
+        assert index_storage.read_base(store.snapshot_directory) == active
+        store._log.close()
+
+        reopened = await _open(store_options)
+        assert reopened.live_count == 80
+        await reopened.build_index()
+        await reopened.build_index()
+        # Génération active et précédente conservées, génération interrompue supprimée
+        generations = index_storage.list_generations(reopened.snapshot_directory)
+        assert len(generations) == 2
+        assert generations[-1] == index_storage.read_base(reopened.snapshot_directory)
+
+    asyncio.run(scenario())
+
+
+def test_replay_skips_adds_already_in_base(store_options, vectors):
+    async def scenario():
+        store = await _open(store_options)
+        await store.add_documents(make_documents(0, 20), vectors[:20].tolist())
+        records = list(store._log.replay(0))
+        await store.build_index()
+        # Enregistrements déjà compactés réinjectés dans le journal
+        store._log.append([dict(record) for record in records])
+        store._log.close()
+
+        reopened = await _open(store_options)
+        assert reopened._count == 20
+
+    asyncio.run(scenario())
+
+
+def test_reopen_after_compaction_keeps_search_results(store_options, vectors):
+    async def scenario():
+        store = await _open(store_options)
+        ids = await store.add_documents(make_documents(0, 200), vectors[:200].tolist())
+        await store.build_index()
+        store._log.close()
+
+        reopened = await _open(store_options)
+        results = await reopened.similarity_search(vectors[123].tolist(), top_k=3)
+        assert results[0]["id"] == ids[123]
+
+    asyncio.run(scenario())
+
+
+def test_two_writers_on_the_same_collection(store_options, vectors):
+    """Deux workers écrivent dans le même journal ; l'un compacte pendant que l'autre écrit"""
+    async def scenario():
+        first = await _open(store_options)
+        second = await _open(store_options)
+        ids = await first.add_documents(make_documents(0, 5), vectors[:5].tolist())
+        ids += await second.add_documents(make_documents(5, 10), vectors[5:10].tolist())
+        await first.build_index()
+        ids += await second.add_documents(make_documents(10, 15), vectors[10:15].tolist())
+
+        # Chaque worker rattrape les écritures de l'autre avant d'écrire
+        assert second.live_count == 15
+        await first.delete_documents([ids[14]])
+        assert first.live_count == 14
+        sequences = [record["seq"] for record in first._log.replay(0)]
+        assert sequences == sorted(set(sequences))
+
+        first._log.close()
+        second._log.close()
+        reopened = await _open(store_options)
+        assert _live_ids(reopened) == set(ids[:14])
+
+    asyncio.run(scenario())
+
+
+def test_compaction_does_not_roll_back_a_newer_base(store_options, vectors):
+    async def scenario():
+        first = await _open(store_options)
+        second = await _open(store_options)
+        await first.add_documents(make_documents(0, 10), vectors[:10].tolist())
+        await second.build_index()
+        await first.build_index()
+        await second.add_documents(make_documents(10, 20), vectors[10:20].tolist())
+        await second.build_index()
+
+        assert first.live_count == 10
+        await first.build_index()  # Recharge la base de l'autre worker avant d'écrire
+        assert first.live_count == 20
+        assert len(index_storage.list_generations(first.snapshot_directory)) == 2
+
+    asyncio.run(scenario())
+
+
+def _write_from_process(options, start, compact):
+    async def scenario():
+        store = await _open(options)
+        vectors = np.random.default_rng(start).normal(size=(60, 32)).astype(np.float32)
+        for batch in range(6):
+            first = start + 10 * batch
+            await store.add_documents(make_documents(first, first + 10), vectors[10 * batch:10 * batch + 10].tolist())
+            if compact and batch % 2:
+                await store.build_index()
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_processes_keep_every_write(store_options):
+    asyncio.run(_open(store_options))
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=_write_from_process, args=(store_options, start, compact))
+        for start, compact in ((0, True), (1000, False), (2000, True))
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    assert all(process.exitcode == 0 for process in processes)
+
+    reopened = asyncio.run(_open(store_options))
+    assert reopened.live_count == 180
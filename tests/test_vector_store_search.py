@@ -0,0 +1,52 @@
+# ==============================================================================
+# FILE: tests/test_vector_store_search.py - Matrice float32 et sélection top-k exacte
+# ==============================================================================
+
+import asyncio
+
+import numpy as np
+
+from app.database.vector_store import VectorStore
+from tests.conftest import make_documents
+
+
+def _brute_force(vectors: np.ndarray, query: np.ndarray, top_k: int):
+    """Top-k cosinus de référence (tri complet)"""
+    similarities = vectors @ query / (np.linalg.norm(vectors, axis=1) * np.linalg.norm(query))
+    order = np.argsort(-similarities)[:top_k]
+    return order, similarities[order]
+
+
+def test_search_matches_brute_force_across_growing_batches(store_options, vectors):
+    async def scenario():
+        store = VectorStore(**store_options)
+        await store.initialize()
+        # Plusieurs ajouts : la matrice préallouée grandit par blocs
+        ids = []
+        for start in range(0, 300, 70):
+            stop = min(start + 70, 300)
+            ids += await store.add_documents(make_documents(start, stop), vectors[start:stop].tolist())
+
+        assert store.embeddings.dtype == np.float32 and store.embeddings.shape == (300, vectors.shape[1])
+        for query in vectors[300:310]:
+            results = await store.similarity_search(query.tolist(), top_k=7)
+            order, expected = _brute_force(vectors[:300], query, 7)
+            assert [result["id"] for result in results] == [ids[row] for row in order]
+            np.testing.assert_allclose([result["similarity_score"] for result in results], expected, rtol=1e-4)
+
+    asyncio.run(scenario())
+
+
+def test_top_k_larger_than_collection_returns_every_row_sorted(store_options, vectors):
+    async def scenario():
+        store = VectorStore(**store_options)
+        await store.initialize()
+        assert await store.similarity_search(vectors[0].tolist(), top_k=3) == []
+        await store.add_documents(make_documents(0, 5), vectors[:5].tolist())
+        return await store.similarity_search(vectors[0].tolist(), top_k=50)
+
+    results = asyncio.run(scenario())
+    scores = [result["similarity_score"] for result in results]
+    assert len(results) == 5
+    assert scores == sorted(scores, reverse=True)
+    assert results[0]["content"] == make_documents(0, 1)[0]["content"]